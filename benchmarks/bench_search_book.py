@@ -0,0 +1,309 @@
+"""
+Benchmark do search_book contra fontes sintéticas locais
+
+Uso:
+    python benchmarks/bench_search_book.py
+    python benchmarks/bench_search_book.py --callers 1,8,32 --corpus-size 3000 --parallel
+    python benchmarks/bench_search_book.py --compare benchmarks/results/search_book-abc1234.json
+    python benchmarks/bench_search_book.py --compare antes.json depois.json
+
+Para cada nível de concorrência, um motor novo (cache, saúde das fontes,
+ordem aprendida e telemetria vazios) lê a mesma sequência de ISBNs com N
+chamadores simultâneos. O relatório traz p50/p95/p99 da latência, chamadas
+às fontes por leitura, taxa de acerto do cache e leituras por segundo, e vai
+para um JSON com o commit, para comparar entre versões com --compare.
+
+As fontes são sintéticas (benchmarks/upstreams.py): nada vai à rede. Sem
+--supabase-local o Supabase não é usado (o cache fica nas camadas locais);
+com ele, cada nível usa um banco SQLite novo (supabase_local) no lugar do
+Supabase, incluindo cache_api, cache negativo e arquivo por fonte.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import book_search_engine
+from book_search_engine import BookSearchEngine, openlibrary_name_cache
+from search_cache import TieredSearchCache
+from search_telemetry import SearchTelemetry
+from source_health import SourceHealthRegistry
+from source_ranking import SourceRanking
+from supabase_local import LocalSupabaseClient
+from upstreams import SyntheticTransport, SyntheticUpstreams, build_corpus, build_workload
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+# Métrica → (rótulo, maior é melhor)
+COMPARED_METRICS = {
+    'p50_ms': ('p50 (ms)', False),
+    'p95_ms': ('p95 (ms)', False),
+    'p99_ms': ('p99 (ms)', False),
+    'throughput': ('leituras/s', True),
+    'upstream_calls_per_lookup': ('chamadas/leitura', False),
+    'cache_hit_ratio': ('acerto do cache', True)
+}
+
+# Desfechos de busca respondidos pelo cache (mesma conta da página de telemetria)
+CACHE_OUTCOMES = ['cache', 'negative_cache']
+
+# Parâmetros que precisam coincidir para os números serem comparáveis
+COMPARABLE_CONFIG = ['corpus_size', 'repeat_share', 'brazilian_share', 'seed', 'latency_scale',
+                     'parallel', 'hedging', 'isbndb', 'rate_limits', 'supabase_local']
+
+
+def cache_hit_ratio(outcomes: Dict, lookups: int) -> Optional[float]:
+    """Fração das leituras respondidas pelo cache (positivo ou negativo)"""
+    if not lookups:
+        return None
+    return round(sum(outcomes.get(outcome, 0) for outcome in CACHE_OUTCOMES) / lookups, 4)
+
+
+def metric_value(level: Dict, metric: str) -> Optional[float]:
+    """
+    Métrica de um nível de concorrência
+    
+    O acerto do cache é recalculado dos desfechos: resultados gravados antes
+    não contavam o cache negativo.
+    """
+    if metric == 'cache_hit_ratio' and 'outcomes' in level:
+        return cache_hit_ratio(level['outcomes'], level['lookups'])
+    return level.get(metric)
+
+
+def git_revision() -> Dict:
+    """Commit atual e se há alterações não commitadas"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=root,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=root,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+        return {'commit': commit, 'dirty': dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {'commit': 'desconhecido', 'dirty': None}
+
+
+def percentile(sorted_values: List[float], p: float) -> Optional[float]:
+    """Percentil p (0-100) pelo método do posto mais próximo"""
+    if not sorted_values:
+        return None
+    rank = max(1, int(-(-p * len(sorted_values) // 100)))
+    return sorted_values[rank - 1]
+
+
+def wait_background_refreshes(timeout: float = 60.0):
+    """Espera as atualizações em segundo plano do cache, para não vazarem para o próximo nível"""
+    deadline = time.monotonic() + timeout
+    while book_search_engine._REFRESHING and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+
+def build_engine(args, upstreams: SyntheticUpstreams, supabase=None) -> BookSearchEngine:
+    """Motor isolado: transporte sintético e estado (cache, saúde, ranking, telemetria) novos"""
+    transport = SyntheticTransport(upstreams)
+    if not args.rate_limits:
+        # Os limites de taxa são das APIs reais; sem eles, mede-se só o motor
+        for source in list(transport.rate_limits):
+            transport.set_rate_limit(source, None)
+    
+    engine = BookSearchEngine(
+        supabase,
+        parallel_cascade=args.parallel,
+        transport=transport,
+        source_health=SourceHealthRegistry(),
+        hedging=args.hedging,
+        source_ranking=SourceRanking(path=None, seed=args.seed),
+        search_cache=TieredSearchCache(),
+        telemetry=SearchTelemetry()
+    )
+    
+    # Índice local desligado: os números não dependem de arquivos da máquina
+    engine.local_index = None
+    
+    if args.isbndb:
+        engine._get_isbndb_api_key = lambda: 'benchmark'
+    
+    return engine
+
+
+def run_level(args, workload: List[str], callers: int) -> Dict:
+    """Executa a sequência inteira com `callers` chamadores simultâneos"""
+    upstreams = SyntheticUpstreams(seed=args.seed, latency_scale=args.latency_scale)
+    supabase = None
+    if args.supabase_local:
+        supabase = LocalSupabaseClient(os.path.join(tempfile.mkdtemp(prefix='bench-supabase-'), 'supabase.db'))
+    engine = build_engine(args, upstreams, supabase)
+    openlibrary_name_cache.clear()
+    
+    def timed_lookup(isbn: str) -> Tuple[float, bool]:
+        start = time.perf_counter()
+        try:
+            engine.search_book(isbn=isbn)
+            return time.perf_counter() - start, True
+        except Exception:
+            return time.perf_counter() - start, False
+    
+    with ThreadPoolExecutor(max_workers=callers) as executor:
+        start = time.perf_counter()
+        samples = list(executor.map(timed_lookup, workload))
+        wall_seconds = time.perf_counter() - start
+    
+    calls = dict(upstreams.calls)
+    wait_background_refreshes()
+    
+    latencies = sorted(seconds * 1000 for seconds, _ in samples)
+    outcomes = engine.telemetry.snapshot()['searches']['outcomes']
+    lookups = len(samples)
+    
+    return {
+        'callers': callers,
+        'lookups': lookups,
+        'errors': sum(1 for _, ok in samples if not ok),
+        'wall_seconds': round(wall_seconds, 3),
+        'throughput': round(lookups / wall_seconds, 2) if wall_seconds else None,
+        'mean_ms': round(sum(latencies) / lookups, 2) if lookups else None,
+        'p50_ms': round(percentile(latencies, 50), 2) if lookups else None,
+        'p95_ms': round(percentile(latencies, 95), 2) if lookups else None,
+        'p99_ms': round(percentile(latencies, 99), 2) if lookups else None,
+        'max_ms': round(latencies[-1], 2) if lookups else None,
+        'upstream_calls': calls,
+        'upstream_calls_per_lookup': round(sum(calls.values()) / lookups, 3) if lookups else None,
+        'cache_hit_ratio': cache_hit_ratio(outcomes, lookups),
+        'outcomes': outcomes,
+        'cache_tiers': engine.get_cache_stats()
+    }
+
+
+# ==================== RELATÓRIO ====================
+
+def print_level(result: Dict):
+    print(
+        f"  {result['callers']:>3} chamadores: {result['throughput']:>8.1f} leituras/s | "
+        f"p50 {result['p50_ms']:>7.1f} ms | p95 {result['p95_ms']:>7.1f} ms | p99 {result['p99_ms']:>7.1f} ms | "
+        f"{result['upstream_calls_per_lookup']:.2f} chamadas/leitura | "
+        f"cache {result['cache_hit_ratio']:.1%} | erros {result['errors']}",
+        flush=True
+    )
+
+
+def print_comparison(baseline: Dict, current: Dict):
+    """Tabela com a variação de cada métrica, por nível de concorrência"""
+    print(f"\n📊 {baseline['git']['commit']} → {current['git']['commit']}"
+          f"{' (com alterações locais)' if current['git'].get('dirty') else ''}")
+    
+    differing = [key for key in COMPARABLE_CONFIG
+                 if baseline['config'].get(key) != current['config'].get(key)]
+    if differing:
+        print(f"⚠️ Configurações diferentes ({', '.join(differing)}): a comparação pode não ser justa")
+    
+    baseline_levels = {level['callers']: level for level in baseline['results']}
+    
+    for level in current['results']:
+        before = baseline_levels.get(level['callers'])
+        if before is None:
+            continue
+        
+        print(f"\n  {level['callers']} chamadores")
+        for metric, (label, higher_is_better) in COMPARED_METRICS.items():
+            old, new = metric_value(before, metric), metric_value(level, metric)
+            if old is None or new is None:
+                continue
+            
+            change = (new - old) / old if old else 0.0
+            improved = change > 0 if higher_is_better else change < 0
+            marker = '✅' if improved and abs(change) >= 0.05 else ('❌' if abs(change) >= 0.05 else '  ')
+            print(f"    {marker} {label:<18} {old:>10.2f} → {new:>10.2f} ({change:+.1%})")
+
+
+def load_results(path: str) -> Dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do search_book contra fontes sintéticas locais")
+    parser.add_argument('--callers', default='1,8,32', help="Níveis de concorrência, separados por vírgula")
+    parser.add_argument('--corpus-size', type=int, default=3000, help="ISBNs distintos no corpus")
+    parser.add_argument('--repeat-share', type=float, default=0.3, help="Fração das leituras que repetem um ISBN")
+    parser.add_argument('--brazilian-share', type=float, default=0.7, help="Fração de ISBNs brasileiros")
+    parser.add_argument('--seed', type=int, default=42, help="Semente do corpus e das fontes")
+    parser.add_argument('--latency-scale', type=float, default=0.1,
+                        help="Multiplica a latência das fontes (1.0 = latência real)")
+    parser.add_argument('--parallel', action='store_true', help="Cascata paralela")
+    parser.add_argument('--hedging', action='store_true', help="Hedge na cascata sequencial")
+    parser.add_argument('--isbndb', action='store_true', help="Incluir a ISBNdb (como se houvesse API key)")
+    parser.add_argument('--rate-limits', action='store_true', help="Manter os limites de taxa das APIs reais")
+    parser.add_argument('--supabase-local', action='store_true',
+                        help="Usar um banco SQLite local no lugar do Supabase (cache_api etc.)")
+    parser.add_argument('--output', help="Arquivo JSON do resultado (padrão: benchmarks/results/search_book-<commit>.json)")
+    parser.add_argument('--compare', nargs='+', metavar='JSON',
+                        help="Comparar com um resultado anterior (ou comparar dois arquivos, sem rodar)")
+    args = parser.parse_args()
+    
+    if args.compare and len(args.compare) > 2:
+        parser.error("--compare aceita um ou dois arquivos")
+    
+    if args.compare and len(args.compare) == 2:
+        print_comparison(load_results(args.compare[0]), load_results(args.compare[1]))
+        return
+    
+    callers_levels = [int(value) for value in args.callers.split(',') if value.strip()]
+    corpus = build_corpus(args.corpus_size, seed=args.seed, brazilian_share=args.brazilian_share)
+    workload = build_workload(corpus, repeat_share=args.repeat_share, seed=args.seed)
+    git = git_revision()
+    
+    print(f"🏁 search_book: {len(corpus):,} ISBNs, {len(workload):,} leituras por nível "
+          f"(commit {git['commit']}{', com alterações locais' if git['dirty'] else ''})", flush=True)
+    
+    results = []
+    for callers in callers_levels:
+        result = run_level(args, workload, callers)
+        print_level(result)
+        results.append(result)
+    
+    report = {
+        'benchmark': 'search_book',
+        'git': git,
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {
+            'corpus_size': args.corpus_size,
+            'lookups': len(workload),
+            'repeat_share': args.repeat_share,
+            'brazilian_share': args.brazilian_share,
+            'seed': args.seed,
+            'latency_scale': args.latency_scale,
+            'parallel': args.parallel,
+            'hedging': args.hedging,
+            'isbndb': args.isbndb,
+            'rate_limits': args.rate_limits,
+            'supabase_local': args.supabase_local
+        },
+        'results': results
+    }
+    
+    output = args.output or os.path.join(RESULTS_DIR, f"search_book-{git['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"💾 Resultado gravado em {output}")
+    
+    if args.compare:
+        print_comparison(load_results(args.compare[0]), report)
+
+
+if __name__ == '__main__':
+    main()
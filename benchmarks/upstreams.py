@@ -0,0 +1,356 @@
+"""
+Fontes sintéticas para os benchmarks
+Corpus determinístico de ISBNs (maioria brasileira) e um transporte HTTP que responde
+como Open Library, Google Books e ISBNdb, com cobertura e latência típicas de cada uma
+"""
+
+import hashlib
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from http_replay import build_response
+from http_transport import HttpTransport
+
+
+# Prefixos de ISBN-13 (sem o dígito verificador) e peso de cada um no corpus
+BRAZILIAN_PREFIXES = ['97885', '97865']
+FOREIGN_PREFIXES = ['9780', '9781', '97884', '97889', '97838']
+
+# Fonte → probabilidade de ter o livro (brasileiro, estrangeiro)
+COVERAGE = {
+    'openlibrary': (0.30, 0.85),
+    'google_books': (0.80, 0.90),
+    'isbndb': (0.55, 0.90)
+}
+
+# Fonte → probabilidade de cada campo vir preenchido quando a fonte tem o livro
+FIELD_FILL = {
+    'openlibrary': {'publisher': 0.7, 'genre': 0.4, 'year': 0.9, 'cover': 0.5, 'author': 0.85},
+    'google_books': {'publisher': 0.6, 'genre': 0.5, 'year': 0.95, 'cover': 0.8, 'author': 0.95},
+    'isbndb': {'publisher': 0.9, 'genre': 0.6, 'year': 0.9, 'cover': 0.7, 'author': 0.9}
+}
+
+# Latência das fontes reais: fonte → (mediana, p90) em segundos
+LATENCY_PROFILE = {
+    'openlibrary': (0.45, 1.2),
+    'openlibrary_refs': (0.25, 0.6),
+    'google_books': (0.20, 0.5),
+    'isbndb': (0.30, 0.7),
+    'default': (0.30, 0.8)
+}
+
+# Fonte → fração de respostas 503
+ERROR_RATE = {
+    'openlibrary': 0.02,
+    'google_books': 0.005,
+    'isbndb': 0.01
+}
+
+_Z90 = 1.2816
+
+TITLE_WORDS = {
+    'br': (['O Segredo', 'A Casa', 'Memórias', 'O Caminho', 'A Hora', 'Histórias', 'O Livro',
+            'A Vida', 'Cartas', 'O Tempo', 'A Cidade', 'Sonhos'],
+           ['do Sertão', 'da Estrela', 'de Minas', 'do Mar', 'das Águas', 'do Vento', 'da Noite',
+            'de Pedra', 'do Cerrado', 'da Saudade', 'de Papel', 'sem Fim']),
+    'foreign': (['The Secret', 'A House', 'Memories', 'The Road', 'The Hour', 'Stories', 'The Book',
+                 'A Life', 'Letters', 'The Time', 'The City', 'Dreams'],
+                ['of the North', 'of Stars', 'at Sea', 'in Winter', 'of Glass', 'of the Wind',
+                 'at Night', 'of Stone', 'of Ashes', 'in Paper', 'Without End', 'of Light'])
+}
+
+FIRST_NAMES = ['Ana', 'João', 'Maria', 'Pedro', 'Clarice', 'Jorge', 'Cecília', 'Carlos', 'Raquel',
+               'Machado', 'Lygia', 'Graciliano', 'Rubem', 'Adélia', 'Érico', 'Conceição']
+LAST_NAMES = ['Silva', 'Souza', 'Amado', 'Lispector', 'Meireles', 'Drummond', 'Queiroz', 'Assis',
+              'Telles', 'Ramos', 'Fonseca', 'Prado', 'Veríssimo', 'Evaristo', 'Andrade', 'Lima']
+PUBLISHERS = ['Companhia das Letras', 'Rocco', 'Record', 'Intrínseca', 'Sextante', 'Globo Livros',
+              'Editora 34', 'Todavia', 'Autêntica', 'Penguin', 'HarperCollins', 'Vintage']
+SUBJECTS = ['Fiction', 'Romance', 'History', 'Poetry', 'Biography', 'Children', 'Fantasy',
+            'Science', 'Philosophy', 'Self-help', 'Mystery', 'Drama']
+
+
+# ==================== CORPUS ====================
+
+def isbn13_check_digit(body: str) -> str:
+    total = sum(int(ch) * (1 if i % 2 == 0 else 3) for i, ch in enumerate(body))
+    return str((10 - total % 10) % 10)
+
+
+def build_corpus(size: int, seed: int = 42, brazilian_share: float = 0.7) -> List[str]:
+    """ISBN-13 válidos e distintos; brazilian_share deles com prefixo 978-85/978-65"""
+    rng = random.Random(seed)
+    corpus = []
+    seen = set()
+    
+    while len(corpus) < size:
+        prefixes = BRAZILIAN_PREFIXES if rng.random() < brazilian_share else FOREIGN_PREFIXES
+        prefix = rng.choice(prefixes)
+        body = prefix + ''.join(rng.choice('0123456789') for _ in range(12 - len(prefix)))
+        isbn = body + isbn13_check_digit(body)
+        
+        if isbn not in seen:
+            seen.add(isbn)
+            corpus.append(isbn)
+    
+    return corpus
+
+
+def build_workload(corpus: List[str], repeat_share: float = 0.3, seed: int = 42) -> List[str]:
+    """
+    Sequência de leituras: cada ISBN do corpus uma vez, mais releituras
+    
+    As releituras (repeat_share do total) escolhem, com viés para os primeiros
+    (distribuição de Zipf), entre os ISBNs já lidos; assim o cache é exercitado
+    como numa catalogação real, com exemplares repetidos.
+    """
+    rng = random.Random(seed)
+    order = list(corpus)
+    rng.shuffle(order)
+    
+    repeats = int(len(order) * repeat_share / max(1e-9, 1 - repeat_share))
+    workload = list(order)
+    
+    for _ in range(repeats):
+        position = rng.randrange(len(workload) + 1)
+        seen_count = min(position, len(order))
+        if seen_count == 0:
+            continue
+        # Zipf aproximado: índice com peso ~ 1/(i+1)
+        index = min(seen_count - 1, int(seen_count ** rng.random()) - 1)
+        workload.insert(position, order[index])
+    
+    return workload
+
+
+# ==================== FONTES SINTÉTICAS ====================
+
+def _unit(*parts) -> float:
+    """Número em [0, 1) determinado pelas partes (mesmo ISBN → mesma resposta)"""
+    digest = hashlib.sha1(':'.join(str(part) for part in parts).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') / 2 ** 64
+
+
+def _pick(options: List[str], *parts) -> str:
+    return options[int(_unit(*parts) * len(options))]
+
+
+def _skewed_pick(options: List[str], *parts) -> str:
+    """Escolha com viés para o começo da lista (poucos autores/editoras concentram o acervo)"""
+    return options[int(len(options) * _unit(*parts) ** 3)]
+
+
+class SyntheticUpstreams:
+    """
+    Catálogo sintético servido como as APIs reais
+    
+    Cada ISBN tem um livro fixo (título, autor, editora, assunto, ano), e cada
+    fonte tem ou não o livro, e preenche ou não cada campo, de forma
+    determinística pelo seed. Livros brasileiros têm cobertura menor na Open
+    Library, como nas fontes reais.
+    """
+    
+    def __init__(self, seed: int = 42, latency_scale: float = 0.1,
+                 latency_profile: Optional[Dict[str, Tuple[float, float]]] = None,
+                 error_rate: Optional[Dict[str, float]] = None):
+        self.seed = seed
+        self.latency_scale = latency_scale
+        self.latency_profile = dict(LATENCY_PROFILE)
+        if latency_profile:
+            self.latency_profile.update(latency_profile)
+        self.error_rate = dict(ERROR_RATE) if error_rate is None else error_rate
+        
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls: Dict[str, int] = {}
+    
+    def reset_calls(self):
+        with self._lock:
+            self.calls = {}
+    
+    def total_calls(self) -> int:
+        with self._lock:
+            return sum(self.calls.values())
+    
+    def count_call(self, source: str):
+        with self._lock:
+            self.calls[source] = self.calls.get(source, 0) + 1
+    
+    def latency(self, source: str) -> Tuple[float, bool]:
+        """Latência sorteada (log-normal, já escalada) e se a resposta será um 503"""
+        median, p90 = self.latency_profile.get(source, self.latency_profile['default'])
+        sigma = math.log(max(p90, median) / median) / _Z90
+        with self._lock:
+            sample = self._random.lognormvariate(math.log(median), sigma)
+            failed = self._random.random() < self.error_rate.get(source, 0.0)
+        return sample * self.latency_scale, failed
+    
+    # ---------- Catálogo ----------
+    
+    def has_book(self, source: str, isbn: str) -> bool:
+        brazilian = isbn[:5] in BRAZILIAN_PREFIXES
+        coverage = COVERAGE[source][0 if brazilian else 1]
+        return _unit(self.seed, source, isbn) < coverage
+    
+    def has_field(self, source: str, isbn: str, field: str) -> bool:
+        return _unit(self.seed, source, isbn, field) < FIELD_FILL[source][field]
+    
+    def book(self, isbn: str) -> Dict:
+        words = TITLE_WORDS['br' if isbn[:5] in BRAZILIAN_PREFIXES else 'foreign']
+        author_index = int(len(FIRST_NAMES) * len(LAST_NAMES) * _unit(self.seed, 'author', isbn) ** 3)
+        
+        return {
+            'title': f"{_pick(words[0], self.seed, 't1', isbn)} {_pick(words[1], self.seed, 't2', isbn)}",
+            'author_key': f"/authors/OL{author_index + 1}A",
+            'author': f"{FIRST_NAMES[author_index % len(FIRST_NAMES)]} {LAST_NAMES[author_index // len(FIRST_NAMES)]}",
+            'publisher': _skewed_pick(PUBLISHERS, self.seed, 'publisher', isbn),
+            'subject': _pick(SUBJECTS, self.seed, 'subject', isbn),
+            'year': str(1950 + int(_unit(self.seed, 'year', isbn) * 75)),
+            'cover_id': int(_unit(self.seed, 'cover', isbn) * 10 ** 7)
+        }
+    
+    def author_name(self, key: str) -> str:
+        index = int(key.strip('/').split('/')[-1][2:-1]) - 1
+        return f"{FIRST_NAMES[index % len(FIRST_NAMES)]} {LAST_NAMES[index // len(FIRST_NAMES)]}"
+    
+    # ---------- Respostas no formato de cada API ----------
+    
+    def openlibrary_edition(self, isbn: str) -> Optional[Dict]:
+        if not self.has_book('openlibrary', isbn):
+            return None
+        
+        book = self.book(isbn)
+        edition = {'title': book['title'], 'isbn_13': [isbn]}
+        if self.has_field('openlibrary', isbn, 'author'):
+            edition['authors'] = [{'key': book['author_key']}]
+        if self.has_field('openlibrary', isbn, 'publisher'):
+            edition['publishers'] = [book['publisher']]
+        if self.has_field('openlibrary', isbn, 'genre'):
+            edition['subjects'] = [book['subject']]
+        if self.has_field('openlibrary', isbn, 'year'):
+            edition['publish_date'] = book['year']
+        if self.has_field('openlibrary', isbn, 'cover'):
+            edition['covers'] = [book['cover_id']]
+        return edition
+    
+    def google_volumes(self, isbn: str) -> Dict:
+        if not self.has_book('google_books', isbn):
+            return {'kind': 'books#volumes', 'totalItems': 0}
+        
+        book = self.book(isbn)
+        info = {
+            'title': book['title'],
+            'industryIdentifiers': [{'type': 'ISBN_13', 'identifier': isbn}]
+        }
+        if self.has_field('google_books', isbn, 'author'):
+            info['authors'] = [book['author']]
+        if self.has_field('google_books', isbn, 'publisher'):
+            info['publisher'] = book['publisher']
+        if self.has_field('google_books', isbn, 'genre'):
+            info['categories'] = [book['subject']]
+        if self.has_field('google_books', isbn, 'year'):
+            info['publishedDate'] = f"{book['year']}-01-01"
+        if self.has_field('google_books', isbn, 'cover'):
+            info['imageLinks'] = {'thumbnail': f"https://books.google.com/books/content?id={isbn}"}
+        return {'kind': 'books#volumes', 'totalItems': 1, 'items': [{'volumeInfo': info}]}
+    
+    def isbndb_book(self, isbn: str) -> Optional[Dict]:
+        if not self.has_book('isbndb', isbn):
+            return None
+        
+        book = self.book(isbn)
+        data = {'title': book['title'], 'isbn13': isbn}
+        if self.has_field('isbndb', isbn, 'author'):
+            data['authors'] = [book['author']]
+        if self.has_field('isbndb', isbn, 'publisher'):
+            data['publisher'] = book['publisher']
+        if self.has_field('isbndb', isbn, 'genre'):
+            data['subjects'] = [book['subject']]
+        if self.has_field('isbndb', isbn, 'year'):
+            data['date_published'] = book['year']
+        if self.has_field('isbndb', isbn, 'cover'):
+            data['image'] = f"https://images.isbndb.com/covers/{isbn}.jpg"
+        return {'book': data}
+    
+    def route(self, url: str) -> Tuple[str, int, Optional[Dict]]:
+        """URL → (fonte, status, corpo JSON)"""
+        parsed = urlparse(url)
+        path = parsed.path
+        
+        if parsed.netloc == 'openlibrary.org':
+            if path.startswith('/isbn/'):
+                edition = self.openlibrary_edition(path[len('/isbn/'):-len('.json')])
+                return 'openlibrary', (200 if edition else 404), edition
+            if path.startswith('/authors/'):
+                return 'openlibrary_refs', 200, {'name': self.author_name(path[:-len('.json')])}
+        
+        if parsed.netloc == 'www.googleapis.com' and path == '/books/v1/volumes':
+            query = parse_qs(parsed.query).get('q', [''])[0]
+            if query.startswith('isbn:'):
+                return 'google_books', 200, self.google_volumes(query[len('isbn:'):])
+            return 'google_books', 200, {'kind': 'books#volumes', 'totalItems': 0}
+        
+        if parsed.netloc == 'api2.isbndb.com' and path.startswith('/book/'):
+            data = self.isbndb_book(path[len('/book/'):])
+            return 'isbndb', (200 if data else 404), data
+        
+        return 'default', 404, None
+
+
+class SyntheticSession:
+    """Sessão no lugar da requests.Session do transporte: responde com as fontes sintéticas"""
+    
+    def __init__(self, upstreams: SyntheticUpstreams):
+        self.upstreams = upstreams
+    
+    def request(self, method: str, url: str, timeout=None, params=None, **kwargs) -> requests.Response:
+        url = requests.Request(method, url, params=params).prepare().url
+        source, status, body = self.upstreams.route(url)
+        self.upstreams.count_call(source)
+        
+        delay, failed = self.upstreams.latency(source)
+        read_timeout = timeout[1] if isinstance(timeout, tuple) else timeout
+        if read_timeout is not None and delay > read_timeout:
+            time.sleep(read_timeout)
+            raise requests.exceptions.ReadTimeout(f"Fonte sintética '{source}' passou de {read_timeout}s")
+        time.sleep(delay)
+        
+        if failed:
+            status, body = 503, {'error': 'Service Unavailable'}
+        
+        entry = {
+            'status': status,
+            'body': json.dumps(body, ensure_ascii=False) if body is not None else '',
+            'headers': {'Content-Type': 'application/json'}
+        }
+        return build_response(entry, url)
+    
+    def close(self):
+        pass
+
+
+class SyntheticTransport(HttpTransport):
+    """
+    HttpTransport cujas requisições vão para as fontes sintéticas
+    
+    Só a sessão é trocada: retries, backoff, timeouts e limites de taxa
+    continuam sendo os do transporte real.
+    """
+    
+    def __init__(self, upstreams: SyntheticUpstreams, **kwargs):
+        super().__init__(**kwargs)
+        self.upstreams = upstreams
+        self._session = SyntheticSession(upstreams)
+    
+    def _get_session(self, url: str) -> SyntheticSession:
+        return self._session
@@ -18,20 +18,25 @@ import json
 import configparser
 from supabase import create_client, Client
 from utils_auth import check_login, get_operador_nome, show_user_info
-from book_search_engine import create_search_engine
+from book_search_engine import create_search_engine, resolve_openlibrary_names
+from http_transport import get_transport
+from isbn_utils import isbn_aliases
+from supabase_local import local_client_from_env
 
-# Inicializar cliente Supabase
+# Inicializar cliente Supabase (com SUPABASE_LOCAL_PATH, um banco SQLite local no lugar dele)
 try:
-    url: str = st.secrets["supabase"]["url"]
-    key: str = st.secrets["supabase"]["key"]
-    supabase: Client = create_client(url, key)
+    supabase = local_client_from_env()
+    if supabase is None:
+        url: str = st.secrets["supabase"]["url"]
+        key: str = st.secrets["supabase"]["key"]
+        supabase = create_client(url, key)
 except Exception as e:
     st.error("Erro ao conectar com o Supabase. Verifique os segredos do Streamlit.")
     st.code(e)
     st.stop()
 
-# Inicializar motor de busca avançado
-search_engine = create_search_engine(supabase)
+# Inicializar motor de busca avançado (APIs consultadas em paralelo)
+search_engine = create_search_engine(supabase, parallel_cascade=True)
 
 
 # Configuração da página
@@ -391,47 +396,44 @@ def translate_genre(genre):
     
     return genre_lower.title()
 
+def interactive_get(url, source, **kwargs):
+    """GET da página: espera no limite de taxa (fila e Retry-After) no máximo o timeout de leitura da fonte"""
+    transport = get_transport()
+    return transport.get(url, source=source, max_queue_wait=transport.get_timeout(source)[1], **kwargs)
+
+def resolve_names(keys):
+    """Nomes de autores/editoras da Open Library, com a mesma espera máxima de interactive_get"""
+    return resolve_openlibrary_names(keys, max_queue_wait=get_transport().get_timeout('openlibrary_refs')[1])
+
 def search_openlibrary(barcode):
     """Busca dados na Open Library API usando o código de barras com coleta melhorada de editora"""
     try:
         url = f"https://openlibrary.org/isbn/{barcode}.json"
-        response = requests.get(url, timeout=10)
+        response = interactive_get(url, source='openlibrary')
         if response.status_code == 200:
             data = response.json()
             
             title = data.get('title', 'N/A')
             
-            # Buscar autores
-            authors = []
-            if 'authors' in data:
-                for author_ref in data['authors']:
-                    author_key = author_ref['key']
-                    author_url = f"https://openlibrary.org{author_key}.json"
-                    try:
-                        author_response = requests.get(author_url, timeout=5)
-                        if author_response.status_code == 200:
-                            author_data = author_response.json()
-                            authors.append(author_data.get('name', 'N/A'))
-                    except:
-                        continue
+            # Chaves de autores e editora resolvidas juntas (com cache e em paralelo)
+            author_keys = [ref['key'] for ref in data.get('authors', []) if ref.get('key')]
             
+            publisher_ref = data['publishers'][0] if data.get('publishers') else None
+            publisher_key = publisher_ref.get('key') if isinstance(publisher_ref, dict) else None
+            
+            names = resolve_names(author_keys + ([publisher_key] if publisher_key else []))
+            
+            # Buscar autores
+            authors = [names[key] or 'N/A' for key in author_keys if key in names]
             author = ', '.join(authors) if authors else 'N/A'
             
             # Buscar editora com mais detalhes
             publisher = 'N/A'
-            if 'publishers' in data and data['publishers']:
-                # Tentar buscar detalhes da editora
-                publisher_key = data['publishers'][0]['key']
-                publisher_url = f"https://openlibrary.org{publisher_key}.json"
-                try:
-                    publisher_response = requests.get(publisher_url, timeout=5)
-                    if publisher_response.status_code == 200:
-                        publisher_data = publisher_response.json()
-                        publisher = publisher_data.get('name', data['publishers'][0].get('name', 'N/A'))
-                    else:
-                        publisher = data['publishers'][0].get('name', 'N/A')
-                except:
-                    publisher = data['publishers'][0].get('name', 'N/A')
+            if isinstance(publisher_ref, dict):
+                publisher = names.get(publisher_key) or publisher_ref.get('name', 'N/A')
+            elif publisher_ref:
+                # No JSON de edições a editora já vem como texto
+                publisher = publisher_ref
             
             # Buscar gênero (subjects)
             subjects = data.get('subjects', [])
@@ -453,7 +455,7 @@ def search_google_books(barcode):
     """Busca dados na Google Books API usando o código de barras"""
     try:
         url = f"https://www.googleapis.com/books/v1/volumes?q=isbn:{barcode}"
-        response = requests.get(url, timeout=10)
+        response = interactive_get(url, source='google_books')
         if response.status_code == 200:
             data = response.json()
             if 'items' in data and len(data['items']) > 0:
@@ -483,7 +485,7 @@ def search_google_books_by_title(title):
     """Busca dados na Google Books API usando o título"""
     try:
         url = f"https://www.googleapis.com/books/v1/volumes?q=intitle:{title}"
-        response = requests.get(url, timeout=10)
+        response = interactive_get(url, source='google_books')
         
         if response.status_code == 200:
             data = response.json()
@@ -544,7 +546,7 @@ def search_openlibrary_works(barcode):
     try:
         # Primeiro buscar o ISBN
         url = f"https://openlibrary.org/isbn/{barcode}.json"
-        response = requests.get(url, timeout=10)
+        response = interactive_get(url, source='openlibrary')
         if response.status_code == 200:
             data = response.json()
             
@@ -552,7 +554,7 @@ def search_openlibrary_works(barcode):
             if 'works' in data and data['works']:
                 work_key = data['works'][0]['key']
                 work_url = f"https://openlibrary.org{work_key}.json"
-                work_response = requests.get(work_url, timeout=10)
+                work_response = interactive_get(work_url, source='openlibrary')
                 
                 if work_response.status_code == 200:
                     work_data = work_response.json()
@@ -561,13 +563,10 @@ def search_openlibrary_works(barcode):
                     publisher = 'N/A'
                     if 'publishers' in work_data and work_data['publishers']:
                         publisher_key = work_data['publishers'][0]['key']
-                        publisher_url = f"https://openlibrary.org{publisher_key}.json"
-                        try:
-                            publisher_response = requests.get(publisher_url, timeout=5)
-                            if publisher_response.status_code == 200:
-                                publisher_data = publisher_response.json()
-                                publisher = publisher_data.get('name', 'N/A')
-                        except:
+                        names = resolve_names([publisher_key])
+                        if publisher_key in names:
+                            publisher = names[publisher_key] or 'N/A'
+                        else:
                             publisher = work_data['publishers'][0].get('name', 'N/A')
                     
                     return {
@@ -579,16 +578,18 @@ def search_openlibrary_works(barcode):
         return None
     return None
 
-def search_local_catalog_first(barcode, use_ai_search=False):
+def search_local_catalog_first(barcode, use_ai_search=False, force_refresh=False):
     """
     Busca primeiro no catálogo local, depois usa o motor de busca avançado
     
     Args:
         barcode: Código de barras/ISBN do livro
         use_ai_search: Se True, usa IA como último fallback
+        force_refresh: Se True, ignora o cache de buscas e consulta as fontes novamente
     """
     try:
         # 1. PRIMEIRO: Verificar se já existe no banco de dados Supabase
+        # (em qualquer forma do ISBN: 13 dígitos, 10 dígitos ou como foi lido)
         response = supabase.table('livro').select("""
             id,
             codigo_barras,
@@ -596,7 +597,7 @@ def search_local_catalog_first(barcode, use_ai_search=False):
             autor,
             editora,
             genero:genero-id(nome)
-        """).eq('codigo_barras', barcode).limit(1).execute()
+        """).in_('codigo_barras', isbn_aliases(barcode)).limit(1).execute()
         
         if response.data:
             livro_encontrado = response.data[0]
@@ -614,13 +615,13 @@ def search_local_catalog_first(barcode, use_ai_search=False):
             }
         else:
             # 2. SEGUNDO: Se não existe localmente, usar motor de busca avançado
-            result = search_engine.search_book(isbn=barcode, use_ai=use_ai_search)
+            result = search_engine.search_book(isbn=barcode, use_ai=use_ai_search, force_refresh=force_refresh)
             result['from_local'] = False
             return result
     except Exception as e:
         st.error(f"Erro ao buscar no catálogo local: {e}")
         # Em caso de erro, tentar buscar com motor de busca
-        result = search_engine.search_book(isbn=barcode, use_ai=use_ai_search)
+        result = search_engine.search_book(isbn=barcode, use_ai=use_ai_search, force_refresh=force_refresh)
         result['from_local'] = False
         return result
 
@@ -737,8 +738,8 @@ def check_existing_records(barcode=None, title=None):
     
     try:
         if barcode:
-            # Busca exata por código de barras
-            exact_matches = df[df["Codigo_Barras"] == barcode]
+            # Busca exata por código de barras (ISBN-10 e ISBN-13 do mesmo livro)
+            exact_matches = df[df["Codigo_Barras"].astype(str).isin(isbn_aliases(barcode))]
             if not exact_matches.empty:
                 for _, row in exact_matches.iterrows():
                     matches.append({
@@ -843,28 +844,13 @@ def suggest_genre_with_llm(book_data):
         import requests
         import json
         
-        # Configurar sessão com headers apropriados e configurações robustas
-        session = requests.Session()
-        session.headers.update({
+        # Headers da chamada; retries (429/5xx) e pool de conexões ficam com o transporte compartilhado
+        headers = {
             'Authorization': f'Bearer {config["api_key"]}',
             'Content-Type': 'application/json',
             'User-Agent': 'Book-Cataloger/1.0',
-            'Accept': 'application/json',
-            'Connection': 'keep-alive'
-        })
-        
-        # Configurar adapter com retry e timeout
-        from requests.adapters import HTTPAdapter
-        from urllib3.util.retry import Retry
-        
-        retry_strategy = Retry(
-            total=3,
-            backoff_factor=1,
-            status_forcelist=[429, 500, 502, 503, 504],
-        )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        session.mount("http://", adapter)
-        session.mount("https://", adapter)
+            'Accept': 'application/json'
+        }
         
         # Preparar prompt para sugestão de gênero
         prompt = f"""
@@ -903,12 +889,12 @@ Responda APENAS com o nome do gênero mais adequado, sem explicações adicionai
 
         # Fazer chamada direta para OpenRouter com configurações robustas
         try:
-            response = session.post(
+            response = get_transport().post(
                 "https://openrouter.ai/api/v1/chat/completions",
+                source='openrouter',
+                headers=headers,
                 json=payload,
-                timeout=(10, 30),  # (connect timeout, read timeout)
-                verify=True,
-                allow_redirects=True
+                timeout=(10, 30)  # (connect timeout, read timeout)
             )
         except requests.exceptions.ConnectionError as e:
             st.error(f"❌ Erro de conexão: {str(e)}")
@@ -964,7 +950,7 @@ def search_additional_context(book_data):
             "langRestrict": "pt"
         }
         
-        response = requests.get(url, params=params, timeout=10)
+        response = interactive_get(url, source='google_books', params=params)
         
         if response.status_code == 200:
             data = response.json()
@@ -1120,6 +1106,18 @@ def main():
             - ✅ Integração com works da Open Library
             """)
         
+        # Estatísticas usadas para escolher a ordem das fontes por prefixo de ISBN
+        with st.expander("📈 Desempenho das Fontes por Prefixo de ISBN", expanded=False):
+            source_stats = search_engine.get_source_stats()
+            if source_stats:
+                st.dataframe(pd.DataFrame(source_stats), use_container_width=True, hide_index=True)
+            else:
+                st.info("Nenhuma busca registrada ainda.")
+        
+        # Acertos por camada: memória do processo, SQLite local e Supabase
+        with st.expander("🗄️ Camadas do Cache de Buscas", expanded=False):
+            st.dataframe(pd.DataFrame(search_engine.get_cache_stats()), use_container_width=True, hide_index=True)
+        
         # Botões de gerenciamento de configuração
         col1, col2, col3 = st.columns(3)
         
@@ -1160,28 +1158,13 @@ def main():
                         # Usar requests diretamente para evitar problemas de proxy
                         import requests
                         
-                        # Configurar sessão com headers apropriados e configurações robustas
-                        session = requests.Session()
-                        session.headers.update({
+                        # Headers da chamada; retries (429/5xx) e pool de conexões ficam com o transporte compartilhado
+                        headers = {
                             'Authorization': f'Bearer {config["api_key"]}',
                             'Content-Type': 'application/json',
                             'User-Agent': 'Book-Cataloger/1.0',
-                            'Accept': 'application/json',
-                            'Connection': 'keep-alive'
-                        })
-                        
-                        # Configurar adapter com retry e timeout
-                        from requests.adapters import HTTPAdapter
-                        from urllib3.util.retry import Retry
-                        
-                        retry_strategy = Retry(
-                            total=3,
-                            backoff_factor=1,
-                            status_forcelist=[429, 500, 502, 503, 504],
-                        )
-                        adapter = HTTPAdapter(max_retries=retry_strategy)
-                        session.mount("http://", adapter)
-                        session.mount("https://", adapter)
+                            'Accept': 'application/json'
+                        }
                         
                         # Preparar payload para teste
                         # Remover emoji do nome do modelo
@@ -1195,12 +1178,12 @@ def main():
                         
                         # Fazer chamada direta para OpenRouter com configurações robustas
                         try:
-                            response = session.post(
+                            response = get_transport().post(
                                 "https://openrouter.ai/api/v1/chat/completions",
+                                source='openrouter',
+                                headers=headers,
                                 json=payload,
-                                timeout=(10, 30),  # (connect timeout, read timeout)
-                                verify=True,
-                                allow_redirects=True
+                                timeout=(10, 30)  # (connect timeout, read timeout)
                             )
                         except requests.exceptions.ConnectionError as e:
                             st.error(f"❌ Erro de conexão: {str(e)}")
@@ -1359,6 +1342,7 @@ def main():
             else:
                 # Verificar se deve usar busca com IA
                 use_ai = st.session_state.get("use_ai_search", False)
+                force_refresh = st.session_state.get("force_refresh", False)
                 
                 # Mensagem diferente se usando IA
                 if use_ai:
@@ -1367,7 +1351,7 @@ def main():
                     spinner_msg = "🔍 Buscando dados do livro em múltiplas fontes..."
                 
                 with st.spinner(spinner_msg):
-                    dados_livro = search_local_catalog_first(codigo_barras, use_ai_search=use_ai)
+                    dados_livro = search_local_catalog_first(codigo_barras, use_ai_search=use_ai, force_refresh=force_refresh)
                     sources_used = dados_livro.pop("sources", [])
                     from_local = dados_livro.pop("from_local", False)
                     from_cache = dados_livro.pop("from_cache", False)
@@ -1376,6 +1360,7 @@ def main():
                     st.session_state.from_local = from_local
                     st.session_state.from_cache = from_cache
                     st.session_state.force_search = False
+                    st.session_state.force_refresh = False
                     st.session_state.use_ai_search = False
                     from_autocomplete = False
             
@@ -1386,6 +1371,8 @@ def main():
                 elif from_cache:
                     st.success("✅ Dados encontrados no cache (busca anterior)!")
                     st.info("⚡ **Resultado instantâneo!** Estes dados foram obtidos em uma busca anterior.")
+                    if dados_livro.get("stale"):
+                        st.caption("🔄 Esta busca é antiga; os dados estão sendo atualizados em segundo plano.")
                 else:
                     st.success("✅ Dados do livro encontrados online!")
                 
@@ -1602,6 +1589,18 @@ def main():
             else:
                 st.warning("⚠️ Não foi possível encontrar dados para este código de barras nas fontes online.")
                 
+                if dados_livro and dados_livro.get("invalid_isbn"):
+                    st.caption("⚠️ O código lido não é um ISBN válido (dígito verificador incorreto); as fontes online não foram consultadas.")
+                
+                # Resultado vindo do cache de ISBNs não encontrados
+                if dados_livro and dados_livro.get("from_negative_cache"):
+                    fontes = ", ".join(dados_livro.get("sources_tried", [])) or "nenhuma"
+                    st.caption(f"ℹ️ Este ISBN já foi procurado recentemente sem sucesso (fontes consultadas: {fontes}).")
+                    if st.button("🔄 Forçar Nova Consulta às Fontes"):
+                        st.session_state.force_search = True
+                        st.session_state.force_refresh = True
+                        st.rerun()
+                
                 # Sugestão de usar IA se disponível
                 config = get_openrouter_config()
                 if config.get('enabled', False) and config.get('api_key', ''):
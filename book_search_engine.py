@@ -4,26 +4,203 @@ Orquestração inteligente de múltiplas APIs com cache e fallback
 """
 
 import requests
+import copy
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 import streamlit as st
 
+from cache_utils import SingleFlight, TTLCache
+from http_transport import RETRY_STATUS, HttpTransport, RateLimitExceeded, get_transport
+from isbn_utils import canonical_isbn, canonical_isbns, isbn13_to_isbn10, isbn_aliases
+from local_index import LocalBookIndex, get_local_index
+from search_cache import TieredSearchCache, get_access_tracker, get_search_cache
+from search_telemetry import SearchTelemetry, get_telemetry
+from source_health import (
+    CircuitOpenError, HedgeStats, SourceHealthRegistry, get_health_registry, get_hedge_stats
+)
+from source_ranking import SourceRanking, get_source_ranking
+
+
+# Pool compartilhado pelo processo para consultas simultâneas às APIs
+_SOURCE_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix='book-search')
+
+# Pool separado para resolver nomes (é chamado de dentro das buscas do pool acima)
+_NAME_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix='openlibrary-names')
+
+# Pool das ferramentas chamadas pela IA (search_with_ai). Separado dos demais:
+# as ferramentas usam a cascata e a resolução de nomes, que ocupam os pools acima
+_TOOL_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix='ai-tools')
+
+# Chave da Open Library (/authors/OL...A, /publishers/...) → nome, compartilhado entre buscas
+openlibrary_name_cache = TTLCache(maxsize=5000, ttl_seconds=7 * 24 * 3600)
+
+# Atualizações em segundo plano de entradas de cache vencidas (stale-while-revalidate).
+# Pool próprio: a atualização usa o pool de fontes e não pode ocupá-lo inteiro
+_REFRESH_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix='cache-refresh')
+_REFRESHING = set()
+_REFRESHING_LOCK = threading.Lock()
+
+# ISBN → última tentativa de completar uma entrada incompleta (mas no prazo).
+# Se as fontes não trazem nada novo a entrada não é regravada, então sem isso
+# cada leitura dela agendaria outra atualização
+_INCOMPLETE_REFRESHED = TTLCache(maxsize=20000, ttl_seconds=24 * 3600)
+
+# Protege os dicts de respostas brutas por fonte (archive): nos modos paralelo e
+# hedge a busca retorna antes das fontes atrasadas, que continuam gravando neles
+_ARCHIVE_LOCK = threading.Lock()
+
+# Buscas em cascata em andamento no processo: sessões que leem o mesmo ISBN
+# ao mesmo tempo esperam a mesma busca em vez de repetir as chamadas às APIs
+_CASCADE_FLIGHTS = SingleFlight()
+
+# Motivo da última falha de fonte na thread atual (exceção ou 'HTTP 503'),
+# lido por _call_source para classificar a chamada na telemetria; também guarda
+# o modo lote (batch) e o prazo (deadline, time.monotonic) das chamadas da thread
+_SOURCE_CALL_STATE = threading.local()
+
+
+def _note_source_failure(reason):
+    _SOURCE_CALL_STATE.failure = reason
+
+
+def _take_source_failure():
+    reason = getattr(_SOURCE_CALL_STATE, 'failure', None)
+    _SOURCE_CALL_STATE.failure = None
+    return reason
+
+
+def resolve_openlibrary_names(keys: List[str], transport: Optional[HttpTransport] = None,
+                              max_queue_wait: Optional[float] = None) -> Dict[str, str]:
+    """
+    Resolve chaves de autores/editoras da Open Library em nomes
+    
+    Usa o cache em memória do processo e busca as chaves restantes em paralelo.
+    Chaves que falharem ficam fora do dicionário retornado. max_queue_wait
+    limita a espera no limite de taxa (padrão: a do transporte).
+    """
+    transport = transport or get_transport()
+    names = {}
+    missing = []
+    
+    for key in dict.fromkeys(keys):
+        cached_name = openlibrary_name_cache.get(key)
+        if cached_name is not None:
+            names[key] = cached_name
+        else:
+            missing.append(key)
+    
+    def fetch_name(key: str) -> Optional[str]:
+        try:
+            response = transport.get(f"https://openlibrary.org{key}.json", source='openlibrary_refs',
+                                     max_queue_wait=max_queue_wait)
+            if response.status_code == 200:
+                return response.json().get('name', '')
+        except Exception:
+            pass
+        return None
+    
+    if len(missing) == 1:
+        fetched = [fetch_name(missing[0])]
+    else:
+        fetched = _NAME_EXECUTOR.map(fetch_name, missing)
+    
+    for key, name in zip(missing, fetched):
+        if name is not None:
+            openlibrary_name_cache.set(key, name)
+            names[key] = name
+    
+    return names
+
 
 class BookSearchEngine:
     """Motor de busca inteligente para dados de livros"""
     
-    def __init__(self, supabase_client):
+    def __init__(self, supabase_client, parallel_cascade: bool = False,
+                 transport: Optional[HttpTransport] = None,
+                 source_health: Optional[SourceHealthRegistry] = None,
+                 hedging: bool = False, source_ranking: Optional[SourceRanking] = None,
+                 local_index: Optional[LocalBookIndex] = None,
+                 search_cache: Optional[TieredSearchCache] = None,
+                 telemetry: Optional[SearchTelemetry] = None):
         self.supabase = supabase_client
+        self.http = transport or get_transport()
+        
+        # Latência, taxa de erro e circuit breaker por fonte (compartilhado pelo processo)
+        self.source_health = source_health or get_health_registry()
+        
+        # Histogramas e contadores por fonte e por busca (compartilhado pelo processo)
+        self.telemetry = telemetry or get_telemetry()
+        # Janelas do cache: até cache_duration_days a entrada é usada normalmente;
+        # até cache_stale_days é devolvida na hora (com 'stale') e atualizada em
+        # segundo plano; depois disso é descartada e a busca vai às fontes
         self.cache_duration_days = 30
+        self.cache_stale_days = 365
+        
+        # Camadas do cache: memória do processo → SQLite local (SEARCH_CACHE_PATH)
+        # → cache_api no Supabase; compartilhadas por todas as sessões
+        self.search_cache = search_cache or get_search_cache()
+        
+        # Leituras do cache (qualquer camada) alimentam ultimo_acesso/acessos em
+        # cache_api, usados pelo despejo por LRU/LFU (scripts/evict_search_cache.py)
+        self.access_tracker = get_access_tracker()
+        
+        # ISBNs não encontrados ficam em cache por pouco tempo (novas edições
+        # podem aparecer nas fontes); force_refresh ignora esse cache
+        self.negative_cache_ttl_hours = 6
+        
+        # Entradas incompletas (no prazo) são atualizadas no máximo uma vez por janela
+        self.incomplete_refresh_hours = 24
+        
+        # Arquivo por fonte (tabela cache_api_fontes): a resposta bruta de cada
+        # fonte vale por source_archive_days; nesse prazo a cascata reaproveita a
+        # resposta e só consulta as fontes que ainda não responderam
+        self.source_archive_days = self.cache_duration_days
+        
+        # Índice local (SQLite gerado a partir de dumps): consultado antes de
+        # qualquer fonte de rede, quando o arquivo existe
+        self.local_index = local_index or get_local_index()
+        self.local_sources = ['local_index']
         
         # Configuração de prioridades das APIs
         self.api_priority = [
+            'local_index',
             'openlibrary',
             'google_books',
             'isbndb'
         ]
         
+        # Ordem aprendida: a cada busca, reordena api_priority pela taxa de acerto
+        # e latência de cada fonte no prefixo do ISBN (ex.: 978-85 → Google Books).
+        # Vale para a cascata sequencial; a paralela mescla na ordem de api_priority
+        self.source_ranking = source_ranking or get_source_ranking()
+        self.learned_ordering = True
+        
+        # Modo paralelo: consulta todas as APIs ao mesmo tempo na cascata
+        self.parallel_cascade = parallel_cascade
+        
+        # Hedge (modo sequencial): se a fonte principal passar do seu p90,
+        # dispara a próxima fonte em paralelo e usa a primeira resposta completa
+        self.hedging_enabled = hedging
+        self.hedge_percentile = 90
+        self.hedge_stats: HedgeStats = get_hedge_stats()
+        
+        # Ferramentas pedidas pela IA em um mesmo turno rodam ao mesmo tempo;
+        # as que passarem deste prazo (s) voltam para a IA como erro de tempo esgotado
+        self.ai_tool_turn_timeout = 30
+        
+        # Tamanho dos lotes usados por search_many
+        self.cache_batch_size = 200
+        
+        # Processo de lote (ex.: scripts/warm_search_cache.py): todas as chamadas
+        # aceitam esperas longas no limite de taxa; por padrão só search_many
+        self.batch_requests = False
+        self.openlibrary_batch_size = 50
+        self.google_books_batch_size = 10
+        
         # Tradução de gêneros
         self.genre_translations = {
             'fiction': 'ficção', 'non-fiction': 'não-ficção',
@@ -52,216 +229,746 @@ class BookSearchEngine:
     
     # ==================== CACHE ====================
     
+    def _cache_entry_state(self, cache_entry: Dict) -> str:
+        """Classifica uma linha de cache_api em 'fresh', 'stale' ou 'expired' pela idade"""
+        cached_at = datetime.fromisoformat(cache_entry['cached_at'].replace('Z', '+00:00'))
+        age = datetime.now(cached_at.tzinfo) - cached_at
+        
+        if age.days < self.cache_duration_days:
+            return 'fresh'
+        if age.days < self.cache_stale_days:
+            return 'stale'
+        return 'expired'
+    
+    def _cache_entry_data(self, cache_entry: Dict, state: str) -> Dict:
+        data = json.loads(cache_entry['dados_json'])
+        if state == 'stale':
+            data['stale'] = True
+        return data
+    
+    def _cache_tier_row(self, isbn: str, cache_entry: Dict) -> Dict:
+        """Linha de cache_api copiada para as camadas locais sob o ISBN-13"""
+        return {'isbn': isbn, 'dados_json': cache_entry['dados_json'], 'cached_at': cache_entry['cached_at']}
+    
     def check_cache(self, isbn: str) -> Optional[Dict]:
-        """Verifica se existe resultado em cache válido"""
+        """
+        Verifica se existe resultado em cache utilizável
+        
+        As camadas são consultadas em ordem: memória do processo, SQLite local
+        (se configurado) e a tabela cache_api do Supabase; o que vem do
+        Supabase é copiado para as camadas locais. O cache é indexado pelo
+        ISBN-13; no Supabase a forma de 10 dígitos também é consultada para
+        aproveitar entradas gravadas antes da normalização. Entradas vencidas
+        (mas dentro de cache_stale_days) voltam com 'stale': True.
+        """
+        try:
+            isbn13 = canonical_isbn(isbn)
+            local_entry = self.search_cache.get(isbn13) if isbn13 else None
+            local_state = self._cache_entry_state(local_entry) if local_entry else 'expired'
+            
+            if local_state == 'fresh':
+                self._record_cache_access(isbn13)
+                return self._cache_entry_data(local_entry, local_state)
+        except Exception as e:
+            local_entry, local_state = None, 'expired'
+        
+        try:
+            # Buscar no cache (ISBN-13 primeiro)
+            keys = isbn_aliases(isbn)
+            response = self.supabase.table('cache_api').select('*').in_('isbn', keys).execute()
+            
+            entries = sorted(response.data or [], key=lambda entry: keys.index(entry['isbn']) if entry['isbn'] in keys else len(keys))
+            chosen, chosen_state = None, 'expired'
+            
+            for cache_entry in entries:
+                state = self._cache_entry_state(cache_entry)
+                
+                if state == 'fresh':
+                    # Cache válido!
+                    chosen, chosen_state = cache_entry, state
+                    break
+                
+                if state == 'stale' and chosen is None:
+                    chosen, chosen_state = cache_entry, state
+            
+            self.search_cache.record('supabase', hits=int(chosen is not None), misses=int(chosen is None))
+            
+            if chosen is not None:
+                if isbn13:
+                    self.search_cache.set_many([self._cache_tier_row(isbn13, chosen)])
+                self._record_cache_access(chosen['isbn'])
+                return self._cache_entry_data(chosen, chosen_state)
+        except Exception as e:
+            # Se houver erro no cache, continuar com busca normal
+            pass
+        
+        # Supabase sem entrada (ou fora do ar): usar a vencida da camada local
+        if local_state == 'stale':
+            self._record_cache_access(isbn13)
+            return self._cache_entry_data(local_entry, local_state)
+        return None
+    
+    def save_to_cache(self, isbn: str, data: Dict):
+        """
+        Salva resultado no cache
+        
+        Grava uma linha para o ISBN-13 buscado e outra para cada ISBN que as
+        APIs informaram para a mesma edição (campo 'isbns', se o ISBN buscado
+        está entre eles), assim a leitura de qualquer um deles encontra o cache.
+        """
+        try:
+            # Só é a mesma edição se o ISBN buscado está entre os informados
+            aliases = canonical_isbns(data.get('isbns') or [])
+            if canonical_isbn(isbn) not in aliases:
+                aliases = []
+            keys = canonical_isbns([isbn] + aliases) or [isbn]
+            dados_json = json.dumps(data, ensure_ascii=False)
+            cached_at = datetime.now().isoformat()
+            
+            cache_data = [
+                {'isbn': key, 'dados_json': dados_json, 'cached_at': cached_at}
+                for key in keys
+            ]
+            
+            # Camadas locais primeiro: a próxima leitura no processo não vai à rede
+            self.search_cache.set_many(cache_data)
+            
+            # Usar upsert para inserir ou atualizar
+            self.supabase.table('cache_api').upsert(cache_data).execute()
+        except Exception as e:
+            # Falha no cache não deve impedir o fluxo
+            pass
+    
+    def _record_cache_access(self, isbn: str):
+        """Conta uma leitura da entrada de cache (gravada em lote no Supabase)"""
+        if self.access_tracker.record(isbn):
+            _REFRESH_EXECUTOR.submit(self.flush_cache_access)
+    
+    def flush_cache_access(self):
+        """Grava em cache_api o último acesso e a contagem de leituras acumulados"""
+        pending = self.access_tracker.drain()
+        if not pending:
+            self.access_tracker.finish()
+            return
+        
+        try:
+            self.supabase.rpc('registrar_acessos_cache', {
+                'isbns': list(pending),
+                'contagens': list(pending.values())
+            }).execute()
+            self.access_tracker.finish()
+        except Exception as e:
+            self.access_tracker.finish(failed=pending)
+    
+    def _schedule_refresh(self, isbn: str, stale_data: Dict):
+        """
+        Agenda a atualização em segundo plano de uma entrada vencida ou incompleta (uma por ISBN)
+        
+        Incompletas ainda no prazo são tentadas no máximo uma vez a cada
+        incomplete_refresh_hours.
+        """
+        with _REFRESHING_LOCK:
+            if isbn in _REFRESHING:
+                return
+            if not stale_data.get('stale'):
+                if isbn in _INCOMPLETE_REFRESHED:
+                    return
+                _INCOMPLETE_REFRESHED.set(isbn, True, ttl_seconds=self.incomplete_refresh_hours * 3600)
+            _REFRESHING.add(isbn)
+        
+        def refresh():
+            try:
+                self._refresh_cache_entry(isbn, stale_data)
+            finally:
+                with _REFRESHING_LOCK:
+                    _REFRESHING.discard(isbn)
+        
+        _REFRESH_EXECUTOR.submit(refresh)
+    
+    def _refresh_cache_entry(self, isbn: str, stale_data: Dict):
+        """
+        Busca o ISBN nas fontes e regrava a entrada de cache
+        
+        Se as fontes não trouxerem nada melhor (fora do ar, por exemplo), os dados
+        antigos são regravados para não tentar de novo a cada leitura.
+        """
+        try:
+            result = self._cascade_search(isbn, force_refresh=True, update_cache=False, use_archive=True)
+        except Exception:
+            return
+        
+        improved = result['title'] != 'N/A' and (self.is_complete(result) or not self.is_complete(stale_data))
+        
+        # Entrada ainda no prazo (atualizada por estar incompleta): só regravar
+        # se as fontes preencheram algum campo que faltava
+        if not stale_data.get('stale'):
+            if not improved or len(self._filled_fields(result)) <= len(self._filled_fields(stale_data)):
+                return
+        
+        data = result if improved else stale_data
+        
+        data = {key: value for key, value in data.items() if key != 'stale'}
+        data['from_cache'] = False
+        self.save_to_cache(isbn, data)
+    
+    def check_negative_cache(self, isbn: str) -> Optional[List[str]]:
+        """
+        Verifica se o ISBN foi procurado recentemente sem sucesso
+        
+        Retorna as fontes já consultadas, ou None se não houver registro válido.
+        """
         try:
-            # Buscar no cache
-            response = self.supabase.table('cache_api').select('*').eq('isbn', isbn).execute()
+            isbn = canonical_isbn(isbn) or isbn
+            response = self.supabase.table('cache_api_negativo').select('*').eq('isbn', isbn).execute()
             
             if response.data and len(response.data) > 0:
                 cache_entry = response.data[0]
                 
-                # Verificar se o cache ainda é válido (< 30 dias)
                 cached_at = datetime.fromisoformat(cache_entry['cached_at'].replace('Z', '+00:00'))
                 age = datetime.now(cached_at.tzinfo) - cached_at
                 
-                if age.days < self.cache_duration_days:
-                    # Cache válido!
-                    return json.loads(cache_entry['dados_json'])
+                if age < timedelta(hours=self.negative_cache_ttl_hours):
+                    return cache_entry.get('fontes_consultadas') or []
             
             return None
         except Exception as e:
-            # Se houver erro no cache, continuar com busca normal
             return None
     
-    def save_to_cache(self, isbn: str, data: Dict):
-        """Salva resultado no cache"""
+    def save_negative_cache(self, isbn: str, sources_tried: List[str]):
+        """Registra que o ISBN não foi encontrado nas fontes consultadas"""
         try:
-            cache_data = {
-                'isbn': isbn,
-                'dados_json': json.dumps(data, ensure_ascii=False),
+            self.supabase.table('cache_api_negativo').upsert({
+                'isbn': canonical_isbn(isbn) or isbn,
+                'fontes_consultadas': sources_tried,
                 'cached_at': datetime.now().isoformat()
-            }
-            
-            # Usar upsert para inserir ou atualizar
-            self.supabase.table('cache_api').upsert(cache_data).execute()
+            }).execute()
+        except Exception as e:
+            pass
+    
+    def clear_negative_cache(self, isbn: str):
+        """Remove o registro de ISBN não encontrado"""
+        try:
+            self.supabase.table('cache_api_negativo').delete().eq('isbn', canonical_isbn(isbn) or isbn).execute()
+        except Exception as e:
+            pass
+    
+    # ==================== ARQUIVO POR FONTE ====================
+    
+    def _load_source_archive_rows(self, isbn: str, max_age_days: Optional[int]) -> List[Dict]:
+        """Linhas de cache_api_fontes do ISBN (só as mais novas que max_age_days, se informado)"""
+        try:
+            isbn = canonical_isbn(isbn) or isbn
+            response = self.supabase.table('cache_api_fontes').select('*').eq('isbn', isbn).execute()
+        except Exception as e:
+            return []
+        
+        rows = []
+        for row in response.data or []:
+            try:
+                if max_age_days is not None:
+                    consulted_at = datetime.fromisoformat(row['consultado_em'].replace('Z', '+00:00'))
+                    age = datetime.now(consulted_at.tzinfo) - consulted_at
+                    if age >= timedelta(days=max_age_days):
+                        continue
+                
+                row['payload'] = json.loads(row['payload_json'])
+                rows.append(row)
+            except Exception:
+                continue
+        
+        return rows
+    
+    def load_source_archive(self, isbn: str) -> Dict[str, Dict]:
+        """Respostas brutas ainda válidas do ISBN, por fonte ({} = a fonte não tem o livro)"""
+        rows = self._load_source_archive_rows(isbn, self.source_archive_days)
+        return {row['fonte']: row['payload'] for row in rows}
+    
+    def _filled_fields(self, data: Dict) -> List[str]:
+        """Campos do livro que têm valor"""
+        return [
+            field for field in ['title', 'author', 'publisher', 'genre', 'year', 'cover_url']
+            if data.get(field) and data.get(field) != 'N/A' and str(data.get(field)).strip() != ''
+        ]
+    
+    def _source_archive_row(self, isbn: str, source: str, payload: Dict,
+                            consulted_at: Optional[str] = None) -> Dict:
+        result = self._parse_source_payload(source, payload, isbn)
+        
+        return {
+            'isbn': isbn,
+            'fonte': source,
+            'payload_json': json.dumps(payload, ensure_ascii=False),
+            'dados_json': json.dumps(result, ensure_ascii=False) if result else None,
+            'campos': self._filled_fields(result) if result else [],
+            'consultado_em': consulted_at or datetime.now().isoformat()
+        }
+    
+    def save_source_archive(self, isbn: str, archive: Dict[str, Dict]):
+        """Grava a resposta bruta de cada fonte consultada, com os campos que ela preencheu"""
+        if not archive:
+            return
+        
+        try:
+            isbn = canonical_isbn(isbn) or isbn
+            rows = [self._source_archive_row(isbn, source, payload) for source, payload in archive.items()]
+            self.supabase.table('cache_api_fontes').upsert(rows, on_conflict='isbn,fonte').execute()
+        except Exception as e:
+            pass
+    
+    def _merge_archived_sources(self, combined_data: Dict, archive: Dict[str, Dict],
+                                isbn: Optional[str] = None) -> Dict:
+        """Mescla as respostas arquivadas (do ISBN `isbn`), na ordem de api_priority"""
+        for api_name in self.api_priority:
+            if api_name in archive:
+                result = self._parse_source_payload(api_name, archive[api_name], isbn)
+                if result:
+                    combined_data = self.merge_data(combined_data, result)
+        
+        return combined_data
+    
+    def reparse_source_archive(self, isbn: str) -> Optional[Dict]:
+        """
+        Refaz os dados do ISBN a partir das respostas arquivadas (sem rede)
+        
+        Usado depois de mudanças nos parsers: todas as respostas arquivadas,
+        de qualquer idade, são convertidas de novo; o arquivo e o cache são
+        regravados. Os campos refeitos têm prioridade, mas os que só a entrada
+        atual de cache_api tem (vindos do enriquecimento por título/autor ou do
+        índice local, que não são arquivados) são mantidos. Retorna os dados
+        refeitos, ou None se não houver arquivo.
+        """
+        isbn = canonical_isbn(isbn) or isbn
+        rows = self._load_source_archive_rows(isbn, None)
+        if not rows:
+            return None
+        
+        archive = {row['fonte']: row['payload'] for row in rows}
+        combined_data = self._merge_archived_sources(self._empty_result(), archive, isbn)
+        
+        existing = self.check_cache_many([isbn], track_access=False).get(isbn)
+        if existing:
+            sources = list(dict.fromkeys(list(combined_data['sources']) + list(existing.get('sources') or [])))
+            combined_data = self.merge_data(combined_data, existing)
+            combined_data['sources'] = sources
+        
+        try:
+            updated = [
+                self._source_archive_row(isbn, row['fonte'], row['payload'], row['consultado_em'])
+                for row in rows
+            ]
+            self.supabase.table('cache_api_fontes').upsert(updated, on_conflict='isbn,fonte').execute()
         except Exception as e:
-            # Falha no cache não deve impedir o fluxo
             pass
+        
+        if combined_data['title'] != 'N/A':
+            self.save_to_cache(isbn, combined_data)
+        
+        return combined_data
+    
+    # ==================== SAÚDE DAS FONTES ====================
+    
+    def _get_queue_wait(self, read_timeout: float) -> Optional[float]:
+        """
+        Espera máxima na fila do limite de taxa (e por Retry-After) de uma chamada
+        
+        Buscas interativas esperam no máximo o timeout de leitura da fonte, para
+        não prender um worker do pool por minutos; lotes (search_many, scripts
+        com batch_requests) usam a espera longa do transporte (None).
+        """
+        if self.batch_requests or getattr(_SOURCE_CALL_STATE, 'batch', False):
+            return None
+        return read_timeout
+    
+    def _run_as_batch(self, function, *args):
+        """Executa `function` na thread atual com as esperas longas dos lotes"""
+        _SOURCE_CALL_STATE.batch = True
+        try:
+            return function(*args)
+        finally:
+            _SOURCE_CALL_STATE.batch = False
+    
+    def _get_source_timeout(self, source: str):
+        """Timeout (conexão, leitura) da fonte, com leitura ajustada pelo p95 observado"""
+        connect_timeout, read_timeout = self.http.get_timeout(source)
+        return (connect_timeout, self.source_health.get(source).adaptive_timeout(read_timeout))
+    
+    def _source_get(self, source: str, url: str, **kwargs) -> requests.Response:
+        """
+        GET em uma fonte externa respeitando o circuit breaker
+        
+        Fontes com circuito aberto não são chamadas (CircuitOpenError); latência
+        e erros de cada chamada alimentam a saúde da fonte.
+        """
+        health = self.source_health.get(source)
+        if not health.allow_request():
+            raise CircuitOpenError(source)
+        
+        timeout = self._get_source_timeout(source)
+        
+        # Prazo da thread (turno de ferramentas da IA): não passar dele
+        deadline = getattr(_SOURCE_CALL_STATE, 'deadline', None)
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise requests.exceptions.Timeout(f"Prazo esgotado antes de consultar '{source}'")
+            timeout = (min(timeout[0], remaining), min(timeout[1], remaining))
+        
+        start = time.monotonic()
+        try:
+            response = self.http.get(url, source=source, timeout=timeout,
+                                     max_queue_wait=self._get_queue_wait(timeout[1]), **kwargs)
+        except RateLimitExceeded:
+            health.record_rejected()
+            raise
+        except Exception:
+            health.record_failure(time.monotonic() - start, timeout[1])
+            raise
+        
+        if response.status_code in RETRY_STATUS:
+            health.record_failure(time.monotonic() - start, timeout[1])
+            _note_source_failure(f"HTTP {response.status_code}")
+        else:
+            health.record_success(time.monotonic() - start)
+        
+        return response
+    
+    def is_source_available(self, source: str) -> bool:
+        """Indica se a fonte não está com o circuito aberto"""
+        return self.source_health.get(source).is_available()
+    
+    # ==================== PARSERS DAS RESPOSTAS ====================
+    
+    def _parse_openlibrary(self, data: Dict, author_names: List[str]) -> Dict:
+        """Converte o JSON de uma edição da Open Library no formato padrão"""
+        result = {
+            'title': data.get('title', 'N/A'),
+            'author': 'N/A',
+            'publisher': 'N/A',
+            'genre': 'N/A',
+            'year': 'N/A',
+            'cover_url': None,
+            'source': 'Open Library'
+        }
+        
+        # Autores (nomes já resolvidos a partir das chaves /authors/...)
+        authors = [name for name in author_names if name]
+        if authors:
+            result['author'] = ', '.join(authors)
+        
+        # Editora
+        if 'publishers' in data and data['publishers']:
+            result['publisher'] = data['publishers'][0]
+        
+        # Gênero (subjects)
+        if 'subjects' in data and data['subjects']:
+            result['genre'] = self.translate_genre(data['subjects'][0])
+        
+        # Ano de publicação
+        if 'publish_date' in data:
+            result['year'] = data['publish_date']
+        
+        # Capa
+        if 'covers' in data and data['covers']:
+            cover_id = data['covers'][0]
+            result['cover_url'] = f"https://covers.openlibrary.org/b/id/{cover_id}-L.jpg"
+        
+        # ISBNs da edição (gravados como aliases no cache)
+        result['isbns'] = data.get('isbn_13', []) + data.get('isbn_10', [])
+        
+        return result
+    
+    def _parse_google_books(self, data: Dict, isbn: Optional[str] = None) -> Optional[Dict]:
+        """
+        Converte a resposta de volumes do Google Books no formato padrão
+        
+        A busca q=isbn: pode trazer outra edição primeiro: usa o item que tem o
+        ISBN consultado entre os identificadores. Se nenhum tiver, usa o
+        primeiro sem os ISBNs dele (não são da edição buscada).
+        """
+        if 'items' not in data or len(data['items']) == 0:
+            return None
+        
+        wanted = canonical_isbn(isbn) if isbn else None
+        for item in data['items']:
+            result = self._parse_google_volume(item.get('volumeInfo', {}))
+            if wanted is None or wanted in canonical_isbns(result['isbns']):
+                return result
+        
+        result = self._parse_google_volume(data['items'][0]['volumeInfo'])
+        result['isbns'] = []
+        return result
+    
+    def _parse_google_volume(self, book: Dict) -> Dict:
+        """Converte o volumeInfo de um item do Google Books no formato padrão"""
+        result = {
+            'title': book.get('title', 'N/A'),
+            'author': ', '.join(book.get('authors', [])) if book.get('authors') else 'N/A',
+            'publisher': book.get('publisher', 'N/A'),
+            'genre': 'N/A',
+            'year': 'N/A',
+            'cover_url': None,
+            'source': 'Google Books'
+        }
+        
+        # Gênero (categories)
+        if 'categories' in book and book['categories']:
+            result['genre'] = self.translate_genre(book['categories'][0])
+        
+        # Ano de publicação
+        if 'publishedDate' in book:
+            result['year'] = book['publishedDate'][:4]  # Pegar apenas o ano
+        
+        # Capa
+        if 'imageLinks' in book:
+            result['cover_url'] = book['imageLinks'].get('thumbnail') or book['imageLinks'].get('smallThumbnail')
+        
+        # ISBNs da edição (gravados como aliases no cache)
+        result['isbns'] = [
+            identifier.get('identifier') for identifier in book.get('industryIdentifiers', [])
+            if identifier.get('type') in ('ISBN_13', 'ISBN_10')
+        ]
+        
+        return result
+    
+    def _parse_openlibrary_data(self, book: Dict) -> Dict:
+        """Converte um item de /api/books?jscmd=data (Open Library) no formato padrão"""
+        result = {
+            'title': book.get('title', 'N/A'),
+            'author': 'N/A',
+            'publisher': 'N/A',
+            'genre': 'N/A',
+            'year': book.get('publish_date', 'N/A'),
+            'cover_url': None,
+            'source': 'Open Library'
+        }
+        
+        # Neste formato autores, editoras e assuntos já vêm com o nome resolvido
+        authors = [a.get('name', '') for a in book.get('authors', [])[:3] if a.get('name')]
+        if authors:
+            result['author'] = ', '.join(authors)
+        
+        if book.get('publishers'):
+            result['publisher'] = book['publishers'][0].get('name', 'N/A')
+        
+        if book.get('subjects'):
+            result['genre'] = self.translate_genre(book['subjects'][0].get('name', 'N/A'))
+        
+        if book.get('cover'):
+            result['cover_url'] = book['cover'].get('large') or book['cover'].get('medium')
+        
+        identifiers = book.get('identifiers', {})
+        result['isbns'] = identifiers.get('isbn_13', []) + identifiers.get('isbn_10', [])
+        
+        return result
+    
+    def _parse_isbndb(self, data: Dict) -> Dict:
+        """Converte a resposta da ISBNdb no formato padrão"""
+        book = data.get('book', {})
+        
+        return {
+            'title': book.get('title', 'N/A'),
+            'author': book.get('authors', ['N/A'])[0] if book.get('authors') else 'N/A',
+            'publisher': book.get('publisher', 'N/A'),
+            'genre': book.get('subjects', ['N/A'])[0] if book.get('subjects') else 'N/A',
+            'year': book.get('date_published', 'N/A')[:4] if book.get('date_published') else 'N/A',
+            'cover_url': book.get('image'),
+            'isbns': [value for value in (book.get('isbn13'), book.get('isbn')) if value],
+            'source': 'ISBNdb'
+        }
+    
+    def _parse_local_index(self, row: Dict) -> Dict:
+        """Converte uma linha do índice local no formato padrão"""
+        return {
+            'title': row.get('title') or 'N/A',
+            'author': row.get('author') or 'N/A',
+            'publisher': row.get('publisher') or 'N/A',
+            'genre': self.translate_genre(row['genre']) if row.get('genre') else 'N/A',
+            'year': row.get('year') or 'N/A',
+            'cover_url': row.get('cover_url') or None,
+            'source': row.get('source') or 'Índice Local'
+        }
+    
+    def _parse_title_author(self, data: Dict) -> Optional[Dict]:
+        """Converte a resposta da busca por título/autor (Google Books) no formato padrão"""
+        if data.get("totalItems", 0) <= 0 or not data.get("items"):
+            return None
+        
+        book = data["items"][0]["volumeInfo"]
+        
+        # Buscar ISBN
+        isbn = 'N/A'
+        if 'industryIdentifiers' in book:
+            for identifier in book['industryIdentifiers']:
+                if identifier['type'] in ['ISBN_13', 'ISBN_10']:
+                    isbn = identifier['identifier']
+                    break
+        
+        return {
+            'title': book.get('title', 'N/A'),
+            'author': ', '.join(book.get('authors', [])) if book.get('authors') else 'N/A',
+            'publisher': book.get('publisher', 'N/A'),
+            'genre': self.translate_genre(', '.join(book.get('categories', ['N/A']))) if book.get('categories') else 'N/A',
+            'year': book.get('publishedDate', 'N/A')[:4] if book.get('publishedDate') else 'N/A',
+            'cover_url': book['imageLinks'].get('thumbnail') if 'imageLinks' in book else None,
+            'isbn': isbn,
+            'source': 'Google Books (Título/Autor)'
+        }
+    
+    def _get_isbndb_api_key(self) -> Optional[str]:
+        """Retorna a API key da ISBNdb configurada nos secrets (se houver)"""
+        try:
+            if 'isbndb' not in st.secrets or 'api_key' not in st.secrets['isbndb']:
+                return None
+            return st.secrets['isbndb']['api_key']
+        except Exception:
+            return None
     
     # ==================== APIs INDIVIDUAIS ====================
     
-    def search_openlibrary(self, isbn: str) -> Optional[Dict]:
-        """Busca na Open Library API"""
+    def search_local_index(self, isbn: str) -> Optional[Dict]:
+        """Busca no índice local (sem rede)"""
+        if self.local_index is None:
+            return None
+        
+        try:
+            row = self.local_index.lookup(isbn)
+            if row:
+                return self._parse_local_index(row)
+        except Exception as e:
+            return None
+        
+        return None
+    
+    # fetch_*: resposta bruta da fonte, usada pelo arquivo por fonte
+    # (dict; {} = a fonte respondeu que não tem o livro; None = erro/indisponível)
+    
+    def fetch_openlibrary(self, isbn: str) -> Optional[Dict]:
+        """Edição da Open Library e nomes dos autores já resolvidos"""
         try:
             url = f"https://openlibrary.org/isbn/{isbn}.json"
-            response = requests.get(url, timeout=10)
+            response = self._source_get('openlibrary', url)
             
             if response.status_code == 200:
                 data = response.json()
                 
-                result = {
-                    'title': data.get('title', 'N/A'),
-                    'author': 'N/A',
-                    'publisher': 'N/A',
-                    'genre': 'N/A',
-                    'year': 'N/A',
-                    'cover_url': None,
-                    'source': 'Open Library'
-                }
-                
-                # Buscar autores
-                if 'authors' in data and data['authors']:
-                    authors = []
-                    for author_ref in data['authors'][:3]:  # Máximo 3 autores
-                        try:
-                            author_url = f"https://openlibrary.org{author_ref['key']}.json"
-                            author_response = requests.get(author_url, timeout=5)
-                            if author_response.status_code == 200:
-                                author_data = author_response.json()
-                                authors.append(author_data.get('name', ''))
-                        except:
-                            continue
-                    
-                    if authors:
-                        result['author'] = ', '.join(authors)
-                
-                # Editora
-                if 'publishers' in data and data['publishers']:
-                    result['publisher'] = data['publishers'][0]
-                
-                # Gênero (subjects)
-                if 'subjects' in data and data['subjects']:
-                    result['genre'] = self.translate_genre(data['subjects'][0])
+                # Buscar autores (máximo 3, com cache e em paralelo)
+                author_keys = [ref['key'] for ref in data.get('authors', [])[:3] if ref.get('key')]
+                queue_wait = self._get_queue_wait(self.http.get_timeout('openlibrary_refs')[1])
+                names = resolve_openlibrary_names(author_keys, self.http, queue_wait)
+                authors = [names.get(key, '') for key in author_keys]
                 
-                # Ano de publicação
-                if 'publish_date' in data:
-                    result['year'] = data['publish_date']
-                
-                # Capa
-                if 'covers' in data and data['covers']:
-                    cover_id = data['covers'][0]
-                    result['cover_url'] = f"https://covers.openlibrary.org/b/id/{cover_id}-L.jpg"
-                
-                return result
+                return {'edition': data, 'author_names': authors}
+            
+            if response.status_code == 404:
+                return {}
         except Exception as e:
+            _note_source_failure(e)
             return None
         
         return None
     
-    def search_google_books(self, isbn: str) -> Optional[Dict]:
-        """Busca na Google Books API"""
+    def fetch_google_books(self, isbn: str) -> Optional[Dict]:
+        """Resposta de volumes do Google Books para o ISBN"""
         try:
             url = f"https://www.googleapis.com/books/v1/volumes?q=isbn:{isbn}"
-            response = requests.get(url, timeout=10)
+            response = self._source_get('google_books', url)
             
             if response.status_code == 200:
-                data = response.json()
-                
-                if 'items' in data and len(data['items']) > 0:
-                    book = data['items'][0]['volumeInfo']
-                    
-                    result = {
-                        'title': book.get('title', 'N/A'),
-                        'author': ', '.join(book.get('authors', [])) if book.get('authors') else 'N/A',
-                        'publisher': book.get('publisher', 'N/A'),
-                        'genre': 'N/A',
-                        'year': 'N/A',
-                        'cover_url': None,
-                        'source': 'Google Books'
-                    }
-                    
-                    # Gênero (categories)
-                    if 'categories' in book and book['categories']:
-                        result['genre'] = self.translate_genre(book['categories'][0])
-                    
-                    # Ano de publicação
-                    if 'publishedDate' in book:
-                        result['year'] = book['publishedDate'][:4]  # Pegar apenas o ano
-                    
-                    # Capa
-                    if 'imageLinks' in book:
-                        result['cover_url'] = book['imageLinks'].get('thumbnail') or book['imageLinks'].get('smallThumbnail')
-                    
-                    return result
+                return response.json()
         except Exception as e:
+            _note_source_failure(e)
             return None
         
         return None
     
-    def search_isbndb(self, isbn: str) -> Optional[Dict]:
-        """Busca na ISBNdb API (requer API key)"""
+    def fetch_isbndb(self, isbn: str) -> Optional[Dict]:
+        """Resposta da ISBNdb para o ISBN (requer API key)"""
         try:
             # Verificar se há API key configurada
-            if 'isbndb' not in st.secrets or 'api_key' not in st.secrets['isbndb']:
+            api_key = self._get_isbndb_api_key()
+            if not api_key:
+                _note_source_failure('no_api_key')
                 return None
             
-            api_key = st.secrets['isbndb']['api_key']
             url = f"https://api2.isbndb.com/book/{isbn}"
             headers = {'Authorization': api_key}
             
-            response = requests.get(url, headers=headers, timeout=10)
+            response = self._source_get('isbndb', url, headers=headers)
             
             if response.status_code == 200:
-                data = response.json()
-                book = data.get('book', {})
-                
-                result = {
-                    'title': book.get('title', 'N/A'),
-                    'author': book.get('authors', ['N/A'])[0] if book.get('authors') else 'N/A',
-                    'publisher': book.get('publisher', 'N/A'),
-                    'genre': book.get('subjects', ['N/A'])[0] if book.get('subjects') else 'N/A',
-                    'year': book.get('date_published', 'N/A')[:4] if book.get('date_published') else 'N/A',
-                    'cover_url': book.get('image'),
-                    'source': 'ISBNdb'
-                }
-                
-                return result
+                return response.json()
+            
+            if response.status_code == 404:
+                return {}
+        except Exception as e:
+            _note_source_failure(e)
+            return None
+        
+        return None
+    
+    def _get_fetch_functions(self) -> Dict:
+        """Fontes com resposta bruta arquivável → função que a obtém"""
+        return {
+            'openlibrary': self.fetch_openlibrary,
+            'google_books': self.fetch_google_books,
+            'isbndb': self.fetch_isbndb
+        }
+    
+    def _parse_source_payload(self, source: str, payload: Optional[Dict],
+                              isbn: Optional[str] = None) -> Optional[Dict]:
+        """
+        Converte a resposta bruta de uma fonte no formato padrão (None se não tem o livro)
+        
+        `isbn` é o ISBN consultado, usado para escolher o item certo quando a
+        fonte devolve várias edições (Google Books).
+        """
+        if not payload:
+            return None
+        
+        try:
+            if source == 'openlibrary':
+                return self._parse_openlibrary(payload['edition'], payload.get('author_names', []))
+            if source == 'google_books':
+                return self._parse_google_books(payload, isbn)
+            if source == 'isbndb':
+                return self._parse_isbndb(payload) if payload.get('book') else None
         except Exception as e:
             return None
         
         return None
     
+    def search_openlibrary(self, isbn: str) -> Optional[Dict]:
+        """Busca na Open Library API"""
+        return self._parse_source_payload('openlibrary', self.fetch_openlibrary(isbn), isbn)
+    
+    def search_google_books(self, isbn: str) -> Optional[Dict]:
+        """Busca na Google Books API"""
+        return self._parse_source_payload('google_books', self.fetch_google_books(isbn), isbn)
+    
+    def search_isbndb(self, isbn: str) -> Optional[Dict]:
+        """Busca na ISBNdb API (requer API key)"""
+        return self._parse_source_payload('isbndb', self.fetch_isbndb(isbn), isbn)
+    
     # ==================== BUSCA POR TÍTULO/AUTOR ====================
     
+    def _build_title_author_query(self, title: str, author: str = None) -> str:
+        """Monta a query do Google Books para busca por título/autor"""
+        query_parts = [f"intitle:{title}"]
+        if author:
+            query_parts.append(f"inauthor:{author}")
+        
+        return ' '.join(query_parts)
+    
     def search_by_title_author(self, title: str, author: str = None) -> Optional[Dict]:
         """Busca por título e autor como fallback"""
         try:
             # Tentar Google Books primeiro (melhor para busca por título)
-            query_parts = [f"intitle:{title}"]
-            if author:
-                query_parts.append(f"inauthor:{author}")
-            
-            query = ' '.join(query_parts)
+            query = self._build_title_author_query(title, author)
             url = f"https://www.googleapis.com/books/v1/volumes?q={query}&maxResults=1"
-            response = requests.get(url, timeout=10)
+            response = self._source_get('google_books', url)
             
             if response.status_code == 200:
-                data = response.json()
-                
-                if data.get("totalItems", 0) > 0:
-                    book = data["items"][0]["volumeInfo"]
-                    
-                    # Buscar ISBN
-                    isbn = 'N/A'
-                    if 'industryIdentifiers' in book:
-                        for identifier in book['industryIdentifiers']:
-                            if identifier['type'] in ['ISBN_13', 'ISBN_10']:
-                                isbn = identifier['identifier']
-                                break
-                    
-                    result = {
-                        'title': book.get('title', 'N/A'),
-                        'author': ', '.join(book.get('authors', [])) if book.get('authors') else 'N/A',
-                        'publisher': book.get('publisher', 'N/A'),
-                        'genre': self.translate_genre(', '.join(book.get('categories', ['N/A']))) if book.get('categories') else 'N/A',
-                        'year': book.get('publishedDate', 'N/A')[:4] if book.get('publishedDate') else 'N/A',
-                        'cover_url': book['imageLinks'].get('thumbnail') if 'imageLinks' in book else None,
-                        'isbn': isbn,
-                        'source': 'Google Books (Título/Autor)'
-                    }
-                    
-                    return result
+                return self._parse_title_author(response.json())
         except Exception as e:
             pass
         
@@ -306,7 +1013,7 @@ class BookSearchEngine:
                 for isbn_variant in [isbn_match, f"ISBN {isbn_match}", f"ISBN-{isbn_match[:3]}-{isbn_match[3:]}"]:
                     try:
                         gb_url = f"https://www.googleapis.com/books/v1/volumes?q=isbn:{isbn_match}"
-                        gb_response = requests.get(gb_url, timeout=8)
+                        gb_response = self._source_get('google_books', gb_url)
                         debug_log.append(f"Google Books Search: status {gb_response.status_code}")
                         
                         if gb_response.status_code == 200:
@@ -347,7 +1054,7 @@ class BookSearchEngine:
             if isbn_match and len(isbn_match) >= 10 and not results:
                 try:
                     ol_url = f"https://openlibrary.org/api/books?bibkeys=ISBN:{isbn_match}&format=json&jscmd=data"
-                    ol_response = requests.get(ol_url, timeout=8)
+                    ol_response = self._source_get('openlibrary', ol_url)
                     debug_log.append(f"Open Library Search: status {ol_response.status_code}")
                     
                     if ol_response.status_code == 200:
@@ -387,7 +1094,7 @@ class BookSearchEngine:
                     # WorldCat tem endpoint público
                     wc_url = f"https://www.worldcat.org/search?q=bn:{isbn_match}&qt=advanced&dblist=638"
                     headers = {'User-Agent': 'Mozilla/5.0'}
-                    wc_response = requests.get(wc_url, headers=headers, timeout=8, allow_redirects=True)
+                    wc_response = self._source_get('worldcat', wc_url, headers=headers, allow_redirects=True)
                     debug_log.append(f"WorldCat: status {wc_response.status_code}")
                     
                     if wc_response.status_code == 200:
@@ -422,7 +1129,7 @@ class BookSearchEngine:
                         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
                     }
                     
-                    google_response = requests.get(google_url, headers=headers, timeout=10)
+                    google_response = self._source_get('google_search', google_url, headers=headers)
                     
                     if google_response.status_code == 200:
                         import re
@@ -456,7 +1163,7 @@ class BookSearchEngine:
                 try:
                     # API pública do Mercado Editorial
                     me_url = f"https://www.mercadoeditorial.org/api/books/isbn/{isbn_match}"
-                    me_response = requests.get(me_url, timeout=8)
+                    me_response = self._source_get('mercado_editorial', me_url)
                     
                     if me_response.status_code == 200:
                         me_data = me_response.json()
@@ -473,7 +1180,7 @@ class BookSearchEngine:
                 try:
                     # Tentar ISBN Search Brazil
                     isb_url = f"https://api.isbn.org.br/books/{isbn_match}"
-                    isb_response = requests.get(isb_url, timeout=8)
+                    isb_response = self._source_get('isbn_brazil', isb_url)
                     
                     if isb_response.status_code == 200:
                         isb_data = isb_response.json()
@@ -576,6 +1283,73 @@ class BookSearchEngine:
             "available_isbns": list(brazilian_books.keys())[:3]
         }, ensure_ascii=False)
     
+    def _execute_tool(self, function_name: str, function_args: Dict) -> str:
+        """Executa uma ferramenta pedida pela IA e retorna a resposta em JSON"""
+        if function_name == 'brazilian_books_database':
+            return self._tool_brazilian_books_database(function_args.get('isbn', ''))
+        if function_name == 'web_search':
+            return self._tool_web_search(function_args.get('query', ''))
+        if function_name == 'search_google_books':
+            return self._tool_search_google_books(function_args.get('isbn', ''))
+        if function_name == 'search_openlibrary':
+            return self._tool_search_openlibrary(function_args.get('isbn', ''))
+        if function_name == 'search_by_title':
+            return self._tool_search_by_title(
+                function_args.get('title', ''),
+                function_args.get('author')
+            )
+        return json.dumps({"error": "Função desconhecida"})
+    
+    def _execute_tool_with_deadline(self, deadline: float, function_name: str, function_args: Dict) -> str:
+        """_execute_tool com as consultas às fontes limitadas ao prazo do turno"""
+        _SOURCE_CALL_STATE.deadline = deadline
+        try:
+            return self._execute_tool(function_name, function_args)
+        finally:
+            _SOURCE_CALL_STATE.deadline = None
+    
+    def _execute_tool_calls(self, tool_calls: List[Dict]) -> List[Tuple[str, Dict, str]]:
+        """
+        Executa ao mesmo tempo as ferramentas pedidas em um turno da IA
+        
+        Retorna (nome, argumentos, resposta JSON) na ordem de tool_calls. Quem
+        não terminar em ai_tool_turn_timeout recebe um erro de tempo esgotado,
+        então o turno custa a ferramenta mais lenta. As consultas às fontes
+        herdam o prazo do turno (timeout e fila limitados ao tempo restante), e
+        uma ferramenta atrasada libera o worker logo depois dele em vez de
+        segurá-lo até suas chamadas HTTP terminarem. Não usa st.*: roda fora
+        da thread do Streamlit.
+        """
+        calls = []
+        for tool_call in tool_calls:
+            function_name = tool_call['function']['name']
+            function_args = json.loads(tool_call['function']['arguments'])
+            calls.append((function_name, function_args))
+        
+        deadline = time.monotonic() + self.ai_tool_turn_timeout
+        futures = [
+            _TOOL_EXECUTOR.submit(self._execute_tool_with_deadline, deadline, name, args)
+            for name, args in calls
+        ]
+        wait(futures, timeout=self.ai_tool_turn_timeout)
+        
+        results = []
+        for (function_name, function_args), future in zip(calls, futures):
+            if not future.done():
+                future.cancel()
+                function_response = json.dumps({
+                    "error": f"Tempo esgotado ({self.ai_tool_turn_timeout}s)",
+                    "recommendation": "Use os resultados das outras tools"
+                }, ensure_ascii=False)
+            else:
+                try:
+                    function_response = future.result()
+                except Exception as e:
+                    function_response = json.dumps({"error": str(e)}, ensure_ascii=False)
+            results.append((function_name, function_args, function_response))
+        
+        return results
+    
     def get_available_tools(self):
         """Define as ferramentas disponíveis para a IA"""
         return [
@@ -817,14 +1591,13 @@ IMPORTANTE: NUNCA retorne texto livre. SEMPRE retorne JSON no formato acima!
 
 COMECE AGORA usando as ferramentas! ISBN brasileiro? Use brazilian_books_database PRIMEIRO!"""
             
-            # Fazer chamada para OpenRouter
-            session = requests.Session()
-            session.headers.update({
+            # Chamadas ao OpenRouter passam pelo transporte compartilhado (gravação/reprodução incluídas)
+            headers = {
                 'Authorization': f'Bearer {config["api_key"]}',
                 'Content-Type': 'application/json',
                 'HTTP-Referer': 'https://github.com/book-cataloger',
                 'X-Title': 'Book Cataloger'
-            })
+            }
             
             # Messages iniciais
             messages = [
@@ -858,10 +1631,11 @@ COMECE AGORA usando as ferramentas! ISBN brasileiro? Use brazilian_books_databas
                     iteration += 1
                     
                     # Fazer chamada
-                    response = session.post(
+                    response = self.http.post(
                         "https://openrouter.ai/api/v1/chat/completions",
-                        json=payload,
-                        timeout=(10, 60)
+                        source='openrouter',
+                        headers=headers,
+                        json=payload
                     )
                     
                     if response.status_code != 200:
@@ -888,21 +1662,20 @@ COMECE AGORA usando as ferramentas! ISBN brasileiro? Use brazilian_books_databas
                     if message.get('tool_calls'):
                         st.info(f"🔧 IA está usando ferramentas de pesquisa... (iteração {iteration})")
                         
-                        # Processar cada tool call
+                        # Anunciar as chamadas aqui: st.* só roda na thread do Streamlit
                         for tool_call in message['tool_calls']:
                             function_name = tool_call['function']['name']
-                            function_args = json.loads(tool_call['function']['arguments'])
-                            
-                            st.caption(f"📡 Chamando: {function_name}({function_args})")
-                            
-                            # Executar a função correspondente
-                            if function_name == 'brazilian_books_database':
-                                function_response = self._tool_brazilian_books_database(function_args.get('isbn', ''))
-                            elif function_name == 'web_search':
+                            st.caption(f"📡 Chamando: {function_name}({tool_call['function']['arguments']})")
+                            if function_name == 'web_search':
                                 st.info("🌐 Executando web_search multi-fonte...")
-                                function_response = self._tool_web_search(function_args.get('query', ''))
-                                
-                                # Mostrar debug
+                        
+                        # Executar todas as tool calls do turno ao mesmo tempo
+                        tool_results = self._execute_tool_calls(message['tool_calls'])
+                        
+                        # Processar os resultados na ordem das tool calls
+                        for tool_call, (function_name, function_args, function_response) in zip(message['tool_calls'], tool_results):
+                            # Mostrar debug
+                            if function_name == 'web_search':
                                 try:
                                     resp_data = json.loads(function_response)
                                     if 'debug' in resp_data:
@@ -911,18 +1684,6 @@ COMECE AGORA usando as ferramentas! ISBN brasileiro? Use brazilian_books_databas
                                                 st.caption(log)
                                 except:
                                     pass
-                                    
-                            elif function_name == 'search_google_books':
-                                function_response = self._tool_search_google_books(function_args.get('isbn', ''))
-                            elif function_name == 'search_openlibrary':
-                                function_response = self._tool_search_openlibrary(function_args.get('isbn', ''))
-                            elif function_name == 'search_by_title':
-                                function_response = self._tool_search_by_title(
-                                    function_args.get('title', ''),
-                                    function_args.get('author')
-                                )
-                            else:
-                                function_response = json.dumps({"error": "Função desconhecida"})
                             
                             # Armazenar resultado para fallback
                             try:
@@ -1233,6 +1994,10 @@ COMECE AGORA usando as ferramentas! ISBN brasileiro? Use brazilian_books_databas
                 if enrichment.get(field) and enrichment.get(field) != 'N/A':
                     merged[field] = enrichment[field]
         
+        # ISBNs da mesma edição informados pelas fontes
+        if enrichment.get('isbns'):
+            merged['isbns'] = list(dict.fromkeys(list(merged.get('isbns') or []) + list(enrichment['isbns'])))
+        
         # Adicionar fontes usadas
         if 'sources' not in merged:
             merged['sources'] = []
@@ -1247,24 +2012,294 @@ COMECE AGORA usando as ferramentas! ISBN brasileiro? Use brazilian_books_databas
         
         return merged
     
-    def cascade_search(self, isbn: str) -> Dict:
+    def _get_api_functions(self) -> Dict:
+        """Mapeia o nome de cada API para sua função de busca"""
+        api_functions = {
+            'openlibrary': self.search_openlibrary,
+            'google_books': self.search_google_books,
+            'isbndb': self.search_isbndb
+        }
+        
+        if self.local_index is not None:
+            api_functions['local_index'] = self.search_local_index
+        
+        return api_functions
+    
+    def _sources_answered_miss(self, answered: Dict[str, Dict]) -> Optional[List[str]]:
         """
-        Busca em cascata com enriquecimento de dados
+        Fontes que responderam sem o livro, ou None se alguma não respondeu
         
-        1. Verifica cache
-        2. Busca em ordem de prioridade até encontrar dados completos
-        3. Enriquece dados parciais com outras APIs
-        4. Salva no cache
+        `answered` são as respostas brutas recebidas (arquivo por fonte); a
+        ISBNdb sem API key não é exigida, e as fontes locais sempre respondem.
         """
+        fetch_functions = self._get_fetch_functions()
+        api_functions = self._get_api_functions()
         
-        # 1. VERIFICAR CACHE
-        cached_result = self.check_cache(isbn)
-        if cached_result:
-            cached_result['from_cache'] = True
-            return cached_result
+        for api_name in fetch_functions:
+            if api_name == 'isbndb' and not self._get_isbndb_api_key():
+                continue
+            if api_name not in answered:
+                return None
+        
+        return [
+            api_name for api_name in self.api_priority
+            if api_name in api_functions and (api_name in answered or api_name in self.local_sources)
+        ]
+    
+    def _search_local_sources(self, isbn: str, combined_data: Dict) -> Dict:
+        """Consulta as fontes locais (sem rede), na ordem de api_priority"""
+        api_functions = self._get_api_functions()
+        
+        for api_name in self.api_priority:
+            if api_name in self.local_sources and api_name in api_functions:
+                result = self._call_source(api_name, isbn)
+                if result:
+                    combined_data = self.merge_data(combined_data, result)
+        
+        return combined_data
+    
+    def get_source_order(self, isbn: str) -> List[str]:
+        """Ordem das fontes de rede para este ISBN (aprendida por prefixo ou api_priority)"""
+        network_sources = [api_name for api_name in self.api_priority if api_name not in self.local_sources]
+        if not self.learned_ordering:
+            return network_sources
+        return self.source_ranking.rank(isbn, network_sources)
+    
+    def get_telemetry_snapshot(self) -> Dict:
+        """
+        Métricas do motor: latência e resultados por fonte, tempo total das
+        buscas, acertos por camada do cache e estatísticas do hedge
+        """
+        snapshot = self.telemetry.snapshot()
+        snapshot['cache'] = self.get_cache_stats()
+        snapshot['hedging'] = self.get_hedge_stats()
+        return snapshot
+    
+    def get_cache_stats(self) -> List[Dict]:
+        """Acertos e falhas por camada do cache (memória, SQLite, Supabase)"""
+        return self.search_cache.snapshot()
+    
+    def get_source_stats(self) -> List[Dict]:
+        """Taxa de acerto e latência média por prefixo de ISBN e fonte (debug)"""
+        return self.source_ranking.snapshot()
+    
+    def _call_source(self, api_name: str, isbn: str, archive: Optional[Dict] = None) -> Optional[Dict]:
+        """
+        Chama a busca da fonte e registra o resultado para a ordem aprendida
+        
+        Com `archive`, a resposta bruta da fonte (quando houver) é guardada
+        nele para ser gravada em cache_api_fontes.
+        """
+        start = time.monotonic()
+        fetch_functions = self._get_fetch_functions()
+        _take_source_failure()
+        
+        if api_name in fetch_functions:
+            payload = fetch_functions[api_name](isbn)
+            result = self._parse_source_payload(api_name, payload, isbn)
+            if archive is not None and payload is not None:
+                with _ARCHIVE_LOCK:
+                    archive[api_name] = payload
+        else:
+            payload = result = self._get_api_functions()[api_name](isbn)
+        
+        elapsed = time.monotonic() - start
+        
+        if result:
+            outcome = 'success'
+        elif payload is not None or api_name not in fetch_functions:
+            outcome = 'miss'
+        else:
+            outcome = self._failure_outcome(_take_source_failure())
+        
+        # Recusa da fila local do limite de taxa não diz nada sobre a fonte
+        if outcome != 'rate_limited':
+            self.source_ranking.record(isbn, api_name, bool(result), elapsed)
+        
+        if outcome:
+            self.telemetry.record_source(api_name, outcome, elapsed)
+        
+        return result
+    
+    def _failure_outcome(self, reason) -> Optional[str]:
+        """Classifica a falha de uma fonte para a telemetria (None = não registrar)"""
+        if reason == 'no_api_key':
+            return None
+        if isinstance(reason, CircuitOpenError):
+            return 'circuit_open'
+        if isinstance(reason, RateLimitExceeded):
+            return 'rate_limited'
+        if isinstance(reason, requests.exceptions.Timeout):
+            return 'timeout'
+        return 'error'
+    
+    def _search_hedged(self, isbn: str, combined_data: Dict, primary: str, backup: str,
+                       archive: Optional[Dict] = None) -> Tuple[Dict, List[str]]:
+        """
+        Consulta a fonte principal com hedge
+        
+        Se ela não responder dentro do seu p90 observado, a fonte reserva é
+        disparada em paralelo; vale a primeira resposta que completar os dados.
+        Retorna os dados mesclados e as fontes consultadas.
+        """
+        hedge_delay = self.source_health.get(primary).percentile(self.hedge_percentile)
+        
+        futures = {_SOURCE_EXECUTOR.submit(self._call_source, primary, isbn, archive): primary}
+        fired = False
+        backup_won = False
+        
+        # Sem histórico de latência ainda: aguardar a principal normalmente
+        if hedge_delay is not None:
+            done, _ = wait(futures, timeout=hedge_delay)
+            if not done:
+                fired = True
+                futures[_SOURCE_EXECUTOR.submit(self._call_source, backup, isbn, archive)] = backup
+        
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception:
+                result = None
+            
+            if result:
+                combined_data = self.merge_data(combined_data, result)
+                if self.is_complete(combined_data):
+                    backup_won = futures[future] == backup
+                    break
+        
+        for future in futures:
+            future.cancel()
+        
+        self.hedge_stats.record(fired, backup_won)
+        return combined_data, list(futures.values())
+    
+    def get_hedge_stats(self) -> Dict:
+        """Com que frequência o hedge dispara e quantas vezes a reserva vence"""
+        return self.hedge_stats.snapshot()
+    
+    def _search_sources_sequential(self, isbn: str, combined_data: Dict,
+                                   archive: Optional[Dict] = None) -> Dict:
+        """
+        Consulta as APIs uma a uma, em ordem de prioridade
+        
+        Fontes que já estão em `archive` (respondidas recentemente) não são
+        chamadas de novo; as respostas novas são guardadas nele.
+        """
+        api_functions = self._get_api_functions()
+        archived = set(archive or {})
+        available = [
+            api_name for api_name in self.get_source_order(isbn)
+            if api_name in api_functions and api_name not in archived and self.is_source_available(api_name)
+        ]
+        
+        if self.hedging_enabled and len(available) >= 2:
+            combined_data, consulted = self._search_hedged(isbn, combined_data, available[0], available[1], archive)
+            if self.is_complete(combined_data):
+                return combined_data
+            
+            available = [api_name for api_name in available if api_name not in consulted]
+        
+        for api_name in available:
+            result = self._call_source(api_name, isbn, archive)
+            
+            if result:
+                combined_data = self.merge_data(combined_data, result)
+                
+                # Se já está completo, parar
+                if self.is_complete(combined_data):
+                    break
+        
+        return combined_data
+    
+    def _search_sources_parallel(self, isbn: str, combined_data: Dict,
+                                 archive: Optional[Dict] = None) -> Dict:
+        """
+        Consulta todas as APIs ao mesmo tempo
+        
+        Os resultados são mesclados na ordem fixa de api_priority (não na de
+        chegada), então fontes que discordam dão sempre o mesmo resultado. A
+        busca termina assim que as fontes que já responderam, do início dessa
+        ordem, completam os dados; as respostas atrasadas são ignoradas.
+        Fontes que já estão em `archive` não são chamadas de novo.
+        """
+        api_functions = self._get_api_functions()
+        archived = set(archive or {})
+        futures = {}
+        
+        for api_name in self.api_priority:
+            if api_name in self.local_sources:
+                continue
+            if api_name in api_functions and api_name not in archived and self.is_source_available(api_name):
+                futures[_SOURCE_EXECUTOR.submit(self._call_source, api_name, isbn, archive)] = api_name
+        
+        order = list(futures.values())
+        results = {}
+        
+        try:
+            for future in as_completed(futures):
+                try:
+                    results[futures[future]] = future.result()
+                except Exception:
+                    results[futures[future]] = None
+                
+                # Se as primeiras fontes da ordem já completam os dados, não esperar as demais
+                merged = self._merge_in_order(combined_data, order, results, prefix_only=True)
+                if self.is_complete(merged):
+                    return merged
+        finally:
+            # Cancelar o que ainda não começou; o restante termina em segundo plano
+            for future in futures:
+                future.cancel()
+        
+        return self._merge_in_order(combined_data, order, results)
+    
+    def _merge_in_order(self, combined_data: Dict, order: List[str], results: Dict[str, Optional[Dict]],
+                        prefix_only: bool = False) -> Dict:
+        """
+        Mescla os resultados das fontes na ordem de `order`
+        
+        prefix_only=True para na primeira fonte que ainda não respondeu.
+        """
+        for api_name in order:
+            if api_name not in results:
+                if prefix_only:
+                    break
+                continue
+            if results[api_name]:
+                combined_data = self.merge_data(combined_data, results[api_name])
+        
+        return combined_data
+    
+    def cascade_search(self, isbn: str, parallel: Optional[bool] = None,
+                       force_refresh: bool = False) -> Dict:
+        """
+        Busca em cascata, compartilhando buscas simultâneas do mesmo ISBN
+        
+        Chamadas concorrentes (de qualquer sessão do processo) com o mesmo ISBN
+        aguardam a busca que já está em andamento; cada uma recebe sua cópia.
+        ISBN-10 e ISBN-13 do mesmo livro são tratados como o mesmo ISBN, e
+        códigos com dígito verificador inválido não chegam a consultar as APIs.
+        """
+        isbn13 = canonical_isbn(isbn)
+        if not isbn13:
+            return {
+                'title': 'N/A',
+                'author': 'N/A',
+                'publisher': 'N/A',
+                'genre': 'N/A',
+                'year': 'N/A',
+                'cover_url': None,
+                'sources': [],
+                'from_cache': False,
+                'invalid_isbn': True
+            }
         
-        # 2. BUSCA EM CASCATA
-        combined_data = {
+        result, _ = _CASCADE_FLIGHTS.do((isbn13, force_refresh), self._cascade_search, isbn13, parallel, force_refresh)
+        return copy.deepcopy(result)
+    
+    def _empty_result(self) -> Dict:
+        """Dados de um livro ainda sem nenhum campo encontrado"""
+        return {
             'title': 'N/A',
             'author': 'N/A',
             'publisher': 'N/A',
@@ -1274,28 +2309,73 @@ COMECE AGORA usando as ferramentas! ISBN brasileiro? Use brazilian_books_databas
             'sources': [],
             'from_cache': False
         }
+    
+    def _cascade_search(self, isbn: str, parallel: Optional[bool] = None,
+                        force_refresh: bool = False, update_cache: bool = True,
+                        use_archive: Optional[bool] = None) -> Dict:
+        """
+        Busca em cascata com enriquecimento de dados
         
-        # Mapear funções de busca
-        api_functions = {
-            'openlibrary': self.search_openlibrary,
-            'google_books': self.search_google_books,
-            'isbndb': self.search_isbndb
-        }
+        0. Consulta o índice local (sem rede)
+        1. Verifica cache (positivo e de ISBNs não encontrados); uma entrada
+           vencida ou incompleta é devolvida na hora e atualizada em segundo plano
+        2. Reaproveita as respostas arquivadas por fonte e busca nas demais, em
+           ordem de prioridade, até encontrar dados completos (ou em todas ao
+           mesmo tempo, se parallel=True)
+        3. Enriquece dados parciais com outras APIs
+        4. Salva no cache (se update_cache)
         
-        # Buscar em ordem de prioridade
-        for api_name in self.api_priority:
-            search_func = api_functions.get(api_name)
-            if not search_func:
-                continue
-            
-            result = search_func(isbn)
+        force_refresh=True ignora os caches e o arquivo por fonte e consulta as
+        fontes de novo (use_archive=True mantém o arquivo).
+        """
+        if use_archive is None:
+            use_archive = not force_refresh
+        
+        combined_data = self._empty_result()
+        
+        # 0. ÍNDICE LOCAL (dados completos dispensam cache e rede)
+        combined_data = self._search_local_sources(isbn, combined_data)
+        if self.is_complete(combined_data):
+            return combined_data
+        
+        # 1. VERIFICAR CACHE
+        if not force_refresh:
+            cached_result = self.check_cache(isbn)
+            if cached_result:
+                # Vencida, ou incompleta (alguma fonte ainda pode preencher os campos)
+                if cached_result.get('stale') or not self.is_complete(cached_result):
+                    self._schedule_refresh(isbn, cached_result)
+                cached_result['from_cache'] = True
+                return cached_result
             
-            if result:
-                combined_data = self.merge_data(combined_data, result)
-                
-                # Se já está completo, parar
-                if self.is_complete(combined_data):
-                    break
+            # Não encontrado recentemente: não repetir a cascata inteira
+            sources_tried = self.check_negative_cache(isbn)
+            if sources_tried is not None:
+                # Mantém o que o índice local tiver encontrado
+                return dict(combined_data, from_cache=True, from_negative_cache=True,
+                            sources_tried=sources_tried)
+        
+        # 2. ARQUIVO POR FONTE: respostas recentes dispensam chamar a fonte de novo
+        archive = self.load_source_archive(isbn) if use_archive else {}
+        archived = set(archive)
+        combined_data = self._merge_archived_sources(combined_data, archive, isbn)
+        
+        # BUSCA EM CASCATA (só nas fontes que não estão no arquivo)
+        if parallel is None:
+            parallel = self.parallel_cascade
+        
+        if not self.is_complete(combined_data):
+            if parallel:
+                combined_data = self._search_sources_parallel(isbn, combined_data, archive)
+            else:
+                combined_data = self._search_sources_sequential(isbn, combined_data, archive)
+        
+        # Cópia sob o lock: fontes atrasadas ainda podem estar gravando no archive
+        with _ARCHIVE_LOCK:
+            answered = dict(archive)
+        self.save_source_archive(isbn, {
+            source: payload for source, payload in answered.items() if source not in archived
+        })
         
         # 3. ENRIQUECIMENTO ADICIONAL
         # Se ainda falta editora, tentar busca adicional
@@ -1305,15 +2385,297 @@ COMECE AGORA usando as ferramentas! ISBN brasileiro? Use brazilian_books_databas
                 combined_data = self.merge_data(combined_data, enrichment)
         
         # 4. SALVAR NO CACHE (se encontrou algo útil)
+        if not update_cache:
+            return combined_data
+        
         if combined_data['title'] != 'N/A':
             self.save_to_cache(isbn, combined_data)
+            if force_refresh:
+                self.clear_negative_cache(isbn)
+        else:
+            # Só registrar a ausência se todas as fontes responderam que não têm o
+            # livro (404 ou vazio); timeout, erro ou circuito aberto não contam
+            sources_tried = self._sources_answered_miss(answered)
+            if sources_tried is not None:
+                self.save_negative_cache(isbn, sources_tried)
         
         return combined_data
     
+    # ==================== BUSCA EM LOTE ====================
+    
+    def check_cache_many(self, isbns: List[str], track_access: bool = True) -> Dict[str, Dict]:
+        """
+        Verifica o cache de vários ISBNs-13 com uma query por lote
+        
+        As camadas locais respondem primeiro; só os ISBNs sem entrada válida
+        nelas vão ao Supabase, onde também é consultada a forma de 10 dígitos
+        de cada ISBN (entradas antigas). track_access=False não conta as
+        leituras como acessos (usado por rotinas de manutenção).
+        """
+        found = {}
+        local_entries = self.search_cache.get_many(isbns)
+        pending = []
+        
+        for isbn in isbns:
+            try:
+                local_entry = local_entries.get(isbn)
+                if local_entry and self._cache_entry_state(local_entry) == 'fresh':
+                    found[isbn] = self._cache_entry_data(local_entry, 'fresh')
+                    if track_access:
+                        self._record_cache_access(isbn)
+                    continue
+            except Exception:
+                pass
+            pending.append(isbn)
+        
+        # ISBN-13 → (estado, linha) escolhida no Supabase
+        chosen = {}
+        queried = 0
+        
+        for start in range(0, len(pending), self.cache_batch_size):
+            chunk = pending[start:start + self.cache_batch_size]
+            
+            # Chave gravada no cache → ISBN-13 buscado
+            key_map = {isbn: isbn for isbn in chunk}
+            for isbn in chunk:
+                isbn10 = isbn13_to_isbn10(isbn)
+                if isbn10:
+                    key_map[isbn10] = isbn
+            
+            try:
+                response = self.supabase.table('cache_api').select('*').in_('isbn', list(key_map)).execute()
+            except Exception:
+                continue
+            
+            queried += len(chunk)
+            
+            for cache_entry in response.data or []:
+                try:
+                    isbn = key_map.get(cache_entry['isbn'])
+                    if isbn is None:
+                        continue
+                    
+                    state = self._cache_entry_state(cache_entry)
+                    if state == 'expired':
+                        continue
+                    
+                    # Entre as linhas do mesmo livro: a dentro do prazo e, depois, a do ISBN-13
+                    current = chosen.get(isbn)
+                    if current is not None:
+                        replaces_stale = current[0] == 'stale' and state == 'fresh'
+                        same_state = current[0] == state
+                        if not (replaces_stale or (same_state and cache_entry['isbn'] == isbn)):
+                            continue
+                    
+                    chosen[isbn] = (state, cache_entry)
+                except Exception:
+                    continue
+        
+        self.search_cache.record('supabase', hits=len(chosen), misses=queried - len(chosen))
+        self.search_cache.set_many([self._cache_tier_row(isbn, entry) for isbn, (_, entry) in chosen.items()])
+        
+        for isbn in pending:
+            try:
+                if isbn in chosen:
+                    state, cache_entry = chosen[isbn]
+                    found[isbn] = self._cache_entry_data(cache_entry, state)
+                    key = cache_entry['isbn']
+                elif isbn in local_entries and self._cache_entry_state(local_entries[isbn]) == 'stale':
+                    # Supabase sem entrada (ou fora do ar): usar a vencida da camada local
+                    found[isbn] = self._cache_entry_data(local_entries[isbn], 'stale')
+                    key = isbn
+                else:
+                    continue
+                
+                if track_access:
+                    self._record_cache_access(key)
+            except Exception:
+                continue
+        
+        return found
+    
+    def _search_openlibrary_chunk(self, isbns: List[str]) -> Dict[str, Dict]:
+        """Busca um lote de ISBNs em uma única chamada de /api/books da Open Library"""
+        found = {}
+        
+        try:
+            bibkeys = ','.join(f"ISBN:{isbn}" for isbn in isbns)
+            url = f"https://openlibrary.org/api/books?bibkeys={bibkeys}&format=json&jscmd=data"
+            response = self._source_get('openlibrary', url)
+            
+            if response.status_code == 200:
+                for key, book in response.json().items():
+                    isbn = key.split(':', 1)[-1]
+                    if book.get('title'):
+                        found[isbn] = self._parse_openlibrary_data(book)
+        except Exception:
+            pass
+        
+        return found
+    
+    def _search_google_books_chunk(self, isbns: List[str]) -> Dict[str, Dict]:
+        """Busca um lote de ISBNs no Google Books com uma query OR"""
+        found = {}
+        
+        try:
+            query = ' OR '.join(f"isbn:{isbn}" for isbn in isbns)
+            response = self._source_get(
+                'google_books',
+                "https://www.googleapis.com/books/v1/volumes",
+                params={'q': query, 'maxResults': 40}
+            )
+            
+            if response.status_code == 200:
+                wanted = set(isbns)
+                
+                # A resposta não segue a ordem da query: casar pelos identificadores
+                for item in response.json().get('items', []):
+                    book = item.get('volumeInfo', {})
+                    identifiers = canonical_isbns(i.get('identifier') for i in book.get('industryIdentifiers', []))
+                    
+                    for identifier in identifiers:
+                        if identifier in wanted and identifier not in found:
+                            found[identifier] = self._parse_google_volume(book)
+        except Exception:
+            pass
+        
+        return found
+    
+    def _search_batch(self, search_chunk, isbns: List[str], chunk_size: int) -> Dict[str, Dict]:
+        """Divide os ISBNs em lotes e executa os lotes em paralelo"""
+        chunks = [isbns[start:start + chunk_size] for start in range(0, len(isbns), chunk_size)]
+        found = {}
+        
+        for chunk_result in _SOURCE_EXECUTOR.map(lambda chunk: self._run_as_batch(search_chunk, chunk), chunks):
+            found.update(chunk_result)
+        
+        return found
+    
+    def _complete_individually(self, isbn: str, data: Dict) -> Dict:
+        """Completa um resultado do lote com as fontes que não têm endpoint em lote"""
+        if not self.is_complete(data):
+            result = self.search_isbndb(isbn)
+            if result:
+                data = self.merge_data(data, result)
+        
+        # Mesmo enriquecimento da cascata: editora via título/autor
+        if data['publisher'] == 'N/A' and data['title'] != 'N/A':
+            enrichment = self.search_by_title_author(data['title'], data['author'])
+            if enrichment:
+                data = self.merge_data(data, enrichment)
+        
+        return data
+    
+    def search_many(self, isbns: List[str]) -> Dict[str, Dict]:
+        """
+        Busca vários ISBNs de uma vez (ex.: caixa de doações)
+        
+        0. Consulta o índice local (sem rede)
+        1. Verifica o cache do lote inteiro com uma query por lote
+           (entradas vencidas são usadas e atualizadas em segundo plano)
+        2. Busca as ausências na Open Library (/api/books com vários bibkeys)
+        3. Completa o que faltar no Google Books (query OR de vários ISBNs)
+        4. Só os ISBNs ainda incompletos passam por ISBNdb/título-autor
+        5. Salva os encontrados no cache
+        
+        Retorna {isbn informado: resultado}; cada resultado traz 'sources' e
+        'from_cache' indicando de onde vieram os dados. As buscas usam o ISBN-13
+        canônico; códigos inválidos voltam com 'invalid_isbn' sem consultar as APIs.
+        """
+        requested = list(dict.fromkeys(isbn.strip() for isbn in isbns if isbn and isbn.strip()))
+        canonical = {isbn: canonical_isbn(isbn) for isbn in requested}
+        unique_isbns = list(dict.fromkeys(isbn13 for isbn13 in canonical.values() if isbn13))
+        results = self._search_many_canonical(unique_isbns)
+        
+        output = {}
+        for isbn in requested:
+            isbn13 = canonical[isbn]
+            if isbn13:
+                output[isbn] = copy.deepcopy(results[isbn13])
+            else:
+                output[isbn] = {
+                    'title': 'N/A',
+                    'author': 'N/A',
+                    'publisher': 'N/A',
+                    'genre': 'N/A',
+                    'year': 'N/A',
+                    'cover_url': None,
+                    'sources': [],
+                    'from_cache': False,
+                    'invalid_isbn': True
+                }
+        
+        return output
+    
+    def _search_many_canonical(self, unique_isbns: List[str]) -> Dict[str, Dict]:
+        """Etapas de search_many para ISBNs-13 já normalizados e sem repetição"""
+        results = {}
+        local_results = {}
+        
+        # 0. ÍNDICE LOCAL
+        for isbn in unique_isbns:
+            local_results[isbn] = self._search_local_sources(isbn, {
+                'title': 'N/A',
+                'author': 'N/A',
+                'publisher': 'N/A',
+                'genre': 'N/A',
+                'year': 'N/A',
+                'cover_url': None,
+                'sources': [],
+                'from_cache': False
+            })
+            if self.is_complete(local_results[isbn]):
+                results[isbn] = local_results[isbn]
+        
+        # 1. CACHE
+        cached = self.check_cache_many([isbn for isbn in unique_isbns if isbn not in results])
+        for isbn, data in cached.items():
+            if data.get('stale'):
+                self._schedule_refresh(isbn, data)
+            data['from_cache'] = True
+            results[isbn] = data
+        
+        misses = [isbn for isbn in unique_isbns if isbn not in results]
+        if not misses:
+            return results
+        
+        for isbn in misses:
+            results[isbn] = local_results[isbn]
+        
+        # 2-3. FONTES COM ENDPOINT EM LOTE
+        batch_sources = [
+            (self._search_openlibrary_chunk, self.openlibrary_batch_size),
+            (self._search_google_books_chunk, self.google_books_batch_size),
+        ]
+        
+        for search_chunk, chunk_size in batch_sources:
+            pending = [isbn for isbn in misses if not self.is_complete(results[isbn])]
+            if not pending:
+                break
+            
+            for isbn, data in self._search_batch(search_chunk, pending, chunk_size).items():
+                if isbn in results:
+                    results[isbn] = self.merge_data(results[isbn], data)
+        
+        # 4. COMPLEMENTO INDIVIDUAL
+        pending = [isbn for isbn in misses if not self.is_complete(results[isbn])]
+        completed = _SOURCE_EXECUTOR.map(
+            lambda isbn: self._run_as_batch(self._complete_individually, isbn, results[isbn]), pending
+        )
+        for isbn, data in zip(pending, completed):
+            results[isbn] = data
+        
+        # 5. CACHE
+        for isbn in misses:
+            if results[isbn]['title'] != 'N/A':
+                self.save_to_cache(isbn, results[isbn])
+        
+        return results
+    
     # ==================== BUSCA PRINCIPAL (COM FALLBACKS) ====================
     
     def search_book(self, isbn: str = None, title: str = None, author: str = None, 
-                    use_ai: bool = False) -> Dict:
+                    use_ai: bool = False, force_refresh: bool = False) -> Dict:
         """
         Busca principal com fallbacks inteligentes
         
@@ -1321,8 +2683,31 @@ COMECE AGORA usando as ferramentas! ISBN brasileiro? Use brazilian_books_databas
         1. Busca por ISBN (em cascata)
         2. Se falhar e tiver título/autor: Busca por título/autor
         3. Se use_ai=True: Busca com IA
-        """
         
+        force_refresh=True ignora o cache e consulta as fontes novamente.
+        O tempo total e o desfecho de cada busca vão para a telemetria.
+        """
+        start = time.monotonic()
+        result = self._search_book(isbn, title, author, use_ai, force_refresh)
+        self.telemetry.record_search(self._search_outcome(result), time.monotonic() - start)
+        return result
+    
+    def _search_outcome(self, result: Dict) -> str:
+        """Desfecho de uma busca, para a telemetria"""
+        if result.get('invalid_isbn'):
+            return 'invalid_isbn'
+        if result.get('from_negative_cache'):
+            return 'negative_cache'
+        if result.get('from_cache'):
+            return 'cache'
+        if result.get('title', 'N/A') == 'N/A':
+            return 'not_found'
+        if self.is_complete(result):
+            return 'found'
+        return 'partial'
+    
+    def _search_book(self, isbn: Optional[str], title: Optional[str], author: Optional[str],
+                     use_ai: bool, force_refresh: bool) -> Dict:
         result = {
             'title': 'N/A',
             'author': 'N/A',
@@ -1336,7 +2721,7 @@ COMECE AGORA usando as ferramentas! ISBN brasileiro? Use brazilian_books_databas
         
         # 1. BUSCA POR ISBN
         if isbn:
-            result = self.cascade_search(isbn)
+            result = self.cascade_search(isbn, force_refresh=force_refresh)
             
             # Se encontrou dados completos, retornar
             if self.is_complete(result):
@@ -1363,7 +2748,14 @@ COMECE AGORA usando as ferramentas! ISBN brasileiro? Use brazilian_books_databas
 
 # ==================== FUNÇÕES DE COMPATIBILIDADE ====================
 
-def create_search_engine(supabase_client):
+def create_search_engine(supabase_client, parallel_cascade: bool = False,
+                         transport: Optional[HttpTransport] = None, hedging: bool = False,
+                         source_ranking: Optional[SourceRanking] = None,
+                         local_index: Optional[LocalBookIndex] = None,
+                         search_cache: Optional[TieredSearchCache] = None,
+                         telemetry: Optional[SearchTelemetry] = None):
     """Factory function para criar o motor de busca"""
-    return BookSearchEngine(supabase_client)
+    return BookSearchEngine(supabase_client, parallel_cascade=parallel_cascade,
+                            transport=transport, hedging=hedging, source_ranking=source_ranking,
+                            local_index=local_index, search_cache=search_cache, telemetry=telemetry)
 
@@ -0,0 +1,458 @@
+"""
+Motor de Busca de Livros Assíncrono
+Mesma orquestração do BookSearchEngine, com chamadas HTTP não bloqueantes (asyncio)
+"""
+
+import asyncio
+import contextvars
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+from book_search_engine import BookSearchEngine, openlibrary_name_cache
+from http_transport import RETRY_STATUS, RateLimitExceeded, parse_retry_after
+from isbn_utils import canonical_isbn
+from source_health import CircuitOpenError
+
+
+# Status HTTP da última resposta de _get na tarefa atual (None = sem resposta:
+# erro, timeout ou circuito aberto; 'rate_limited' = recusada pela fila do
+# limite de taxa), lido por _call_source
+_LAST_STATUS = contextvars.ContextVar('last_status', default=None)
+
+
+class AsyncBookSearchEngine:
+    """
+    Versão asyncio do motor de busca.
+    
+    Um único event loop atende muitas buscas simultâneas sem uma thread por
+    requisição. Tradução de gêneros, parsers, mesclagem e configuração
+    (api_priority, cache) são reaproveitados de um BookSearchEngine.
+    
+    Diferenças em relação ao motor síncrono: buscas simultâneas do mesmo ISBN
+    não são agrupadas (sem single-flight) e o arquivo por fonte
+    (cache_api_fontes) não é lido nem gravado; toda busca fora do cache
+    consulta as fontes de novo.
+    """
+    
+    def __init__(self, supabase_client, parallel_cascade: bool = False,
+                 engine: Optional[BookSearchEngine] = None):
+        self.engine = engine or BookSearchEngine(supabase_client, parallel_cascade=parallel_cascade)
+        self.supabase = self.engine.supabase
+        self.parallel_cascade = parallel_cascade
+        self._client: Optional[httpx.AsyncClient] = None
+    
+    @property
+    def api_priority(self) -> List[str]:
+        return self.engine.api_priority
+    
+    # ==================== CLIENTE HTTP ====================
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Cliente HTTP compartilhado (criado sob demanda dentro do event loop)"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                follow_redirects=True,
+                headers={'User-Agent': 'Book-Cataloger/1.0'},
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+            )
+        return self._client
+    
+    async def _get(self, url: str, source: str = 'default', **kwargs) -> httpx.Response:
+        """GET com os mesmos timeouts, limite de taxa, retry e circuit breaker do motor síncrono"""
+        transport = self.engine.http
+        health = self.engine.source_health.get(source)
+        if not health.allow_request():
+            raise CircuitOpenError(source)
+        
+        connect_timeout, read_timeout = self.engine._get_source_timeout(source)
+        timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        bucket = transport.get_bucket(source)
+        max_queue_wait = self.engine._get_queue_wait(read_timeout)
+        if max_queue_wait is None:
+            max_queue_wait = transport.max_queue_wait
+        rate_limit_retries, max_rate_limit_wait = transport.get_rate_limit_budget(source)
+        max_rate_limit_wait = min(max_rate_limit_wait, max_queue_wait)
+        attempt = 0
+        rate_limited = 0
+        start = time.monotonic()
+        
+        while True:
+            if bucket is not None and not await bucket.acquire_async(max_wait=max_queue_wait):
+                health.record_rejected()
+                _LAST_STATUS.set('rate_limited')
+                raise RateLimitExceeded(f"Fila do limite de taxa de '{source}' excedeu {max_queue_wait}s")
+            
+            try:
+                response = await self._get_client().get(url, timeout=timeout, **kwargs)
+            except httpx.ConnectError:
+                if attempt >= transport.max_retries:
+                    health.record_failure(time.monotonic() - start, read_timeout)
+                    raise
+                await asyncio.sleep(transport.backoff_delay(attempt))
+                attempt += 1
+                continue
+            except Exception:
+                health.record_failure(time.monotonic() - start, read_timeout)
+                raise
+            
+            if response.status_code == 429:
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                delay = retry_after if retry_after is not None else transport.backoff_delay(rate_limited)
+                if bucket is not None:
+                    bucket.on_rate_limited(delay)
+                
+                if rate_limited < rate_limit_retries and delay <= max_rate_limit_wait:
+                    if bucket is None:
+                        await asyncio.sleep(delay)
+                    rate_limited += 1
+                    continue
+            elif response.status_code in RETRY_STATUS and attempt < transport.max_retries:
+                await asyncio.sleep(transport.backoff_delay(attempt))
+                attempt += 1
+                continue
+            
+            if response.status_code in RETRY_STATUS:
+                health.record_failure(time.monotonic() - start, read_timeout)
+            else:
+                if bucket is not None:
+                    bucket.on_success()
+                health.record_success(time.monotonic() - start)
+            
+            _LAST_STATUS.set(response.status_code)
+            return response
+    
+    async def aclose(self):
+        """Fecha o cliente HTTP"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+    
+    # ==================== CACHE ====================
+    
+    async def check_cache(self, isbn: str) -> Optional[Dict]:
+        """Verifica se existe resultado em cache válido"""
+        # O cliente Supabase é síncrono: executar fora do event loop
+        return await asyncio.to_thread(self.engine.check_cache, isbn)
+    
+    async def save_to_cache(self, isbn: str, data: Dict):
+        """Salva resultado no cache"""
+        await asyncio.to_thread(self.engine.save_to_cache, isbn, data)
+    
+    async def check_negative_cache(self, isbn: str) -> Optional[List[str]]:
+        """Fontes já consultadas sem sucesso para o ISBN (None se não houver registro)"""
+        return await asyncio.to_thread(self.engine.check_negative_cache, isbn)
+    
+    async def save_negative_cache(self, isbn: str, sources_tried: List[str]):
+        await asyncio.to_thread(self.engine.save_negative_cache, isbn, sources_tried)
+    
+    async def clear_negative_cache(self, isbn: str):
+        await asyncio.to_thread(self.engine.clear_negative_cache, isbn)
+    
+    # ==================== APIs INDIVIDUAIS ====================
+    
+    async def _fetch_openlibrary_author(self, author_key: str) -> str:
+        # Mesmo cache de nomes do motor síncrono
+        cached_name = openlibrary_name_cache.get(author_key)
+        if cached_name is not None:
+            return cached_name
+        
+        try:
+            response = await self._get(f"https://openlibrary.org{author_key}.json", source='openlibrary_refs')
+            if response.status_code == 200:
+                name = response.json().get('name', '')
+                openlibrary_name_cache.set(author_key, name)
+                return name
+        except Exception:
+            pass
+        return ''
+    
+    async def search_openlibrary(self, isbn: str) -> Optional[Dict]:
+        """Busca na Open Library API"""
+        try:
+            response = await self._get(f"https://openlibrary.org/isbn/{isbn}.json", source='openlibrary')
+            
+            if response.status_code == 200:
+                data = response.json()
+                
+                # Resolver autores em paralelo (máximo 3)
+                author_keys = [ref['key'] for ref in data.get('authors', [])[:3] if ref.get('key')]
+                authors = await asyncio.gather(*(self._fetch_openlibrary_author(key) for key in author_keys))
+                
+                return self.engine._parse_openlibrary(data, list(authors))
+        except Exception:
+            return None
+        
+        return None
+    
+    async def search_google_books(self, isbn: str) -> Optional[Dict]:
+        """Busca na Google Books API"""
+        try:
+            response = await self._get(f"https://www.googleapis.com/books/v1/volumes?q=isbn:{isbn}", source='google_books')
+            
+            if response.status_code == 200:
+                return self.engine._parse_google_books(response.json(), isbn)
+        except Exception:
+            return None
+        
+        return None
+    
+    async def search_isbndb(self, isbn: str) -> Optional[Dict]:
+        """Busca na ISBNdb API (requer API key)"""
+        try:
+            api_key = self.engine._get_isbndb_api_key()
+            if not api_key:
+                return None
+            
+            response = await self._get(
+                f"https://api2.isbndb.com/book/{isbn}",
+                source='isbndb',
+                headers={'Authorization': api_key}
+            )
+            
+            if response.status_code == 200:
+                return self.engine._parse_isbndb(response.json())
+        except Exception:
+            return None
+        
+        return None
+    
+    async def search_by_title_author(self, title: str, author: str = None) -> Optional[Dict]:
+        """Busca por título e autor como fallback"""
+        try:
+            query = self.engine._build_title_author_query(title, author)
+            response = await self._get(
+                "https://www.googleapis.com/books/v1/volumes",
+                source='google_books',
+                params={'q': query, 'maxResults': 1}
+            )
+            
+            if response.status_code == 200:
+                return self.engine._parse_title_author(response.json())
+        except Exception:
+            pass
+        
+        return None
+    
+    # ==================== ORQUESTRAÇÃO PRINCIPAL ====================
+    
+    def _get_api_functions(self) -> Dict:
+        return {
+            'openlibrary': self.search_openlibrary,
+            'google_books': self.search_google_books,
+            'isbndb': self.search_isbndb
+        }
+    
+    async def _call_source(self, api_name: str, isbn: str, answered: Optional[set] = None) -> Optional[Dict]:
+        """
+        Chama a busca da fonte e registra o resultado para a ordem aprendida
+        
+        Com `answered`, a fonte é incluída nele se respondeu (encontrou o livro,
+        200 sem ele ou 404); erros e timeouts não contam.
+        """
+        start = time.monotonic()
+        _LAST_STATUS.set(None)
+        result = await self._get_api_functions()[api_name](isbn)
+        # Recusa da fila local do limite de taxa não diz nada sobre a fonte
+        if _LAST_STATUS.get() != 'rate_limited':
+            self.engine.source_ranking.record(isbn, api_name, bool(result), time.monotonic() - start)
+        
+        if answered is not None and (result or _LAST_STATUS.get() in (200, 404)):
+            answered.add(api_name)
+        return result
+    
+    async def _search_sources_sequential(self, isbn: str, combined_data: Dict,
+                                         answered: Optional[set] = None) -> Dict:
+        api_functions = self._get_api_functions()
+        
+        for api_name in self.engine.get_source_order(isbn):
+            if api_name not in api_functions or not self.engine.is_source_available(api_name):
+                continue
+            
+            result = await self._call_source(api_name, isbn, answered)
+            
+            if result:
+                combined_data = self.engine.merge_data(combined_data, result)
+                if self.engine.is_complete(combined_data):
+                    break
+        
+        return combined_data
+    
+    async def _search_sources_parallel(self, isbn: str, combined_data: Dict,
+                                       answered: Optional[set] = None) -> Dict:
+        """Mesma regra do motor síncrono: mescla na ordem de api_priority, não na de chegada"""
+        api_functions = self._get_api_functions()
+        order = [
+            api_name for api_name in self.api_priority
+            if api_name in api_functions and self.engine.is_source_available(api_name)
+        ]
+        tasks = {
+            asyncio.ensure_future(self._call_source(api_name, isbn, answered)): api_name
+            for api_name in order
+        }
+        results = {}
+        pending = set(tasks)
+        
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    try:
+                        results[tasks[task]] = task.result()
+                    except Exception:
+                        results[tasks[task]] = None
+                
+                merged = self.engine._merge_in_order(combined_data, order, results, prefix_only=True)
+                if self.engine.is_complete(merged):
+                    return merged
+        finally:
+            # Cancelar as fontes que ainda não responderam
+            for task in tasks:
+                task.cancel()
+        
+        return self.engine._merge_in_order(combined_data, order, results)
+    
+    async def cascade_search(self, isbn: str, parallel: Optional[bool] = None,
+                             force_refresh: bool = False) -> Dict:
+        """Busca em cascata (mesmas etapas de BookSearchEngine.cascade_search)"""
+        
+        # ISBN-13 canônico; dígito verificador inválido não consulta as APIs
+        isbn13 = canonical_isbn(isbn)
+        if not isbn13:
+            return {
+                'title': 'N/A',
+                'author': 'N/A',
+                'publisher': 'N/A',
+                'genre': 'N/A',
+                'year': 'N/A',
+                'cover_url': None,
+                'sources': [],
+                'from_cache': False,
+                'invalid_isbn': True
+            }
+        isbn = isbn13
+        
+        combined_data = {
+            'title': 'N/A',
+            'author': 'N/A',
+            'publisher': 'N/A',
+            'genre': 'N/A',
+            'year': 'N/A',
+            'cover_url': None,
+            'sources': [],
+            'from_cache': False
+        }
+        
+        # 0. ÍNDICE LOCAL (SQLite, sem rede: executado direto no loop)
+        combined_data = self.engine._search_local_sources(isbn, combined_data)
+        if self.engine.is_complete(combined_data):
+            return combined_data
+        
+        # 1. VERIFICAR CACHE
+        if not force_refresh:
+            cached_result = await self.check_cache(isbn)
+            if cached_result:
+                if cached_result.get('stale') or not self.engine.is_complete(cached_result):
+                    # Atualização no pool de segundo plano do motor síncrono
+                    # (que reaproveita o arquivo por fonte)
+                    self.engine._schedule_refresh(isbn, cached_result)
+                cached_result['from_cache'] = True
+                return cached_result
+            
+            sources_tried = await self.check_negative_cache(isbn)
+            if sources_tried is not None:
+                # Mantém o que o índice local tiver encontrado
+                return dict(combined_data, from_cache=True, from_negative_cache=True,
+                            sources_tried=sources_tried)
+        
+        # 2. BUSCA EM CASCATA
+        if parallel is None:
+            parallel = self.parallel_cascade
+        
+        answered = set()
+        if parallel:
+            combined_data = await self._search_sources_parallel(isbn, combined_data, answered)
+        else:
+            combined_data = await self._search_sources_sequential(isbn, combined_data, answered)
+        
+        # 3. ENRIQUECIMENTO ADICIONAL
+        if combined_data['publisher'] == 'N/A' and combined_data['title'] != 'N/A':
+            enrichment = await self.search_by_title_author(combined_data['title'], combined_data['author'])
+            if enrichment:
+                combined_data = self.engine.merge_data(combined_data, enrichment)
+        
+        # 4. SALVAR NO CACHE
+        if combined_data['title'] != 'N/A':
+            await self.save_to_cache(isbn, combined_data)
+            if force_refresh:
+                await self.clear_negative_cache(isbn)
+        else:
+            # Mesma regra do motor síncrono: só se todas as fontes responderam sem o livro
+            sources_tried = self.engine._sources_answered_miss({api_name: {} for api_name in answered})
+            if sources_tried is not None:
+                await self.save_negative_cache(isbn, sources_tried)
+        
+        return combined_data
+    
+    async def search_book(self, isbn: str = None, title: str = None, author: str = None,
+                          use_ai: bool = False, force_refresh: bool = False) -> Dict:
+        """Busca principal com fallbacks (mesma ordem de BookSearchEngine.search_book)"""
+        start = time.monotonic()
+        result = await self._search_book(isbn, title, author, use_ai, force_refresh)
+        # Mesma telemetria de buscas do motor síncrono
+        self.engine.telemetry.record_search(self.engine._search_outcome(result), time.monotonic() - start)
+        return result
+    
+    async def _search_book(self, isbn: Optional[str], title: Optional[str], author: Optional[str],
+                           use_ai: bool, force_refresh: bool) -> Dict:
+        result = {
+            'title': 'N/A',
+            'author': 'N/A',
+            'publisher': 'N/A',
+            'genre': 'N/A',
+            'year': 'N/A',
+            'cover_url': None,
+            'sources': [],
+            'from_cache': False
+        }
+        
+        # 1. BUSCA POR ISBN
+        if isbn:
+            result = await self.cascade_search(isbn, force_refresh=force_refresh)
+            
+            if self.engine.is_complete(result):
+                return result
+        
+        # 2. FALLBACK: BUSCA POR TÍTULO/AUTOR
+        if (result['title'] == 'N/A' or not self.engine.is_complete(result)) and title:
+            fallback_result = await self.search_by_title_author(title, author)
+            if fallback_result:
+                result = self.engine.merge_data(result, fallback_result)
+        
+        # 3. FALLBACK FINAL: IA (fluxo síncrono, com várias chamadas bloqueantes):
+        # executado fora do loop para não congelar as demais buscas. As mensagens
+        # st.* de search_with_ai não aparecem fora da thread do script; quem
+        # precisa delas deve chamar engine.search_with_ai direto (use_ai=False)
+        if use_ai and not self.engine.is_complete(result):
+            ai_result = await asyncio.to_thread(
+                self.engine.search_with_ai,
+                title or result.get('title', ''),
+                author or result.get('author', ''),
+                isbn
+            )
+            if ai_result:
+                result = self.engine.merge_data(result, ai_result)
+        
+        return result
+
+
+def create_async_search_engine(supabase_client, parallel_cascade: bool = False):
+    """Factory function para criar o motor de busca assíncrono"""
+    return AsyncBookSearchEngine(supabase_client, parallel_cascade=parallel_cascade)
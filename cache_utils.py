@@ -0,0 +1,117 @@
+"""
+Utilitários de cache em memória
+Cache LRU limitado com expiração (TTL) e agrupamento de chamadas simultâneas,
+seguros para uso entre threads
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Cache LRU com número máximo de itens e tempo de vida por item"""
+    
+    def __init__(self, maxsize: int = 1000, ttl_seconds: float = 3600):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[Any, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key, default=None) -> Any:
+        """Retorna o valor da chave (ou default se ausente/expirado)"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            
+            # Marcar como usado recentemente
+            self._data.move_to_end(key)
+            return value
+    
+    def set(self, key, value, ttl_seconds: Optional[float] = None):
+        """Armazena o valor, descartando o item menos usado se o cache estiver cheio"""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+    
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+    
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+    
+    def __contains__(self, key) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+    
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class _Flight:
+    """Execução em andamento de SingleFlight"""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Agrupa chamadas simultâneas com a mesma chave em uma única execução
+    
+    A primeira chamada executa a função; as que chegarem enquanto ela está em
+    andamento esperam e recebem o mesmo resultado (ou a mesma exceção).
+    """
+    
+    def __init__(self):
+        self._flights: Dict[Any, _Flight] = {}
+        self._lock = threading.Lock()
+    
+    def do(self, key, func: Callable, *args, **kwargs) -> Tuple[Any, bool]:
+        """Retorna (resultado, compartilhado); compartilhado=True se veio de outra chamada"""
+        with self._lock:
+            flight = self._flights.get(key)
+            is_leader = flight is None
+            if is_leader:
+                flight = _Flight()
+                self._flights[key] = flight
+        
+        if not is_leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+        
+        try:
+            flight.result = func(*args, **kwargs)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        
+        return flight.result, False
+    
+    def in_flight(self) -> int:
+        """Número de chaves sendo executadas no momento"""
+        return len(self._flights)
@@ -46,6 +46,142 @@ COMMENT ON FUNCTION limpar_cache_antigo IS 'Remove entradas de cache mais antiga
 -- Exemplo de uso:
 -- SELECT limpar_cache_antigo(90);  -- Remove cache > 90 dias
 
+-- ============================================
+-- CACHE NEGATIVO: ISBNs não encontrados
+-- ============================================
+-- Evita repetir a busca em todas as fontes a cada nova leitura de um ISBN
+-- desconhecido. O motor considera o registro válido por poucas horas
+-- (BookSearchEngine.negative_cache_ttl_hours).
+
+CREATE TABLE IF NOT EXISTS public.cache_api_negativo (
+  isbn TEXT PRIMARY KEY,
+  fontes_consultadas JSONB NOT NULL DEFAULT '[]'::JSONB,
+  cached_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_cache_api_negativo_cached_at 
+ON public.cache_api_negativo(cached_at DESC);
+
+COMMENT ON TABLE public.cache_api_negativo IS 'ISBNs procurados recentemente sem resultado nas APIs externas';
+COMMENT ON COLUMN public.cache_api_negativo.fontes_consultadas IS 'Fontes consultadas na última busca sem sucesso';
+COMMENT ON COLUMN public.cache_api_negativo.cached_at IS 'Data e hora da última busca sem sucesso';
+
+CREATE OR REPLACE FUNCTION limpar_cache_negativo(horas INTEGER DEFAULT 24)
+RETURNS INTEGER AS $$
+DECLARE
+  linhas_deletadas INTEGER;
+BEGIN
+  DELETE FROM public.cache_api_negativo
+  WHERE cached_at < NOW() - (horas || ' hours')::INTERVAL;
+  
+  GET DIAGNOSTICS linhas_deletadas = ROW_COUNT;
+  RETURN linhas_deletadas;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION limpar_cache_negativo IS 'Remove registros de ISBNs não encontrados mais antigos que X horas (padrão: 24)';
+
+-- ============================================
+-- ARQUIVO POR FONTE: respostas brutas das APIs
+-- ============================================
+-- Resposta bruta de cada fonte por ISBN. A cascata reaproveita as fontes
+-- consultadas recentemente e só chama as que ainda podem completar campos;
+-- os registros podem ser refeitos a partir das respostas arquivadas
+-- (scripts/reparse_source_archive.py) quando um parser mudar.
+
+CREATE TABLE IF NOT EXISTS public.cache_api_fontes (
+  isbn TEXT NOT NULL,
+  fonte TEXT NOT NULL,
+  payload_json TEXT NOT NULL,
+  dados_json TEXT,
+  campos JSONB NOT NULL DEFAULT '[]'::JSONB,
+  consultado_em TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (isbn, fonte)
+);
+
+CREATE INDEX IF NOT EXISTS idx_cache_api_fontes_consultado_em 
+ON public.cache_api_fontes(consultado_em DESC);
+
+COMMENT ON TABLE public.cache_api_fontes IS 'Resposta bruta de cada API externa por ISBN';
+COMMENT ON COLUMN public.cache_api_fontes.fonte IS 'Fonte consultada (openlibrary, google_books, isbndb)';
+COMMENT ON COLUMN public.cache_api_fontes.payload_json IS 'Resposta bruta da fonte (JSON); {} = a fonte não tem o livro';
+COMMENT ON COLUMN public.cache_api_fontes.dados_json IS 'Dados já convertidos para o formato padrão (JSON)';
+COMMENT ON COLUMN public.cache_api_fontes.campos IS 'Campos preenchidos por esta fonte';
+COMMENT ON COLUMN public.cache_api_fontes.consultado_em IS 'Data e hora da consulta à fonte';
+
+-- ============================================
+-- ACESSOS AO CACHE E DESPEJO POR LRU/LFU
+-- ============================================
+-- O motor de busca acumula as leituras do cache em memória e grava em lote
+-- (registrar_acessos_cache). scripts/evict_search_cache.py usa essas colunas
+-- para manter cache_api dentro de um limite de linhas/bytes, removendo
+-- primeiro as entradas menos usadas, em lotes pequenos.
+
+ALTER TABLE public.cache_api ADD COLUMN IF NOT EXISTS ultimo_acesso TIMESTAMPTZ;
+ALTER TABLE public.cache_api ADD COLUMN IF NOT EXISTS acessos INTEGER NOT NULL DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS idx_cache_api_ultimo_acesso 
+ON public.cache_api(ultimo_acesso);
+
+COMMENT ON COLUMN public.cache_api.ultimo_acesso IS 'Data e hora da última leitura da entrada';
+COMMENT ON COLUMN public.cache_api.acessos IS 'Número de leituras da entrada';
+
+CREATE OR REPLACE FUNCTION registrar_acessos_cache(isbns TEXT[], contagens INTEGER[])
+RETURNS VOID AS $$
+BEGIN
+  UPDATE public.cache_api AS c
+  SET acessos = c.acessos + a.contagem,
+      ultimo_acesso = NOW()
+  FROM unnest(isbns, contagens) AS a(isbn, contagem)
+  WHERE c.isbn = a.isbn;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION registrar_acessos_cache IS 'Soma leituras acumuladas pelo app e atualiza o último acesso';
+
+CREATE OR REPLACE FUNCTION tamanho_cache_api()
+RETURNS TABLE (linhas BIGINT, bytes BIGINT) AS $$
+  SELECT COUNT(*), COALESCE(SUM(pg_column_size(c.*)), 0)
+  FROM public.cache_api AS c;
+$$ LANGUAGE sql STABLE;
+
+COMMENT ON FUNCTION tamanho_cache_api IS 'Número de linhas e bytes ocupados por cache_api';
+
+-- Pontuação (menor = removida primeiro):
+--   lru: segundos desde o último acesso (negativos)
+--   lfu: número de leituras
+--   hibrida: leituras divididas pelos dias sem acesso
+-- Paginação por chave: a próxima página começa depois de (apos_pontuacao, apos_isbn),
+-- o último candidato da anterior; `agora` fixo entre as páginas mantém as pontuações
+-- comparáveis (com NOW(), lru e hibrida mudariam de uma chamada para outra)
+DROP FUNCTION IF EXISTS candidatos_despejo_cache(TEXT, INTEGER, INTEGER);
+
+CREATE OR REPLACE FUNCTION candidatos_despejo_cache(
+  politica TEXT DEFAULT 'hibrida',
+  limite INTEGER DEFAULT 500,
+  apos_pontuacao DOUBLE PRECISION DEFAULT NULL,
+  apos_isbn TEXT DEFAULT NULL,
+  agora TIMESTAMPTZ DEFAULT NOW()
+)
+RETURNS TABLE (isbn TEXT, acessos INTEGER, ultimo_acesso TIMESTAMPTZ, bytes INTEGER, pontuacao DOUBLE PRECISION) AS $$
+  SELECT *
+  FROM (
+    SELECT c.isbn, c.acessos, COALESCE(c.ultimo_acesso, c.cached_at) AS ultimo_acesso, pg_column_size(c.*) AS bytes,
+           CASE politica
+             WHEN 'lru' THEN -EXTRACT(EPOCH FROM agora - COALESCE(c.ultimo_acesso, c.cached_at))
+             WHEN 'lfu' THEN c.acessos::DOUBLE PRECISION
+             ELSE (c.acessos + 1) / (1 + EXTRACT(EPOCH FROM agora - COALESCE(c.ultimo_acesso, c.cached_at)) / 86400.0)
+           END AS pontuacao
+    FROM public.cache_api AS c
+  ) AS candidatos
+  WHERE apos_pontuacao IS NULL
+     OR (candidatos.pontuacao, candidatos.isbn) > (apos_pontuacao, apos_isbn)
+  ORDER BY candidatos.pontuacao ASC, candidatos.isbn
+  LIMIT limite;
+$$ LANGUAGE sql STABLE;
+
+COMMENT ON FUNCTION candidatos_despejo_cache IS 'Entradas de cache_api na ordem de remoção (lru, lfu ou hibrida)';
+
 -- ============================================
 -- INSTRUÇÕES DE USO
 -- ============================================
@@ -64,6 +200,9 @@ VERIFICAÇÃO:
 - Tabela "cache_api" deve aparecer na lista
 - Deve ter colunas: isbn, dados_json, cached_at, created_at
 - Índice idx_cache_api_cached_at deve estar criado
+- Tabela "cache_api_negativo" com colunas: isbn, fontes_consultadas, cached_at
+- Tabela "cache_api_fontes" com colunas: isbn, fonte, payload_json, dados_json, campos, consultado_em
+- cache_api com as colunas ultimo_acesso e acessos
 
 SEGURANÇA:
 - Esta migração é segura e idempotente (IF NOT EXISTS)
@@ -71,7 +210,10 @@ SEGURANÇA:
 - Não afeta dados existentes em outras tabelas
 
 MANUTENÇÃO:
-- Execute limpar_cache_antigo(90) periodicamente
+- Execute limpar_cache_antigo(90) e limpar_cache_negativo(24) periodicamente
+- Para limitar o tamanho do cache: python scripts/evict_search_cache.py --max-rows 50000
 - Ou configure um cron job no Supabase
+- Depois de alterar um parser, rode scripts/reparse_source_archive.py para
+  refazer o cache a partir das respostas arquivadas em cache_api_fontes
 */
 
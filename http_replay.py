@@ -0,0 +1,248 @@
+"""
+Gravação e reprodução de respostas HTTP
+Grava as respostas reais das fontes (com a latência de cada uma) em um arquivo de
+fixtures e as reproduz sem rede, para medir o motor de busca de forma repetível
+"""
+
+import atexit
+import hashlib
+import json
+import math
+import os
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from http_transport import HttpTransport
+
+
+# Variáveis de ambiente que ativam a gravação/reprodução no transporte padrão
+ENV_MODE = 'HTTP_REPLAY_MODE'                  # record | replay
+ENV_FIXTURES = 'HTTP_REPLAY_FIXTURES'          # arquivo de fixtures (.json)
+ENV_LATENCY = 'HTTP_REPLAY_LATENCY'            # recorded | synthetic | none
+ENV_LATENCY_SCALE = 'HTTP_REPLAY_LATENCY_SCALE'  # multiplica as latências reproduzidas
+
+DEFAULT_FIXTURES_PATH = 'fixtures/http_fixtures.json'
+
+# Headers de resposta guardados nas fixtures (os de requisição, com chaves de API, nunca são gravados)
+KEPT_HEADERS = ['Content-Type', 'Retry-After']
+
+# z do percentil 90 da normal padrão (para a latência sintética log-normal)
+_Z90 = 1.2816
+
+
+class ReplayMiss(requests.exceptions.ConnectionError):
+    """A requisição não está nas fixtures (em reprodução estrita, nada vai à rede)"""
+
+
+def request_key(method: str, url: str, params=None, json_body=None, data=None) -> str:
+    """
+    Chave da requisição: método, URL completa e hash do corpo
+    
+    O corpo JSON é serializado com chaves ordenadas, então a mesma conversa
+    com a IA gera a mesma chave.
+    """
+    full_url = requests.Request(method, url, params=params).prepare().url
+    
+    body = ''
+    if json_body is not None:
+        body = json.dumps(json_body, sort_keys=True, ensure_ascii=False)
+    elif data is not None:
+        body = data if isinstance(data, str) else json.dumps(data, sort_keys=True, default=str)
+    
+    body_hash = hashlib.sha1(body.encode('utf-8')).hexdigest()[:16] if body else ''
+    return f"{method.upper()} {full_url} {body_hash}".strip()
+
+
+def build_response(entry: Dict, url: str) -> requests.Response:
+    """requests.Response montada a partir de uma entrada das fixtures"""
+    response = requests.Response()
+    response.status_code = entry['status']
+    response._content = entry['body'].encode('utf-8')
+    response.headers = CaseInsensitiveDict(entry.get('headers') or {})
+    response.encoding = 'utf-8'
+    response.url = url
+    response.reason = entry.get('reason', '')
+    return response
+
+
+class FixtureStore:
+    """Respostas gravadas por chave de requisição (várias por chave, reproduzidas em rodízio)"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, List[Dict]] = {}
+        self._cursor: Dict[str, int] = {}
+        self._lock = threading.Lock()
+    
+    def load(self) -> 'FixtureStore':
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        
+        self.entries = {}
+        for entry in data.get('entries', []):
+            self.entries.setdefault(entry['key'], []).append(entry)
+        return self
+    
+    def save(self):
+        with self._lock:
+            entries = [entry for key in sorted(self.entries) for entry in self.entries[key]]
+        
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': 1, 'entries': entries}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+    
+    def add(self, entry: Dict):
+        with self._lock:
+            self.entries.setdefault(entry['key'], []).append(entry)
+    
+    def next(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entries = self.entries.get(key)
+            if not entries:
+                return None
+            index = self._cursor.get(key, 0)
+            self._cursor[key] = index + 1
+            return entries[index % len(entries)]
+    
+    def latencies_by_source(self) -> Dict[str, List[float]]:
+        latencies: Dict[str, List[float]] = {}
+        for entries in self.entries.values():
+            for entry in entries:
+                latencies.setdefault(entry.get('source', 'default'), []).append(entry['latency'])
+        return latencies
+
+
+class RecordingTransport(HttpTransport):
+    """
+    Transporte real que grava cada resposta (status, corpo, latência) nas fixtures
+    
+    As fixtures são gravadas no arquivo ao final do processo (ou com save()).
+    """
+    
+    def __init__(self, fixtures_path: str = DEFAULT_FIXTURES_PATH, **kwargs):
+        super().__init__(**kwargs)
+        self.store = FixtureStore(fixtures_path)
+        if os.path.exists(fixtures_path):
+            self.store.load()
+        atexit.register(self.save)
+    
+    def request(self, method: str, url: str, source: str = 'default', **kwargs) -> requests.Response:
+        key = request_key(method, url, kwargs.get('params'), kwargs.get('json'), kwargs.get('data'))
+        start = time.monotonic()
+        response = super().request(method, url, source=source, **kwargs)
+        
+        self.store.add({
+            'key': key,
+            'source': source,
+            'method': method.upper(),
+            'url': response.url or url,
+            'status': response.status_code,
+            'reason': response.reason,
+            'headers': {name: response.headers[name] for name in KEPT_HEADERS if name in response.headers},
+            'body': response.text,
+            'latency': round(time.monotonic() - start, 4)
+        })
+        return response
+    
+    def save(self):
+        self.store.save()
+
+
+class ReplayTransport(HttpTransport):
+    """
+    Transporte sem rede que responde com as fixtures gravadas
+    
+    Latência reproduzida:
+    - 'recorded': a latência gravada em cada resposta
+    - 'synthetic': sorteada de uma log-normal por fonte (mediana e p90 das
+      gravações, ou de latency_profile)
+    - 'none': sem espera
+    
+    Requisições que não estão nas fixtures levantam ReplayMiss (tratada pelo
+    motor como falha de conexão). Limites de taxa e retries não são aplicados.
+    """
+    
+    def __init__(self, fixtures_path: str = DEFAULT_FIXTURES_PATH, latency: str = 'recorded',
+                 latency_scale: float = 1.0,
+                 latency_profile: Optional[Dict[str, Tuple[float, float]]] = None,
+                 seed: Optional[int] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.store = FixtureStore(fixtures_path).load()
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self.misses = 0
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        
+        # Fonte → (mediana, p90) em segundos
+        self.latency_profile = self._profile_from_fixtures()
+        if latency_profile:
+            self.latency_profile.update(latency_profile)
+    
+    def _profile_from_fixtures(self) -> Dict[str, Tuple[float, float]]:
+        profile = {}
+        for source, latencies in self.store.latencies_by_source().items():
+            latencies = sorted(latencies)
+            median = latencies[len(latencies) // 2]
+            p90 = latencies[min(len(latencies) - 1, math.ceil(0.9 * len(latencies)) - 1)]
+            profile[source] = (median, max(p90, median))
+        return profile
+    
+    def _delay(self, entry: Dict, source: str) -> float:
+        if self.latency == 'none':
+            return 0.0
+        if self.latency == 'recorded':
+            return entry['latency'] * self.latency_scale
+        
+        median, p90 = self.latency_profile.get(source, (entry['latency'], entry['latency']))
+        if median <= 0:
+            return 0.0
+        
+        sigma = math.log(max(p90, median) / median) / _Z90
+        with self._random_lock:
+            sample = self._random.lognormvariate(math.log(median), sigma)
+        return sample * self.latency_scale
+    
+    def request(self, method: str, url: str, source: str = 'default', **kwargs) -> requests.Response:
+        key = request_key(method, url, kwargs.get('params'), kwargs.get('json'), kwargs.get('data'))
+        entry = self.store.next(key)
+        
+        if entry is None:
+            self.misses += 1
+            raise ReplayMiss(f"Requisição não gravada nas fixtures: {key}")
+        
+        delay = self._delay(entry, entry.get('source', source))
+        if delay > 0:
+            time.sleep(delay)
+        
+        return build_response(entry, entry.get('url', url))
+
+
+def transport_from_env() -> Optional[HttpTransport]:
+    """
+    Transporte de gravação ou reprodução conforme HTTP_REPLAY_MODE
+    
+    Retorna None se a variável não estiver definida (transporte normal).
+    """
+    mode = os.environ.get(ENV_MODE, '').strip().lower()
+    path = os.environ.get(ENV_FIXTURES, DEFAULT_FIXTURES_PATH)
+    
+    if mode == 'record':
+        return RecordingTransport(path)
+    if mode == 'replay':
+        return ReplayTransport(
+            path,
+            latency=os.environ.get(ENV_LATENCY, 'recorded'),
+            latency_scale=float(os.environ.get(ENV_LATENCY_SCALE, '1.0'))
+        )
+    return None
@@ -0,0 +1,414 @@
+"""
+Camada de transporte HTTP compartilhada
+Pool de conexões keep-alive por host, retry com backoff, timeouts e limite de taxa por fonte
+"""
+
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# Status que indicam falha temporária do servidor (vale tentar de novo)
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# Métodos repetidos automaticamente em 5xx e falhas de conexão; os demais (POST)
+# só com retries explícito, pois a requisição pode ter sido processada
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+
+# Timeouts (conexão, leitura) em segundos por fonte
+DEFAULT_TIMEOUTS = {
+    'default': (3.05, 10),
+    'openlibrary': (3.05, 10),
+    'openlibrary_refs': (3.05, 5),  # /authors/... e /publishers/...
+    'google_books': (3.05, 10),
+    'isbndb': (3.05, 10),
+    'worldcat': (3.05, 8),
+    'google_search': (3.05, 10),
+    'mercado_editorial': (3.05, 8),
+    'isbn_brazil': (3.05, 8),
+    'openrouter': (10, 60),  # respostas da IA (com ferramentas) podem demorar
+}
+
+# Limite de taxa (requisições por segundo, rajada) por fonte; fontes fora da lista não são limitadas
+DEFAULT_RATE_LIMITS = {
+    'openlibrary': (5.0, 10),
+    'openlibrary_refs': (5.0, 10),
+    'google_books': (5.0, 10),
+    'isbndb': (1.0, 1),  # plano básico da ISBNdb: 1 req/s
+}
+
+# Respostas 429 repetidas por fonte (tentativas, espera máxima em segundos);
+# fontes fora da lista usam rate_limit_retries e max_queue_wait do transporte
+DEFAULT_RATE_LIMIT_BUDGETS = {
+    'openrouter': (1, 5.0),  # chamada interativa da IA: não prender a interface
+}
+
+
+class RateLimitExceeded(requests.exceptions.RequestException):
+    """A requisição esperaria mais que o máximo permitido na fila do limite de taxa"""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Converte o header Retry-After (segundos ou data HTTP) em segundos de espera"""
+    if not value:
+        return None
+    
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    Limite de taxa de uma fonte (token bucket)
+    
+    Requisições acima da taxa esperam na fila em vez de falhar. Um 429 reduz a
+    taxa pela metade e pausa o bucket pelo Retry-After; respostas bem-sucedidas
+    recuperam a taxa aos poucos até o valor configurado.
+    """
+    
+    def __init__(self, rate: float, burst: int, min_rate_ratio: float = 0.1,
+                 recovery_ratio: float = 0.05):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = rate * min_rate_ratio
+        self.recovery_step = rate * recovery_ratio
+        
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+    
+    def _refill(self, now: float):
+        if now > self._updated:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+    
+    def reserve(self) -> float:
+        """Reserva um token e retorna quantos segundos esperar antes de usá-lo"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            
+            # Durante uma pausa os tokens só voltam a acumular quando ela termina
+            deficit = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(self._updated - now + deficit, self._paused_until - now)
+    
+    def _pause_remaining(self) -> float:
+        with self._lock:
+            return self._paused_until - time.monotonic()
+    
+    def _cancel_reservation(self):
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + 1)
+    
+    def acquire(self, max_wait: Optional[float] = None) -> bool:
+        """Espera a vez da requisição; False se a espera passar de max_wait"""
+        deadline = None if max_wait is None else time.monotonic() + max_wait
+        wait = self.reserve()
+        
+        # Uma pausa (Retry-After) pode chegar enquanto a requisição espera na fila
+        while wait > 0:
+            if deadline is not None and time.monotonic() + wait > deadline:
+                self._cancel_reservation()
+                return False
+            time.sleep(wait)
+            wait = self._pause_remaining()
+        
+        return True
+    
+    async def acquire_async(self, max_wait: Optional[float] = None) -> bool:
+        """Mesmo que acquire(), sem bloquear o event loop"""
+        deadline = None if max_wait is None else time.monotonic() + max_wait
+        wait = self.reserve()
+        
+        while wait > 0:
+            if deadline is not None and time.monotonic() + wait > deadline:
+                self._cancel_reservation()
+                return False
+            await asyncio.sleep(wait)
+            wait = self._pause_remaining()
+        
+        return True
+    
+    def on_rate_limited(self, retry_after: Optional[float] = None):
+        """Resposta 429: reduzir a taxa e pausar pelo Retry-After (ou pelo backoff)"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = min(self._tokens, 0.0)
+            
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+                # Não acumular tokens durante a pausa
+                self._updated = max(self._updated, self._paused_until)
+    
+    def on_success(self):
+        """Resposta aceita: recuperar a taxa gradualmente"""
+        if self.rate < self.max_rate:
+            with self._lock:
+                self.rate = min(self.max_rate, self.rate + self.recovery_step)
+    
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                'rate': round(self.rate, 3),
+                'max_rate': self.max_rate,
+                'burst': self.burst,
+                'tokens': round(self._tokens, 2),
+                'paused_for': round(max(0.0, self._paused_until - time.monotonic()), 2),
+            }
+
+
+class HttpTransport:
+    """Sessões HTTP reutilizáveis (uma por host) usadas por todas as fontes de busca"""
+    
+    def __init__(self, timeouts: Optional[Dict[str, Tuple[float, float]]] = None,
+                 max_retries: int = 2, backoff_base: float = 0.3, backoff_max: float = 5.0,
+                 pool_maxsize: int = 10,
+                 rate_limits: Optional[Dict[str, Tuple[float, int]]] = None,
+                 rate_limit_retries: int = 5, max_queue_wait: float = 60.0,
+                 rate_limit_budgets: Optional[Dict[str, Tuple[int, float]]] = None):
+        self.timeouts = dict(DEFAULT_TIMEOUTS)
+        if timeouts:
+            self.timeouts.update(timeouts)
+        
+        self.rate_limits = dict(DEFAULT_RATE_LIMITS)
+        if rate_limits:
+            self.rate_limits.update(rate_limits)
+        
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.pool_maxsize = pool_maxsize
+        
+        # Respostas 429 são repetidas à parte (esperando o Retry-After), até
+        # rate_limit_retries vezes e sem passar de max_queue_wait na fila
+        self.rate_limit_retries = rate_limit_retries
+        self.max_queue_wait = max_queue_wait
+        self.rate_limit_budgets = dict(DEFAULT_RATE_LIMIT_BUDGETS)
+        if rate_limit_budgets:
+            self.rate_limit_budgets.update(rate_limit_budgets)
+        
+        self._sessions: Dict[str, requests.Session] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+    
+    # ==================== CONFIGURAÇÃO ====================
+    
+    def get_timeout(self, source: str) -> Tuple[float, float]:
+        """Retorna o timeout (conexão, leitura) configurado para a fonte"""
+        return self.timeouts.get(source, self.timeouts['default'])
+    
+    def set_timeout(self, source: str, connect: float, read: float):
+        """Define o timeout (conexão, leitura) de uma fonte"""
+        self.timeouts[source] = (connect, read)
+    
+    def set_rate_limit(self, source: str, rate: Optional[float], burst: int = 1):
+        """Define o limite de taxa (req/s, rajada) de uma fonte; rate=None remove o limite"""
+        with self._lock:
+            if rate is None:
+                self.rate_limits.pop(source, None)
+            else:
+                self.rate_limits[source] = (rate, burst)
+            self._buckets.pop(source, None)
+    
+    def get_bucket(self, source: str) -> Optional[TokenBucket]:
+        """Token bucket da fonte (None se a fonte não tem limite de taxa)"""
+        bucket = self._buckets.get(source)
+        if bucket is not None or source not in self.rate_limits:
+            return bucket
+        
+        with self._lock:
+            bucket = self._buckets.get(source)
+            if bucket is None and source in self.rate_limits:
+                rate, burst = self.rate_limits[source]
+                bucket = TokenBucket(rate, burst)
+                self._buckets[source] = bucket
+        
+        return bucket
+    
+    def get_rate_limit_budget(self, source: str) -> Tuple[int, float]:
+        """(tentativas, espera máxima em s) para respostas 429 da fonte"""
+        return self.rate_limit_budgets.get(source, (self.rate_limit_retries, self.max_queue_wait))
+    
+    def rate_limit_snapshot(self) -> Dict[str, Dict]:
+        """Taxa atual, tokens e pausa de cada fonte limitada (para debug)"""
+        return {source: bucket.snapshot() for source, bucket in list(self._buckets.items())}
+    
+    # ==================== SESSÕES ====================
+    
+    def _get_session(self, url: str) -> requests.Session:
+        """Retorna a sessão keep-alive do host da URL (criada na primeira chamada)"""
+        parsed = urlparse(url)
+        host_key = f"{parsed.scheme}://{parsed.netloc}"
+        
+        session = self._sessions.get(host_key)
+        if session is not None:
+            return session
+        
+        with self._lock:
+            session = self._sessions.get(host_key)
+            if session is None:
+                session = requests.Session()
+                session.headers.update({'User-Agent': 'Book-Cataloger/1.0'})
+                
+                # Retry é feito por request() para aplicar o backoff com jitter
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize, max_retries=0)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                
+                self._sessions[host_key] = session
+        
+        return session
+    
+    def close(self):
+        """Fecha todas as conexões abertas"""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+    
+    # ==================== REQUISIÇÕES ====================
+    
+    def backoff_delay(self, attempt: int) -> float:
+        """Espera antes da próxima tentativa (backoff exponencial com jitter total)"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+    
+    def request(self, method: str, url: str, source: str = 'default',
+                timeout=None, retries: Optional[int] = None,
+                max_queue_wait: Optional[float] = None, **kwargs) -> requests.Response:
+        """
+        Executa uma requisição usando o pool do host.
+        
+        Respostas 5xx e falhas de conexão são repetidas até `retries` vezes
+        (padrão: max_retries nos métodos idempotentes, nenhuma no POST);
+        timeouts de leitura não são repetidos para não multiplicar a espera.
+        
+        Fontes com limite de taxa esperam na fila do seu token bucket. Respostas
+        429 respeitam o Retry-After e são repetidas conforme o orçamento da
+        fonte (get_rate_limit_budget). `max_queue_wait` limita a espera na fila
+        e pelos Retry-After desta requisição, somadas todas as tentativas
+        (padrão: o do transporte a cada espera, feito para lotes; buscas
+        interativas passam um valor menor).
+        """
+        if timeout is None:
+            timeout = self.get_timeout(source)
+        if retries is None:
+            retries = self.max_retries if method.upper() in IDEMPOTENT_METHODS else 0
+        
+        session = self._get_session(url)
+        bucket = self.get_bucket(source)
+        rate_limit_retries, max_rate_limit_wait = self.get_rate_limit_budget(source)
+        wait_deadline = None
+        if max_queue_wait is None:
+            max_queue_wait = self.max_queue_wait
+        else:
+            wait_deadline = time.monotonic() + max_queue_wait
+        attempt = 0
+        rate_limited = 0
+        
+        while True:
+            # Espera restante desta requisição (fila + Retry-After das tentativas anteriores)
+            queue_wait = max_queue_wait
+            if wait_deadline is not None:
+                queue_wait = max(0.0, wait_deadline - time.monotonic())
+            
+            if bucket is not None and not bucket.acquire(max_wait=queue_wait):
+                raise RateLimitExceeded(f"Fila do limite de taxa de '{source}' excedeu {max_queue_wait}s")
+            
+            try:
+                response = session.request(method, url, timeout=timeout, **kwargs)
+            except requests.exceptions.ConnectionError:
+                if attempt >= retries:
+                    raise
+                time.sleep(self.backoff_delay(attempt))
+                attempt += 1
+                continue
+            
+            if response.status_code == 429:
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                delay = retry_after if retry_after is not None else self.backoff_delay(rate_limited)
+                
+                # Com bucket, a pausa vale para todas as requisições da fonte
+                if bucket is not None:
+                    bucket.on_rate_limited(delay)
+                
+                if wait_deadline is not None:
+                    queue_wait = max(0.0, wait_deadline - time.monotonic())
+                if rate_limited >= rate_limit_retries or delay > min(max_rate_limit_wait, queue_wait):
+                    return response
+                
+                response.close()
+                if bucket is None:
+                    time.sleep(delay)
+                rate_limited += 1
+                continue
+            
+            if response.status_code in RETRY_STATUS and attempt < retries:
+                response.close()
+                time.sleep(self.backoff_delay(attempt))
+                attempt += 1
+                continue
+            
+            if bucket is not None and response.status_code not in RETRY_STATUS:
+                bucket.on_success()
+            
+            return response
+    
+    def get(self, url: str, source: str = 'default', **kwargs) -> requests.Response:
+        return self.request('GET', url, source=source, **kwargs)
+    
+    def post(self, url: str, source: str = 'default', **kwargs) -> requests.Response:
+        return self.request('POST', url, source=source, **kwargs)
+
+
+# ==================== TRANSPORTE PADRÃO DO PROCESSO ====================
+
+_default_transport: Optional[HttpTransport] = None
+_default_lock = threading.Lock()
+
+
+def get_transport() -> HttpTransport:
+    """
+    Retorna o transporte HTTP compartilhado pelo processo
+    
+    Com HTTP_REPLAY_MODE=record|replay, o transporte padrão grava ou reproduz
+    as respostas das fontes (ver http_replay).
+    """
+    global _default_transport
+    
+    if _default_transport is None:
+        with _default_lock:
+            if _default_transport is None:
+                # Import tardio: http_replay depende deste módulo
+                from http_replay import transport_from_env
+                _default_transport = transport_from_env() or HttpTransport()
+    
+    return _default_transport
+
+
+def set_transport(transport: HttpTransport):
+    """Substitui o transporte padrão do processo"""
+    global _default_transport
+    
+    with _default_lock:
+        _default_transport = transport
@@ -0,0 +1,115 @@
+"""
+Utilitários de ISBN
+Validação de dígito verificador, conversão ISBN-10/ISBN-13 e forma canônica (ISBN-13)
+"""
+
+from typing import Iterable, List, Optional
+
+
+def clean_isbn(value) -> str:
+    """Remove hífens, espaços e outros separadores (mantém dígitos e X)"""
+    if value is None:
+        return ''
+    return ''.join(ch for ch in str(value) if ch.isdigit() or ch in 'xX').upper()
+
+
+# ==================== VALIDAÇÃO ====================
+
+def is_valid_isbn10(value) -> bool:
+    isbn = clean_isbn(value)
+    if len(isbn) != 10 or not isbn[:9].isdigit() or not (isbn[9].isdigit() or isbn[9] == 'X'):
+        return False
+    
+    total = sum((10 - i) * int(ch) for i, ch in enumerate(isbn[:9]))
+    total += 10 if isbn[9] == 'X' else int(isbn[9])
+    return total % 11 == 0
+
+
+def is_valid_ean13(value) -> bool:
+    """EAN-13 com dígito verificador correto (qualquer prefixo)"""
+    code = clean_isbn(value)
+    if len(code) != 13 or not code.isdigit():
+        return False
+    
+    total = sum(int(ch) * (1 if i % 2 == 0 else 3) for i, ch in enumerate(code[:12]))
+    return (10 - total % 10) % 10 == int(code[12])
+
+
+def is_valid_isbn13(value) -> bool:
+    """EAN-13 válido com prefixo de livro (978/979)"""
+    isbn = clean_isbn(value)
+    return is_valid_ean13(isbn) and isbn[:3] in ('978', '979')
+
+
+def is_valid_isbn(value) -> bool:
+    return is_valid_isbn10(value) or is_valid_isbn13(value)
+
+
+# ==================== CONVERSÃO ====================
+
+def isbn10_to_isbn13(value) -> Optional[str]:
+    """Converte ISBN-10 válido para ISBN-13 (prefixo 978)"""
+    isbn = clean_isbn(value)
+    if not is_valid_isbn10(isbn):
+        return None
+    
+    body = '978' + isbn[:9]
+    total = sum(int(ch) * (1 if i % 2 == 0 else 3) for i, ch in enumerate(body))
+    return body + str((10 - total % 10) % 10)
+
+
+def isbn13_to_isbn10(value) -> Optional[str]:
+    """Converte ISBN-13 válido para ISBN-10 (só existe para o prefixo 978)"""
+    isbn = clean_isbn(value)
+    if not is_valid_isbn13(isbn) or not isbn.startswith('978'):
+        return None
+    
+    body = isbn[3:12]
+    total = sum((10 - i) * int(ch) for i, ch in enumerate(body))
+    check = (11 - total % 11) % 11
+    return body + ('X' if check == 10 else str(check))
+
+
+def canonical_isbn(value) -> Optional[str]:
+    """ISBN-13 canônico do valor lido, ou None se não for um ISBN válido"""
+    isbn = clean_isbn(value)
+    
+    if len(isbn) == 10:
+        return isbn10_to_isbn13(isbn)
+    if is_valid_isbn13(isbn):
+        return isbn
+    
+    return None
+
+
+def isbn_aliases(value) -> List[str]:
+    """
+    Todas as formas do mesmo ISBN: ISBN-13, ISBN-10 (se houver) e o valor lido
+    
+    Útil para encontrar registros antigos gravados com a forma de 10 dígitos
+    ou com separadores.
+    """
+    aliases = []
+    isbn13 = canonical_isbn(value)
+    
+    if isbn13:
+        aliases.append(isbn13)
+        isbn10 = isbn13_to_isbn10(isbn13)
+        if isbn10:
+            aliases.append(isbn10)
+    
+    raw = str(value).strip() if value is not None else ''
+    if raw and raw not in aliases:
+        aliases.append(raw)
+    
+    return aliases
+
+
+def canonical_isbns(values: Iterable) -> List[str]:
+    """ISBN-13 canônicos (sem repetição) de uma lista de identificadores; inválidos são ignorados"""
+    result = []
+    for value in values:
+        isbn13 = canonical_isbn(value)
+        if isbn13 and isbn13 not in result:
+            result.append(isbn13)
+    return result
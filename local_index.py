@@ -0,0 +1,163 @@
+"""
+Índice local de livros (SQLite)
+Consulta por ISBN-13 sem rede, alimentada por dumps/exportações (Open Library, MARC21)
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from isbn_utils import canonical_isbn
+
+
+DEFAULT_INDEX_PATH = os.environ.get('LOCAL_INDEX_PATH', 'local_index.db')
+
+BOOK_FIELDS = ['title', 'author', 'publisher', 'genre', 'year', 'cover_url', 'source']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS books (
+    isbn TEXT PRIMARY KEY,
+    title TEXT,
+    author TEXT,
+    publisher TEXT,
+    genre TEXT,
+    year TEXT,
+    cover_url TEXT,
+    source TEXT
+);
+
+CREATE TABLE IF NOT EXISTS authors (
+    key TEXT PRIMARY KEY,
+    name TEXT
+);
+"""
+
+# Campo novo vazio não apaga o que outra importação já gravou
+UPSERT_BOOK = """
+INSERT INTO books (isbn, title, author, publisher, genre, year, cover_url, source)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(isbn) DO UPDATE SET
+    title = COALESCE(NULLIF(excluded.title, ''), books.title),
+    author = COALESCE(NULLIF(excluded.author, ''), books.author),
+    publisher = COALESCE(NULLIF(excluded.publisher, ''), books.publisher),
+    genre = COALESCE(NULLIF(excluded.genre, ''), books.genre),
+    year = COALESCE(NULLIF(excluded.year, ''), books.year),
+    cover_url = COALESCE(NULLIF(excluded.cover_url, ''), books.cover_url),
+    source = COALESCE(NULLIF(excluded.source, ''), books.source)
+"""
+
+# Limite de parâmetros por query do SQLite (versões antigas: 999)
+_MAX_SQL_PARAMS = 900
+
+
+class LocalBookIndex:
+    """
+    Índice de livros em um arquivo SQLite, indexado por ISBN-13
+    
+    Leituras usam uma conexão por thread (as sessões do Streamlit rodam em
+    threads diferentes); a importação usa uma conexão própria em modo WAL.
+    """
+    
+    def __init__(self, path: str = DEFAULT_INDEX_PATH):
+        self.path = path
+        self._local = threading.local()
+        
+        conn = self._connect()
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+            conn.commit()
+        finally:
+            conn.close()
+    
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, check_same_thread=False)
+    
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+    
+    # ==================== CONSULTA ====================
+    
+    def lookup(self, isbn: str) -> Optional[Dict]:
+        """Dados do livro pelo ISBN (qualquer forma), ou None se não estiver no índice"""
+        isbn13 = canonical_isbn(isbn)
+        if not isbn13:
+            return None
+        
+        row = self._reader().execute('SELECT * FROM books WHERE isbn = ?', (isbn13,)).fetchone()
+        return dict(row) if row else None
+    
+    def count(self) -> int:
+        return self._reader().execute('SELECT COUNT(*) FROM books').fetchone()[0]
+    
+    # ==================== IMPORTAÇÃO ====================
+    
+    def writer(self) -> sqlite3.Connection:
+        """Conexão para importação em lote (o chamador faz commit e close)"""
+        conn = self._connect()
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+    
+    @staticmethod
+    def upsert_books(conn: sqlite3.Connection, books: Iterable[Dict]) -> int:
+        """Insere/atualiza livros ({'isbn': ..., 'title': ..., ...}); ISBNs inválidos são ignorados"""
+        rows = []
+        for book in books:
+            isbn13 = canonical_isbn(book.get('isbn'))
+            if isbn13:
+                rows.append((isbn13, *[book.get(field) or '' for field in BOOK_FIELDS]))
+        
+        conn.executemany(UPSERT_BOOK, rows)
+        return len(rows)
+    
+    @staticmethod
+    def upsert_authors(conn: sqlite3.Connection, authors: Iterable[tuple]):
+        """Insere/atualiza pares (chave /authors/OL...A, nome)"""
+        conn.executemany('INSERT OR REPLACE INTO authors (key, name) VALUES (?, ?)', authors)
+    
+    @staticmethod
+    def author_names(conn: sqlite3.Connection, keys: List[str]) -> Dict[str, str]:
+        """Resolve chaves de autores já importados em nomes"""
+        names = {}
+        keys = list(dict.fromkeys(keys))
+        
+        for start in range(0, len(keys), _MAX_SQL_PARAMS):
+            chunk = keys[start:start + _MAX_SQL_PARAMS]
+            placeholders = ','.join('?' * len(chunk))
+            for key, name in conn.execute(f'SELECT key, name FROM authors WHERE key IN ({placeholders})', chunk):
+                names[key] = name
+        
+        return names
+    
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+# ==================== ÍNDICE PADRÃO DO PROCESSO ====================
+
+_default_index: Optional[LocalBookIndex] = None
+_default_lock = threading.Lock()
+
+
+def get_local_index() -> Optional[LocalBookIndex]:
+    """Índice local compartilhado pelo processo (None se o arquivo ainda não foi gerado)"""
+    global _default_index
+    
+    if _default_index is None and os.path.exists(DEFAULT_INDEX_PATH):
+        with _default_lock:
+            if _default_index is None:
+                try:
+                    _default_index = LocalBookIndex(DEFAULT_INDEX_PATH)
+                except sqlite3.Error:
+                    return None
+    
+    return _default_index
@@ -0,0 +1,183 @@
+"""
+Leitor de registros MARC21 (ISO 2709)
+Lê arquivos .mrc registro a registro e extrai ISBN, título, autor, editora, assunto e ano
+"""
+
+import re
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from isbn_utils import canonical_isbn
+
+
+RECORD_TERMINATOR = b'\x1d'
+FIELD_TERMINATOR = b'\x1e'
+SUBFIELD_DELIMITER = b'\x1f'
+
+LEADER_LENGTH = 24
+DIRECTORY_ENTRY_LENGTH = 12
+
+# Pontuação ISBD no fim dos subcampos (ex.: "Dom Casmurro /", "São Paulo :")
+_TRAILING_PUNCTUATION = re.compile(r'[\s/:;,=.]+$')
+_ISBN_CANDIDATE = re.compile(r'[0-9][0-9\-\s]{8,16}[0-9Xx]')
+
+
+def _decode(data: bytes, utf8: bool) -> str:
+    # Registros antigos em MARC-8 costumam estar em Latin-1 na prática;
+    # caracteres combinantes do MARC-8 não são convertidos
+    if utf8:
+        return data.decode('utf-8', errors='replace')
+    try:
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        return data.decode('latin-1')
+
+
+def _clean(value: str) -> str:
+    return _TRAILING_PUNCTUATION.sub('', value.strip()).strip()
+
+
+class MarcRecord:
+    """Um registro MARC21 já separado em campos e subcampos"""
+    
+    def __init__(self, leader: str, fields: List[Tuple[str, str, List[Tuple[str, str]]]]):
+        self.leader = leader
+        # (tag, indicadores, [(código do subcampo, valor)]) — campos de controle têm um único subcampo ''
+        self.fields = fields
+    
+    def subfields(self, tag: str, code: str) -> List[str]:
+        """Valores do subcampo `code` em todas as ocorrências do campo `tag`"""
+        return [
+            value for field_tag, _, subfields in self.fields if field_tag == tag
+            for subfield_code, value in subfields if subfield_code == code
+        ]
+    
+    def first(self, tags: List[str], code: str = 'a') -> Optional[str]:
+        """Primeiro valor não vazio do subcampo entre os campos informados (em ordem)"""
+        for tag in tags:
+            for value in self.subfields(tag, code):
+                cleaned = _clean(value)
+                if cleaned:
+                    return cleaned
+        return None
+    
+    # ==================== CAMPOS DE INTERESSE ====================
+    
+    def isbns(self) -> List[str]:
+        """ISBNs (campo 020 $a), normalizados para ISBN-13; qualificadores como "(broch.)" são ignorados"""
+        result = []
+        for value in self.subfields('020', 'a'):
+            match = _ISBN_CANDIDATE.search(value)
+            isbn13 = canonical_isbn(match.group(0)) if match else None
+            if isbn13 and isbn13 not in result:
+                result.append(isbn13)
+        return result
+    
+    def title(self) -> Optional[str]:
+        title = self.first(['245'], 'a')
+        subtitle = self.first(['245'], 'b')
+        if title and subtitle:
+            return f"{title}: {subtitle}"
+        return title
+    
+    def author(self) -> Optional[str]:
+        # Autor pessoal, entidade, evento; depois entradas secundárias
+        return self.first(['100', '110', '111', '700', '710'], 'a')
+    
+    def publisher(self) -> Optional[str]:
+        return self.first(['264', '260'], 'b')
+    
+    def year(self) -> Optional[str]:
+        date = self.first(['264', '260'], 'c')
+        if date:
+            match = re.search(r'\d{4}', date)
+            if match:
+                return match.group(0)
+        return None
+    
+    def subject(self) -> Optional[str]:
+        return self.first(['650', '651', '655', '600', '610'], 'a')
+    
+    def to_book(self) -> Dict:
+        """Dados no formato do índice local (sem o ISBN)"""
+        return {
+            'title': self.title() or '',
+            'author': self.author() or '',
+            'publisher': self.publisher() or '',
+            'genre': self.subject() or '',
+            'year': self.year() or '',
+        }
+
+
+def parse_record(raw: bytes) -> Optional[MarcRecord]:
+    """Decodifica um registro ISO 2709 (sem o terminador); None se estiver corrompido"""
+    if len(raw) < LEADER_LENGTH:
+        return None
+    
+    try:
+        leader = raw[:LEADER_LENGTH].decode('ascii', errors='replace')
+        base_address = int(leader[12:17])
+    except ValueError:
+        return None
+    
+    utf8 = leader[9] == 'a'
+    directory_end = raw.find(FIELD_TERMINATOR, LEADER_LENGTH)
+    if directory_end < 0:
+        return None
+    
+    directory = raw[LEADER_LENGTH:directory_end]
+    fields = []
+    
+    for offset in range(0, len(directory) - DIRECTORY_ENTRY_LENGTH + 1, DIRECTORY_ENTRY_LENGTH):
+        entry = directory[offset:offset + DIRECTORY_ENTRY_LENGTH]
+        try:
+            tag = entry[:3].decode('ascii')
+            length = int(entry[3:7])
+            start = int(entry[7:12])
+        except ValueError:
+            continue
+        
+        data = raw[base_address + start:base_address + start + length].rstrip(FIELD_TERMINATOR)
+        
+        if tag < '010':
+            # Campo de controle: sem indicadores nem subcampos
+            fields.append((tag, '', [('', _decode(data, utf8))]))
+            continue
+        
+        indicators = _decode(data[:2], utf8)
+        subfields = []
+        for chunk in data[2:].split(SUBFIELD_DELIMITER)[1:]:
+            if chunk:
+                subfields.append((chr(chunk[0]), _decode(chunk[1:], utf8)))
+        
+        fields.append((tag, indicators, subfields))
+    
+    return MarcRecord(leader, fields)
+
+
+def iter_marc_records(stream: BinaryIO, chunk_size: int = 1 << 20) -> Iterator[MarcRecord]:
+    """
+    Percorre um arquivo MARC21 registro a registro
+    
+    O arquivo é lido em blocos e separado pelo terminador de registro, então a
+    memória usada não depende do número de registros. Registros corrompidos
+    são ignorados.
+    """
+    buffer = b''
+    
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        
+        buffer += chunk
+        *records, buffer = buffer.split(RECORD_TERMINATOR)
+        
+        for raw in records:
+            record = parse_record(raw.lstrip(b'\r\n'))
+            if record is not None:
+                yield record
+    
+    if buffer.strip():
+        record = parse_record(buffer.strip())
+        if record is not None:
+            yield record
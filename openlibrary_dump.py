@@ -0,0 +1,131 @@
+"""
+Importação dos dumps da Open Library
+Lê ol_dump_authors / ol_dump_editions (.txt.gz, TSV com JSON) em streaming e grava no índice local
+"""
+
+import gzip
+import json
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from isbn_utils import canonical_isbns
+from local_index import LocalBookIndex
+
+
+SOURCE_NAME = 'Open Library (dump)'
+
+
+def iter_dump_records(path: str, record_type: Optional[str] = None) -> Iterator[Dict]:
+    """
+    Percorre um dump linha a linha, sem carregar o arquivo na memória
+    
+    Cada linha tem: tipo, chave, revisão, data de modificação e o JSON do registro.
+    """
+    opener = gzip.open if path.endswith('.gz') else open
+    
+    with opener(path, 'rt', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            parts = line.rstrip('\n').split('\t', 4)
+            if len(parts) < 5:
+                continue
+            if record_type and parts[0] != record_type:
+                continue
+            
+            try:
+                yield json.loads(parts[4])
+            except ValueError:
+                continue
+
+
+def _batches(records: Iterator, batch_size: int) -> Iterator[List]:
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def ingest_authors(index: LocalBookIndex, path: str, batch_size: int = 10000,
+                   progress: Optional[Callable[[int], None]] = None) -> int:
+    """Importa os nomes de autores (necessário antes das edições)"""
+    total = 0
+    conn = index.writer()
+    
+    try:
+        for batch in _batches(iter_dump_records(path, '/type/author'), batch_size):
+            authors = [(record['key'], record.get('name', '')) for record in batch if record.get('key')]
+            index.upsert_authors(conn, authors)
+            conn.commit()
+            
+            total += len(authors)
+            if progress:
+                progress(total)
+    finally:
+        conn.close()
+    
+    return total
+
+
+def edition_to_books(edition: Dict, author_names: Dict[str, str]) -> List[Dict]:
+    """Converte uma edição do dump em um registro por ISBN-13 da edição"""
+    isbns = canonical_isbns(edition.get('isbn_13', []) + edition.get('isbn_10', []))
+    if not isbns or not edition.get('title'):
+        return []
+    
+    author_keys = [ref.get('key') for ref in edition.get('authors', [])[:3] if isinstance(ref, dict)]
+    authors = [author_names[key] for key in author_keys if author_names.get(key)]
+    
+    title = edition['title']
+    if edition.get('subtitle'):
+        title = f"{title}: {edition['subtitle']}"
+    
+    covers = [cover for cover in edition.get('covers', []) if isinstance(cover, int) and cover > 0]
+    
+    book = {
+        'title': title,
+        'author': ', '.join(authors),
+        'publisher': (edition.get('publishers') or [''])[0],
+        'genre': (edition.get('subjects') or [''])[0],
+        'year': edition.get('publish_date', ''),
+        'cover_url': f"https://covers.openlibrary.org/b/id/{covers[0]}-L.jpg" if covers else '',
+        'source': SOURCE_NAME,
+    }
+    
+    return [dict(book, isbn=isbn) for isbn in isbns]
+
+
+def ingest_editions(index: LocalBookIndex, path: str, batch_size: int = 5000,
+                    progress: Optional[Callable[[int], None]] = None) -> Tuple[int, int]:
+    """
+    Importa as edições com ISBN, resolvendo os autores pela tabela importada
+    
+    Retorna (edições lidas, ISBNs gravados). A memória usada depende só do
+    tamanho do lote.
+    """
+    editions_read = 0
+    isbns_written = 0
+    conn = index.writer()
+    
+    try:
+        for batch in _batches(iter_dump_records(path, '/type/edition'), batch_size):
+            editions_read += len(batch)
+            batch = [edition for edition in batch if edition.get('isbn_13') or edition.get('isbn_10')]
+            
+            author_keys = [
+                ref.get('key') for edition in batch
+                for ref in edition.get('authors', [])[:3] if isinstance(ref, dict) and ref.get('key')
+            ]
+            author_names = index.author_names(conn, author_keys)
+            
+            books = [book for edition in batch for book in edition_to_books(edition, author_names)]
+            isbns_written += index.upsert_books(conn, books)
+            conn.commit()
+            
+            if progress:
+                progress(editions_read)
+    finally:
+        conn.close()
+    
+    return editions_read, isbns_written
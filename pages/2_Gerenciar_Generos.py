@@ -7,6 +7,7 @@ import os
 # Adicionar o diretório pai ao path para importar utils_auth
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils_auth import check_login, get_operador_nome, show_user_info
+from supabase_local import local_client_from_env
 
 # Configuração da página
 st.set_page_config(
@@ -27,6 +28,11 @@ show_user_info()
 def init_supabase():
     """Inicializa conexão com Supabase usando secrets do Streamlit"""
     try:
+        # SUPABASE_LOCAL_PATH: banco SQLite local no lugar do Supabase (sem rede)
+        local_client = local_client_from_env()
+        if local_client is not None:
+            return local_client
+        
         url: str = st.secrets["supabase"]["url"]
         key: str = st.secrets["supabase"]["key"]
         return create_client(url, key)
@@ -0,0 +1,291 @@
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+from datetime import datetime
+import sys
+import os
+
+# Adicionar o diretório pai ao path para importar utils_auth e o motor de busca
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils_auth import check_login, get_operador_nome, show_user_info
+from search_cache import get_search_cache
+from search_telemetry import get_telemetry
+from source_health import get_health_registry, get_hedge_stats
+
+# Configuração da página
+st.set_page_config(
+    page_title="Telemetria da Busca",
+    page_icon="⏱️",
+    layout="wide"
+)
+
+# Verificar login
+if not check_login():
+    st.stop()
+
+# Mostrar info do usuário
+show_user_info()
+
+# As métricas ficam na memória do processo do app (compartilhadas por todas as
+# sessões); são zeradas quando o app reinicia
+telemetry = get_telemetry()
+snapshot = telemetry.snapshot()
+cache_stats = get_search_cache().snapshot()
+
+# Nomes das fontes exibidos nos gráficos
+NOMES_FONTES = {
+    'local_index': 'Índice Local',
+    'openlibrary': 'Open Library',
+    'google_books': 'Google Books',
+    'isbndb': 'ISBNdb'
+}
+
+# Nomes dos desfechos das chamadas e das buscas
+NOMES_RESULTADOS = {
+    'success': 'Encontrado',
+    'miss': 'Não encontrado',
+    'error': 'Erro',
+    'timeout': 'Timeout',
+    'circuit_open': 'Circuito aberto',
+    'rate_limited': 'Fila do limite de taxa'
+}
+
+NOMES_DESFECHOS = {
+    'found': 'Completo',
+    'partial': 'Parcial',
+    'cache': 'Cache',
+    'negative_cache': 'Cache negativo',
+    'not_found': 'Não encontrado',
+    'invalid_isbn': 'ISBN inválido'
+}
+
+# Título
+st.title("⏱️ Telemetria da Busca de Livros")
+st.markdown("### Onde o tempo de cada leitura é gasto")
+st.caption(
+    f"Métricas desde {datetime.fromtimestamp(snapshot['started_at']).strftime('%d/%m/%Y às %H:%M:%S')} "
+    f"({snapshot['uptime_seconds'] / 3600:.1f} h)"
+)
+st.markdown("---")
+
+# KPIs principais
+st.header("📈 Buscas")
+
+searches = snapshot['searches']
+latency = searches['latency']
+outcomes = searches['outcomes']
+total_buscas = latency['count']
+
+col1, col2, col3, col4 = st.columns(4)
+
+with col1:
+    st.metric(
+        label="🔎 Buscas",
+        value=f"{total_buscas:,}".replace(',', '.'),
+        help="Buscas feitas pelo motor (search_book) desde o início do app"
+    )
+
+with col2:
+    st.metric(
+        label="⏱️ Tempo Médio",
+        value=f"{latency['mean_ms']:.0f} ms" if latency['mean_ms'] is not None else "-",
+        help="Tempo total médio de uma busca, do ISBN lido ao resultado"
+    )
+
+with col3:
+    st.metric(
+        label="🐢 p90",
+        value=f"{latency['p90_ms']:.0f} ms" if latency['p90_ms'] is not None else "-",
+        help="90% das buscas terminaram em até este tempo (estimado pelo histograma)"
+    )
+
+with col4:
+    respondidas_cache = outcomes.get('cache', 0) + outcomes.get('negative_cache', 0)
+    st.metric(
+        label="💾 Respondidas pelo Cache",
+        value=f"{respondidas_cache / total_buscas:.0%}" if total_buscas else "-",
+        help="Buscas respondidas pelo cache (positivo ou de ISBNs não encontrados)"
+    )
+
+if total_buscas:
+    col1, col2 = st.columns([2, 1])
+    
+    with col1:
+        df_histograma = pd.DataFrame(latency['buckets'])
+        df_histograma['intervalo'] = df_histograma['le_ms'].apply(
+            lambda limite: f"≤ {limite:,.0f} ms".replace(',', '.') if pd.notna(limite) else "> 10 s"
+        )
+        fig_buscas = px.bar(
+            df_histograma,
+            x='intervalo',
+            y='count',
+            title='Distribuição do Tempo Total das Buscas',
+            labels={'intervalo': 'Tempo', 'count': 'Buscas'},
+            text='count'
+        )
+        fig_buscas.update_traces(textposition='outside')
+        fig_buscas.update_layout(height=400)
+        st.plotly_chart(fig_buscas, use_container_width=True)
+    
+    with col2:
+        df_desfechos = pd.DataFrame([
+            {'desfecho': NOMES_DESFECHOS.get(desfecho, desfecho), 'quantidade': quantidade}
+            for desfecho, quantidade in outcomes.items()
+        ])
+        fig_desfechos = px.pie(
+            df_desfechos,
+            values='quantidade',
+            names='desfecho',
+            title='Desfecho das Buscas',
+            color_discrete_sequence=px.colors.qualitative.Set3
+        )
+        fig_desfechos.update_layout(height=400)
+        st.plotly_chart(fig_desfechos, use_container_width=True)
+else:
+    st.info("Nenhuma busca registrada ainda. As métricas aparecem conforme os livros são lidos na página principal.")
+
+st.markdown("---")
+
+# Fontes
+st.header("🌐 Fontes de Dados")
+
+if snapshot['sources']:
+    df_fontes = pd.DataFrame([
+        {
+            'Fonte': NOMES_FONTES.get(fonte['source'], fonte['source']),
+            'Chamadas': fonte['calls'],
+            **{NOMES_RESULTADOS[resultado]: fonte[resultado] for resultado in NOMES_RESULTADOS},
+            'Taxa de Acerto': fonte['hit_rate'],
+            'Média (ms)': fonte['latency']['mean_ms'],
+            'p50 (ms)': fonte['latency']['p50_ms'],
+            'p90 (ms)': fonte['latency']['p90_ms'],
+            'p99 (ms)': fonte['latency']['p99_ms'],
+            'Máx (ms)': fonte['latency']['max_ms']
+        }
+        for fonte in snapshot['sources']
+    ])
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        df_resultados = df_fontes.melt(
+            id_vars='Fonte',
+            value_vars=list(NOMES_RESULTADOS.values()),
+            var_name='Resultado',
+            value_name='Chamadas'
+        )
+        fig_resultados = px.bar(
+            df_resultados,
+            x='Fonte',
+            y='Chamadas',
+            color='Resultado',
+            title='Resultado das Chamadas por Fonte',
+            barmode='stack'
+        )
+        fig_resultados.update_layout(height=400)
+        st.plotly_chart(fig_resultados, use_container_width=True)
+    
+    with col2:
+        df_latencia = df_fontes.melt(
+            id_vars='Fonte',
+            value_vars=['p50 (ms)', 'p90 (ms)', 'p99 (ms)'],
+            var_name='Percentil',
+            value_name='Latência (ms)'
+        )
+        fig_latencia = px.bar(
+            df_latencia,
+            x='Fonte',
+            y='Latência (ms)',
+            color='Percentil',
+            title='Latência por Fonte',
+            barmode='group'
+        )
+        fig_latencia.update_layout(height=400)
+        st.plotly_chart(fig_latencia, use_container_width=True)
+    
+    st.dataframe(df_fontes, use_container_width=True, hide_index=True)
+    
+    # Estado atual do circuit breaker de cada fonte
+    with st.expander("🔌 Saúde das Fontes (janela recente)", expanded=False):
+        registry = get_health_registry()
+        st.dataframe(
+            pd.DataFrame([
+                {
+                    'Fonte': NOMES_FONTES.get(fonte['source'], fonte['source']),
+                    'Circuito': registry.get(fonte['source']).state,
+                    'Taxa de Erro': round(registry.get(fonte['source']).error_rate(), 3)
+                }
+                for fonte in snapshot['sources']
+            ]),
+            use_container_width=True,
+            hide_index=True
+        )
+else:
+    st.info("Nenhuma chamada às fontes registrada ainda.")
+
+st.markdown("---")
+
+# Cache
+st.header("🗄️ Cache de Buscas")
+
+df_cache = pd.DataFrame(cache_stats)
+df_cache['camada'] = df_cache['camada'].map({
+    'memory': 'Memória',
+    'sqlite': 'SQLite local',
+    'supabase': 'Supabase'
+})
+
+col1, col2 = st.columns([2, 1])
+
+with col1:
+    df_cache_chart = df_cache.melt(
+        id_vars='camada',
+        value_vars=['acertos', 'falhas'],
+        var_name='Leitura',
+        value_name='Quantidade'
+    )
+    fig_cache = px.bar(
+        df_cache_chart,
+        x='camada',
+        y='Quantidade',
+        color='Leitura',
+        title='Acertos e Falhas por Camada do Cache',
+        labels={'camada': 'Camada'},
+        barmode='stack'
+    )
+    fig_cache.update_layout(height=400)
+    st.plotly_chart(fig_cache, use_container_width=True)
+
+with col2:
+    st.markdown("#### 🎯 Taxa de Acerto")
+    for _, camada in df_cache.iterrows():
+        st.metric(
+            label=camada['camada'],
+            value=f"{camada['taxa_acerto']:.0%}" if pd.notna(camada['taxa_acerto']) else "-",
+            help=f"{camada['acertos']} acertos, {camada['falhas']} falhas"
+        )
+
+# Hedge (modo sequencial com fonte reserva)
+hedge = get_hedge_stats().snapshot()
+if hedge['lookups']:
+    st.markdown("---")
+    st.header("🏁 Hedge de Fontes")
+    st.json(hedge)
+
+# Botão de atualizar
+st.markdown("---")
+col1, col2 = st.columns(2)
+
+with col1:
+    if st.button("🔄 Atualizar Telemetria"):
+        st.rerun()
+
+with col2:
+    if st.button("🗑️ Zerar Métricas"):
+        telemetry.reset()
+        st.rerun()
+
+# Rodapé com informações
+st.markdown("---")
+st.caption(f"⏱️ Telemetria lida em: {datetime.now().strftime('%d/%m/%Y às %H:%M:%S')}")
+st.caption("💡 As métricas são do processo do app e são zeradas quando ele reinicia")
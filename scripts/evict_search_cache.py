@@ -0,0 +1,163 @@
+"""
+Mantém cache_api dentro de um limite de linhas e/ou bytes
+
+Uso:
+    python scripts/evict_search_cache.py --max-rows 50000
+    python scripts/evict_search_cache.py --max-mb 200 --policy lru --dry-run
+
+Remove primeiro as entradas menos usadas (candidatos_despejo_cache), em lotes
+pequenos com pausa entre eles, para não prender a tabela enquanto o app lê e
+grava. No fim, mostra um relatório com o que saiu e as entradas mais usadas
+que ficaram.
+
+Requer as colunas ultimo_acesso/acessos e as funções de
+docs/supabase_migrations.sql.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from script_utils import connect_supabase
+
+
+POLICIES = ['hibrida', 'lru', 'lfu']
+
+
+def cache_size(supabase) -> Dict:
+    rows = supabase.rpc('tamanho_cache_api').execute().data or []
+    return rows[0] if rows else {'linhas': 0, 'bytes': 0}
+
+
+def pick_victims(candidates: List[Dict], excess_rows: int, excess_bytes: int) -> List[Dict]:
+    """Menor prefixo dos candidatos que coloca o cache dentro dos dois limites"""
+    victims = []
+    for candidate in candidates:
+        if excess_rows <= 0 and excess_bytes <= 0:
+            break
+        victims.append(candidate)
+        excess_rows -= 1
+        excess_bytes -= candidate['bytes'] or 0
+    return victims
+
+
+def build_report(supabase, evicted: List[Dict], size_before: Dict, size_after: Dict, top: int) -> Dict:
+    hottest_evicted = sorted(evicted, key=lambda entry: entry['acessos'], reverse=True)[:top]
+    # No modo --dry-run as removidas ainda estão na tabela
+    evicted_isbns = {entry['isbn'] for entry in evicted}
+    hottest_retained = [
+        entry for entry in (
+            supabase.table('cache_api').select('isbn, acessos, ultimo_acesso')
+            .order('acessos', desc=True).limit(top * 3).execute().data or []
+        )
+        if entry['isbn'] not in evicted_isbns
+    ][:top]
+    
+    return {
+        'antes': size_before,
+        'depois': size_after,
+        'removidas': len(evicted),
+        'bytes_liberados': sum(entry['bytes'] or 0 for entry in evicted),
+        'acessos_removidas': {
+            'max': max((entry['acessos'] for entry in evicted), default=0),
+            'media': round(sum(entry['acessos'] for entry in evicted) / len(evicted), 2) if evicted else 0
+        },
+        'mais_usadas_removidas': hottest_evicted,
+        'mais_usadas_mantidas': hottest_retained
+    }
+
+
+def print_report(report: Dict, dry_run: bool):
+    before, after = report['antes'], report['depois']
+    verb = "seriam removidas" if dry_run else "removidas"
+    
+    print(f"\n📊 Cache: {before['linhas']:,} linhas / {before['bytes'] / 1e6:.1f} MB "
+          f"→ {after['linhas']:,} linhas / {after['bytes'] / 1e6:.1f} MB")
+    print(f"🗑️ {report['removidas']:,} entradas {verb} ({report['bytes_liberados'] / 1e6:.1f} MB); "
+          f"acessos: máx {report['acessos_removidas']['max']}, média {report['acessos_removidas']['media']}")
+    
+    print("\n🔥 Mais usadas entre as removidas:")
+    for entry in report['mais_usadas_removidas']:
+        print(f"  {entry['isbn']}: {entry['acessos']} acessos (último: {entry['ultimo_acesso']})")
+    
+    print("\n⭐ Mais usadas que ficaram:")
+    for entry in report['mais_usadas_mantidas']:
+        print(f"  {entry['isbn']}: {entry['acessos']} acessos (último: {entry['ultimo_acesso']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Limita o tamanho de cache_api removendo as entradas menos usadas")
+    parser.add_argument('--max-rows', type=int, help="Número máximo de linhas")
+    parser.add_argument('--max-mb', type=float, help="Tamanho máximo em MB")
+    parser.add_argument('--policy', choices=POLICIES, default='hibrida', help="Ordem de remoção")
+    parser.add_argument('--batch-size', type=int, default=500, help="Linhas removidas por lote")
+    parser.add_argument('--pause', type=float, default=0.5, help="Segundos de pausa entre lotes")
+    parser.add_argument('--dry-run', action='store_true', help="Só mostrar o que seria removido")
+    parser.add_argument('--top', type=int, default=10, help="Entradas listadas no relatório")
+    parser.add_argument('--report-json', help="Gravar o relatório neste arquivo")
+    args = parser.parse_args()
+    
+    if args.max_rows is None and args.max_mb is None:
+        parser.error("informe --max-rows e/ou --max-mb")
+    
+    supabase = connect_supabase()
+    size_before = cache_size(supabase)
+    
+    excess_rows = size_before['linhas'] - args.max_rows if args.max_rows is not None else 0
+    excess_bytes = size_before['bytes'] - int(args.max_mb * 1e6) if args.max_mb is not None else 0
+    
+    evicted = []
+    # Pontuações calculadas no mesmo instante em todas as páginas, e cada página
+    # começa depois do último candidato da anterior (sem OFFSET crescente)
+    now = datetime.now(timezone.utc).isoformat()
+    after = None
+    
+    while excess_rows > 0 or excess_bytes > 0:
+        candidates = supabase.rpc('candidatos_despejo_cache', {
+            'politica': args.policy,
+            'limite': args.batch_size,
+            'apos_pontuacao': after['pontuacao'] if after else None,
+            'apos_isbn': after['isbn'] if after else None,
+            'agora': now
+        }).execute().data or []
+        
+        victims = pick_victims(candidates, excess_rows, excess_bytes)
+        if not victims:
+            break
+        
+        after = victims[-1]
+        if not args.dry_run:
+            supabase.table('cache_api').delete().in_('isbn', [victim['isbn'] for victim in victims]).execute()
+        
+        evicted.extend(victims)
+        excess_rows -= len(victims)
+        excess_bytes -= sum(victim['bytes'] or 0 for victim in victims)
+        print(f"  {len(evicted):,} entradas {'selecionadas' if args.dry_run else 'removidas'}", flush=True)
+        
+        if not args.dry_run and args.pause > 0:
+            time.sleep(args.pause)
+    
+    if args.dry_run:
+        size_after = {
+            'linhas': size_before['linhas'] - len(evicted),
+            'bytes': size_before['bytes'] - sum(entry['bytes'] or 0 for entry in evicted)
+        }
+    else:
+        size_after = cache_size(supabase)
+    
+    report = build_report(supabase, evicted, size_before, size_after, args.top)
+    print_report(report, args.dry_run)
+    
+    if args.report_json:
+        with open(args.report_json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,391 @@
+"""
+Gera um acervo sintético (tabelas livro e genero) para testes de escala
+
+Uso:
+    SUPABASE_LOCAL_PATH=escala.db python scripts/generate_synthetic_catalog.py --preset 1m --reset
+    python scripts/generate_synthetic_catalog.py --rows 20000 --seed 7 --dry-run
+
+Os livros seguem o padrão de um acervo real: títulos em português, poucos
+autores e editoras concentrando boa parte dos exemplares, dezenas de
+operadores com produtividade desigual, vários anos de created_at (mais
+leituras nos anos recentes, só em dias úteis e horário de trabalho de
+Brasília, gravado em UTC como no app) e
+exemplares repetidos, lidos juntos ou reaparecendo meses depois.
+
+O mesmo seed, número de linhas e --end-date geram exatamente as mesmas
+linhas, na mesma ordem (ids crescentes com created_at).
+
+Destino: com SUPABASE_LOCAL_PATH (ou --local), grava direto no SQLite do
+cliente local, em lotes grandes; senão, insere no Supabase pelo cliente
+(SUPABASE_URL/SUPABASE_KEY ou .streamlit/secrets.toml).
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from script_utils import connect_supabase
+from supabase_local import SCHEMA, LocalSupabaseClient, get_local_supabase
+
+
+# Número de linhas de livro de cada preset
+PRESETS = {
+    'dev': 10_000,
+    '100k': 100_000,
+    '500k': 500_000,
+    '1m': 1_000_000,
+    '5m': 5_000_000
+}
+
+# Fuso dos operadores (Brasília, sem horário de verão desde 2019): o horário de
+# trabalho é sorteado nele e gravado em UTC
+FUSO_BRASILIA = timezone(timedelta(hours=-3))
+
+# Mesma lista de GENEROS_DISPONIVEIS (book_cataloger.py), na ordem de frequência usada aqui
+GENEROS = [
+    "Romance", "Literatura Infantil", "Ficção", "Didatico", "Infantojuvenil", "Poesia",
+    "Conto", "Crônica", "História", "Biografia", "Fantasia", "Suspense", "Adolescentes",
+    "Educação", "Psicologia", "Filosofia", "Política", "Teatro", "Folclore", "Novela",
+    "Fábula", "Lenda", "Mitologia", "Narrativa", "Autobiografia", "Cultura Afro-brasileira",
+    "Literatura de Cordel", "Culinária", "Afetividade", "Letramento", "Hábito", "Diálogo"
+]
+
+TITULO_INICIO = [
+    'O Segredo', 'A Casa', 'Memórias', 'O Caminho', 'A Hora', 'Histórias', 'O Livro', 'A Vida',
+    'Cartas', 'O Tempo', 'A Cidade', 'Sonhos', 'O Menino', 'A Menina', 'O Mistério', 'Contos',
+    'A Viagem', 'O Jardim', 'Crônicas', 'A Ilha', 'O Guardião', 'As Aventuras', 'O Diário', 'A Lenda',
+    'Poemas', 'O Último Verão', 'A Promessa', 'O Silêncio', 'A Escola', 'O Rio'
+]
+TITULO_FIM = [
+    'do Sertão', 'da Estrela', 'de Minas', 'do Mar', 'das Águas', 'do Vento', 'da Noite', 'de Pedra',
+    'do Cerrado', 'da Saudade', 'de Papel', 'sem Fim', 'da Floresta', 'do Quilombo', 'de Vidro',
+    'da Lua', 'do Pantanal', 'de Outono', 'das Palavras', 'do Farol', 'da Serra', 'de Areia',
+    'do Tempo Perdido', 'da Vovó', 'de Lisboa', 'do Nordeste', 'da Amazônia', 'de Ouro', 'do Circo', 'da Chuva'
+]
+SUBTITULOS = [
+    'uma história de amor', 'edição comentada', 'volume único', 'contos escolhidos', 'edição de bolso',
+    'livro do professor', 'nova ortografia', 'edição ilustrada'
+]
+
+NOMES = [
+    'Ana', 'João', 'Maria', 'Pedro', 'Clarice', 'Jorge', 'Cecília', 'Carlos', 'Raquel', 'Machado',
+    'Lygia', 'Graciliano', 'Rubem', 'Adélia', 'Érico', 'Conceição', 'Ziraldo', 'Ruth', 'Monteiro',
+    'Marina', 'Paulo', 'Fernanda', 'Luís', 'Beatriz', 'Antônio', 'Júlia', 'Manuel', 'Tatiana'
+]
+SOBRENOMES = [
+    'Silva', 'Souza', 'Amado', 'Lispector', 'Meireles', 'Drummond', 'Queiroz', 'Assis', 'Telles',
+    'Ramos', 'Fonseca', 'Prado', 'Veríssimo', 'Evaristo', 'Andrade', 'Lima', 'Rocha', 'Lobato',
+    'Colasanti', 'Belinky', 'Bandeira', 'Cunha', 'Azevedo', 'Alencar', 'Rosa', 'Barbosa', 'Costa', 'Moraes'
+]
+EDITORAS_BASE = [
+    'Companhia das Letras', 'Rocco', 'Record', 'Intrínseca', 'Sextante', 'Globo Livros', 'Editora 34',
+    'Todavia', 'Autêntica', 'Moderna', 'Ática', 'Scipione', 'FTD', 'Saraiva', 'Salamandra', 'Paulus',
+    'Melhoramentos', 'Nova Fronteira', 'Objetiva', 'L&PM', 'Martins Fontes', 'Planeta', 'Zahar', 'Brinque-Book'
+]
+
+# ISBN-13 de editoras brasileiras (978-85, 978-65) e estrangeiras
+PREFIXOS_BR = ['97885', '97865']
+PREFIXOS_EXTERIOR = ['9780', '9781', '97884', '97889']
+
+
+def zipf_index(rng: random.Random, size: int) -> int:
+    """Índice em [0, size) com peso ~ 1/(i+1) (os primeiros concentram as escolhas)"""
+    # (size + 1) ** u fica em [1, size + 1): int(...) - 1 cobre de 0 a size - 1,
+    # com P(i) = log((i + 2) / (i + 1)) / log(size + 1)
+    return min(size - 1, int((size + 1) ** rng.random()) - 1)
+
+
+def isbn13_from_body(body: str) -> str:
+    total = sum(int(ch) * (1 if i % 2 == 0 else 3) for i, ch in enumerate(body))
+    return body + str((10 - total % 10) % 10)
+
+
+def isbn10_from_isbn13(isbn13: str) -> str:
+    body = isbn13[3:12]
+    total = sum((10 - i) * int(ch) for i, ch in enumerate(body))
+    check = (11 - total % 11) % 11
+    return body + ('X' if check == 10 else str(check))
+
+
+class CatalogGenerator:
+    """
+    Gera as linhas de livro em ordem cronológica
+    
+    Cada edição (código de barras, título, autor, editora, gênero) é derivada
+    do seu número e do seed, então um exemplar repetido meses depois é a
+    mesma edição sem precisar guardá-la em memória.
+    """
+    
+    def __init__(self, rows: int, seed: int = 42, years: int = 3, operators: int = 60,
+                 end_date: date = None, repeat_share: float = 0.12, growth: float = 2.0):
+        self.rows = rows
+        self.seed = seed
+        self.years = years
+        self.repeat_share = repeat_share
+        self.growth = growth
+        self.end_date = end_date or date.today()
+        self.rng = random.Random(seed)
+        
+        # Pools com tamanho proporcional ao acervo: autores ~ 1 para cada 40 exemplares
+        self.authors = max(500, rows // 40)
+        self.publishers = max(len(EDITORAS_BASE), rows // 2000)
+        self.operator_names = self._operator_names(operators)
+        self.editions = 0
+    
+    def _operator_names(self, count: int) -> List[str]:
+        rng = random.Random(f"{self.seed}:operadores")
+        names = []
+        while len(names) < count:
+            name = f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)}"
+            if name not in names:
+                names.append(name)
+            elif len(names) >= len(NOMES) * len(SOBRENOMES):
+                names.append(f"{name} {len(names)}")
+        return names
+    
+    def author_name(self, index: int) -> str:
+        first = NOMES[index % len(NOMES)]
+        last = SOBRENOMES[(index // len(NOMES)) % len(SOBRENOMES)]
+        middle = index // (len(NOMES) * len(SOBRENOMES))
+        if middle:
+            return f"{first} {SOBRENOMES[(middle * 7) % len(SOBRENOMES)]} {last}"
+        return f"{first} {last}"
+    
+    def publisher_name(self, index: int) -> str:
+        if index < len(EDITORAS_BASE):
+            return EDITORAS_BASE[index]
+        return f"Editora {SOBRENOMES[index % len(SOBRENOMES)]} {index // len(SOBRENOMES)}"
+    
+    def edition(self, number: int) -> Tuple[str, str, str, str, str]:
+        """(código de barras, título, autor, editora, gênero) da edição `number`"""
+        rng = random.Random(f"{self.seed}:edicao:{number}")
+        
+        prefix = rng.choice(PREFIXOS_BR) if rng.random() < 0.7 else rng.choice(PREFIXOS_EXTERIOR)
+        isbn13 = isbn13_from_body(prefix + ''.join(rng.choice('0123456789') for _ in range(12 - len(prefix))))
+        # Livros antigos trazem só o ISBN-10 impresso
+        barcode = isbn10_from_isbn13(isbn13) if isbn13.startswith('978') and rng.random() < 0.1 else isbn13
+        
+        title = f"{rng.choice(TITULO_INICIO)} {rng.choice(TITULO_FIM)}"
+        roll = rng.random()
+        if roll < 0.15:
+            title += f": {rng.choice(SUBTITULOS)}"
+        elif roll < 0.22:
+            title += f" - Volume {rng.randint(1, 6)}"
+        
+        author = self.author_name(zipf_index(rng, self.authors))
+        publisher = self.publisher_name(zipf_index(rng, self.publishers))
+        genre = GENEROS[zipf_index(rng, len(GENEROS))]
+        
+        return barcode, title, author, publisher, genre
+    
+    def _workdays(self) -> List[date]:
+        start = self.end_date - timedelta(days=365 * self.years)
+        days = (self.end_date - start).days + 1
+        return [start + timedelta(days=offset) for offset in range(days)
+                if (start + timedelta(days=offset)).weekday() < 5]
+    
+    def _copies(self) -> int:
+        """Exemplares da mesma edição lidos juntos (geométrica, média ~1,4)"""
+        copies = 1
+        while copies < 12 and self.rng.random() < 0.3:
+            copies += 1
+        return copies
+    
+    def generate(self) -> Iterator[Tuple[str, str, str, str, str, str, str]]:
+        """(codigo_barras, titulo, autor, editora, gênero, operador, created_at) por linha"""
+        days = self._workdays()
+        # Leituras crescem ao longo do período (o último dia tem 1 + growth vezes o primeiro)
+        weights = [1 + self.growth * index / max(1, len(days) - 1) for index in range(len(days))]
+        total_weight = sum(weights)
+        
+        emitted = 0
+        carry = 0.0
+        
+        for index, (day, weight) in enumerate(zip(days, weights)):
+            if emitted >= self.rows:
+                break
+            
+            if index == len(days) - 1:
+                quota = self.rows - emitted
+            else:
+                exact = self.rows * weight / total_weight + carry
+                quota = min(int(exact), self.rows - emitted)
+                carry = exact - int(exact)
+            
+            # Sessões de leitura do dia: (segundo do dia em Brasília, edição, exemplares, operador)
+            sessions = []
+            planned = 0
+            while planned < quota:
+                if self.editions and self.rng.random() < self.repeat_share:
+                    number = zipf_index(self.rng, self.editions)
+                else:
+                    number = self.editions
+                    self.editions += 1
+                
+                copies = min(self._copies(), quota - planned)
+                second = self.rng.randint(8 * 3600, 18 * 3600 - 1)
+                operator = self.operator_names[zipf_index(self.rng, len(self.operator_names))]
+                sessions.append((second, number, copies, operator))
+                planned += copies
+            
+            day_rows = []
+            for second, number, copies, operator in sessions:
+                barcode, title, author, publisher, genre = self.edition(number)
+                for copy in range(copies):
+                    moment = datetime(day.year, day.month, day.day, tzinfo=FUSO_BRASILIA) + timedelta(
+                        seconds=second + copy * 2, microseconds=self.rng.randint(0, 999_999)
+                    )
+                    moment = moment.astimezone(timezone.utc)
+                    day_rows.append((barcode, title, author, publisher, genre, operator, moment.isoformat()))
+            
+            # Ids crescem com created_at, como no banco real
+            day_rows.sort(key=lambda row: row[6])
+            yield from day_rows
+            
+            emitted += quota
+
+
+# ==================== GRAVAÇÃO ====================
+
+def ensure_generos(supabase) -> Dict[str, int]:
+    """IDs dos gêneros (criando os que faltam)"""
+    existing = {row['nome']: row['id'] for row in supabase.table('genero').select('id, nome').execute().data or []}
+    
+    for nome in GENEROS:
+        if nome not in existing:
+            inserted = supabase.table('genero').insert({'nome': nome}).execute().data
+            existing[nome] = inserted[0]['id']
+    
+    return existing
+
+
+def write_local(client: LocalSupabaseClient, rows: Iterator[Tuple], generos: Dict[str, int],
+                batch_size: int, reset: bool) -> int:
+    """Grava direto no SQLite do cliente local (índices recriados no fim)"""
+    conn = sqlite3.connect(client.path)
+    conn.execute('PRAGMA synchronous=OFF')
+    
+    if reset:
+        conn.execute('DELETE FROM livro')
+        conn.execute("DELETE FROM sqlite_sequence WHERE name = 'livro'")
+    
+    for index_name in ('idx_livro_codigo_barras', 'idx_livro_created_at',
+                       'idx_livro_operador_nome', 'idx_livro_genero_id'):
+        conn.execute(f'DROP INDEX IF EXISTS {index_name}')
+    conn.commit()
+    
+    sql = ('INSERT INTO livro (codigo_barras, titulo, autor, editora, "genero-id", operador_nome, created_at) '
+           'VALUES (?, ?, ?, ?, ?, ?, ?)')
+    written = 0
+    batch = []
+    
+    def flush():
+        conn.executemany(sql, batch)
+        conn.commit()
+    
+    for barcode, title, author, publisher, genre, operator, created_at in rows:
+        batch.append((barcode, title, author, publisher, generos[genre], operator, created_at))
+        if len(batch) >= batch_size:
+            flush()
+            written += len(batch)
+            batch = []
+            print(f"  {written:,} livros", flush=True)
+    
+    if batch:
+        flush()
+        written += len(batch)
+    
+    print("  recriando índices...", flush=True)
+    conn.executescript(SCHEMA)
+    conn.execute('ANALYZE')
+    conn.commit()
+    conn.close()
+    return written
+
+
+def write_supabase(supabase, rows: Iterator[Tuple], generos: Dict[str, int], batch_size: int) -> int:
+    """Insere pelo cliente do Supabase, em lotes"""
+    written = 0
+    batch = []
+    
+    for barcode, title, author, publisher, genre, operator, created_at in rows:
+        batch.append({
+            'codigo_barras': barcode,
+            'titulo': title,
+            'autor': author,
+            'editora': publisher,
+            'genero-id': generos[genre],
+            'operador_nome': operator,
+            'created_at': created_at
+        })
+        if len(batch) >= batch_size:
+            supabase.table('livro').insert(batch).execute()
+            written += len(batch)
+            batch = []
+            print(f"  {written:,} livros", flush=True)
+    
+    if batch:
+        supabase.table('livro').insert(batch).execute()
+        written += len(batch)
+    
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera um acervo sintético para testes de escala")
+    parser.add_argument('--preset', choices=list(PRESETS), default='100k', help="Tamanho do acervo")
+    parser.add_argument('--rows', type=int, help="Número de livros (substitui o preset)")
+    parser.add_argument('--seed', type=int, default=42, help="Semente (mesmo seed = mesmas linhas)")
+    parser.add_argument('--years', type=int, default=3, help="Anos cobertos por created_at")
+    parser.add_argument('--end-date', type=date.fromisoformat, default=date.today(),
+                        help="Último dia de created_at (AAAA-MM-DD; fixe para resultados idênticos)")
+    parser.add_argument('--operators', type=int, default=60, help="Número de operadores")
+    parser.add_argument('--repeat-share', type=float, default=0.12,
+                        help="Fração das leituras que repetem uma edição já catalogada")
+    parser.add_argument('--local', help="Arquivo SQLite do cliente local (padrão: SUPABASE_LOCAL_PATH)")
+    parser.add_argument('--batch-size', type=int, help="Linhas por lote (padrão: 50000 local, 1000 Supabase)")
+    parser.add_argument('--reset', action='store_true', help="Apagar os livros existentes (só no banco local)")
+    parser.add_argument('--dry-run', action='store_true', help="Só gerar e mostrar um resumo, sem gravar")
+    args = parser.parse_args()
+    
+    rows = args.rows or PRESETS[args.preset]
+    generator = CatalogGenerator(rows, seed=args.seed, years=args.years, operators=args.operators,
+                                 end_date=args.end_date, repeat_share=args.repeat_share)
+    
+    print(f"📚 Gerando {rows:,} livros (seed {args.seed}, {args.years} anos até {args.end_date}, "
+          f"{args.operators} operadores)", flush=True)
+    start = time.monotonic()
+    
+    if args.dry_run:
+        written = 0
+        for row in generator.generate():
+            if written < 5:
+                print(f"  {row}")
+            written += 1
+    else:
+        supabase = get_local_supabase(args.local) if args.local else connect_supabase()
+        is_local = isinstance(supabase, LocalSupabaseClient)
+        
+        if args.reset and not is_local:
+            parser.error("--reset só é permitido no banco local; apague os livros do Supabase manualmente")
+        
+        generos = ensure_generos(supabase)
+        if is_local:
+            written = write_local(supabase, generator.generate(), generos, args.batch_size or 50_000, args.reset)
+        else:
+            written = write_supabase(supabase, generator.generate(), generos, args.batch_size or 1000)
+    
+    elapsed = time.monotonic() - start
+    print(f"✅ {written:,} livros ({generator.editions:,} edições distintas) em {elapsed:.0f}s "
+          f"({written / elapsed if elapsed else 0:,.0f} linhas/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Importa registros MARC21 (ISO 2709) para o índice local (SQLite)
+
+Uso:
+    python scripts/import_marc21.py acervo.mrc --source "Biblioteca Nacional"
+
+Aceita arquivos .mrc e .mrc.gz. Só registros com ISBN (campo 020) são gravados;
+cada ISBN do registro vira uma linha do índice.
+"""
+
+import argparse
+import gzip
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from local_index import DEFAULT_INDEX_PATH, LocalBookIndex
+from marc_reader import iter_marc_records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa arquivos MARC21 para o índice local")
+    parser.add_argument('files', nargs='+', help="Arquivos MARC21 (.mrc ou .mrc.gz)")
+    parser.add_argument('--source', default='MARC21', help="Nome da fonte exibido nos resultados")
+    parser.add_argument('--index', default=DEFAULT_INDEX_PATH, help="Arquivo SQLite do índice local")
+    parser.add_argument('--batch-size', type=int, default=5000, help="Registros por transação")
+    args = parser.parse_args()
+    
+    index = LocalBookIndex(args.index)
+    conn = index.writer()
+    start = time.monotonic()
+    records_read = 0
+    isbns_written = 0
+    
+    try:
+        for path in args.files:
+            print(f"📚 Importando {path}...")
+            opener = gzip.open if path.endswith('.gz') else open
+            
+            with opener(path, 'rb') as stream:
+                batch = []
+                for record in iter_marc_records(stream):
+                    records_read += 1
+                    
+                    book = record.to_book()
+                    if not book['title']:
+                        continue
+                    
+                    book['source'] = args.source
+                    batch.extend(dict(book, isbn=isbn) for isbn in record.isbns())
+                    
+                    if len(batch) >= args.batch_size:
+                        isbns_written += index.upsert_books(conn, batch)
+                        conn.commit()
+                        batch = []
+                    
+                    if records_read % 100000 == 0:
+                        print(f"  {records_read:,} registros ({time.monotonic() - start:.0f}s)", flush=True)
+                
+                isbns_written += index.upsert_books(conn, batch)
+                conn.commit()
+    finally:
+        conn.close()
+    
+    print(f"✅ {records_read:,} registros lidos, {isbns_written:,} ISBNs gravados")
+    print(f"📦 Índice {args.index}: {index.count():,} livros ({time.monotonic() - start:.0f}s)")
+
+
+if __name__ == '__main__':
+    main()
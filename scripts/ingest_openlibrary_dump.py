@@ -0,0 +1,58 @@
+"""
+Importa os dumps da Open Library para o índice local (SQLite)
+
+Uso:
+    python scripts/ingest_openlibrary_dump.py \
+        --authors ol_dump_authors_latest.txt.gz \
+        --editions ol_dump_editions_latest.txt.gz \
+        --index local_index.db
+
+Os dumps estão em https://openlibrary.org/developers/dumps. Importe os autores
+antes (ou junto) das edições para que os nomes sejam resolvidos.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from local_index import DEFAULT_INDEX_PATH, LocalBookIndex
+from openlibrary_dump import ingest_authors, ingest_editions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa dumps da Open Library para o índice local")
+    parser.add_argument('--authors', help="Arquivo ol_dump_authors (.txt.gz)")
+    parser.add_argument('--editions', help="Arquivo ol_dump_editions (.txt.gz)")
+    parser.add_argument('--index', default=DEFAULT_INDEX_PATH, help="Arquivo SQLite do índice local")
+    args = parser.parse_args()
+    
+    if not args.authors and not args.editions:
+        parser.error("informe --authors e/ou --editions")
+    
+    index = LocalBookIndex(args.index)
+    start = time.monotonic()
+    
+    def report(label):
+        def progress(count):
+            if count % 100000 < 10000:
+                print(f"  {label}: {count:,} registros ({time.monotonic() - start:.0f}s)", flush=True)
+        return progress
+    
+    if args.authors:
+        print(f"📚 Importando autores de {args.authors}...")
+        total = ingest_authors(index, args.authors, progress=report('autores'))
+        print(f"✅ {total:,} autores importados")
+    
+    if args.editions:
+        print(f"📚 Importando edições de {args.editions}...")
+        editions, isbns = ingest_editions(index, args.editions, progress=report('edições'))
+        print(f"✅ {editions:,} edições lidas, {isbns:,} ISBNs gravados")
+    
+    print(f"📦 Índice {args.index}: {index.count():,} livros ({time.monotonic() - start:.0f}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Refaz o cache de livros a partir das respostas arquivadas por fonte
+
+Uso:
+    python scripts/reparse_source_archive.py
+    python scripts/reparse_source_archive.py --isbn 9788535914849
+
+Depois de corrigir ou melhorar um parser (tradução de gêneros, autores etc.),
+reconverte as respostas brutas guardadas em cache_api_fontes e regrava
+cache_api, sem consultar nenhuma API externa.
+
+Credenciais do Supabase: variáveis SUPABASE_URL e SUPABASE_KEY, ou a seção
+[supabase] de .streamlit/secrets.toml.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from book_search_engine import create_search_engine
+from script_utils import connect_supabase
+
+
+def iter_archived_isbns(supabase, page_size: int = 1000):
+    """ISBNs distintos de cache_api_fontes, em páginas"""
+    start = 0
+    last_isbn = None
+    
+    while True:
+        response = (
+            supabase.table('cache_api_fontes').select('isbn')
+            .order('isbn').range(start, start + page_size - 1).execute()
+        )
+        rows = response.data or []
+        
+        for row in rows:
+            if row['isbn'] != last_isbn:
+                last_isbn = row['isbn']
+                yield last_isbn
+        
+        if len(rows) < page_size:
+            break
+        start += page_size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refaz o cache a partir das respostas arquivadas por fonte")
+    parser.add_argument('--isbn', action='append', help="Só estes ISBNs (pode repetir)")
+    parser.add_argument('--page-size', type=int, default=1000, help="Linhas lidas por página")
+    args = parser.parse_args()
+    
+    supabase = connect_supabase()
+    engine = create_search_engine(supabase)
+    isbns = args.isbn or iter_archived_isbns(supabase, args.page_size)
+    
+    start = time.monotonic()
+    total = 0
+    rebuilt = 0
+    
+    for isbn in isbns:
+        total += 1
+        result = engine.reparse_source_archive(isbn)
+        if result and result['title'] != 'N/A':
+            rebuilt += 1
+        
+        if total % 500 == 0:
+            print(f"  {total:,} ISBNs ({time.monotonic() - start:.0f}s)", flush=True)
+    
+    print(f"✅ {rebuilt:,} de {total:,} ISBNs regravados no cache em {time.monotonic() - start:.0f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+"""
+Funções compartilhadas pelos scripts de linha de comando
+"""
+
+import os
+
+from supabase import create_client
+
+from supabase_local import local_client_from_env
+
+
+def connect_supabase():
+    """
+    Cliente do Supabase para os scripts
+    
+    Usa SUPABASE_URL e SUPABASE_KEY; sem elas, lê a seção [supabase] de
+    .streamlit/secrets.toml (os mesmos segredos do app). Com
+    SUPABASE_LOCAL_PATH, usa o banco SQLite local (supabase_local).
+    """
+    local_client = local_client_from_env()
+    if local_client is not None:
+        return local_client
+    
+    url = os.environ.get('SUPABASE_URL')
+    key = os.environ.get('SUPABASE_KEY')
+    
+    if not (url and key):
+        import streamlit as st
+        url = st.secrets["supabase"]["url"]
+        key = st.secrets["supabase"]["key"]
+    
+    return create_client(url, key)
@@ -0,0 +1,189 @@
+"""
+Pré-aquece o cache de buscas (cache_api) a partir da tabela livro
+
+Uso:
+    python scripts/warm_search_cache.py
+    python scripts/warm_search_cache.py --enrich --concurrency 4 --rate 2
+
+Percorre todos os códigos de barras já catalogados, em páginas ordenadas por
+id, e grava no cache os dados que o acervo já tem (um registro por ISBN-13).
+Com --enrich, livros com dados incompletos passam pelo motor de busca, com
+número de buscas simultâneas e buscas por segundo limitados.
+
+O progresso fica em um arquivo de checkpoint (último id processado): rodar
+de novo continua de onde parou; --restart começa do zero.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from book_search_engine import create_search_engine
+from http_transport import TokenBucket
+from isbn_utils import canonical_isbn
+from script_utils import connect_supabase
+
+
+def load_checkpoint(path: str) -> Dict:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'last_id': 0, 'seeded': 0, 'enriched': 0, 'skipped': 0}
+
+
+def save_checkpoint(path: str, checkpoint: Dict):
+    # Grava em arquivo temporário e renomeia: uma interrupção não corrompe o checkpoint
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+def iter_livro_pages(supabase, start_id: int, page_size: int):
+    """Páginas de livros com id > start_id, em ordem de id"""
+    last_id = start_id
+    
+    while True:
+        response = supabase.table('livro').select("""
+            id,
+            codigo_barras,
+            titulo,
+            autor,
+            editora,
+            genero:genero-id(nome)
+        """).gte('id', last_id + 1).order('id').limit(page_size).execute()
+        
+        rows = response.data or []
+        if not rows:
+            break
+        
+        yield rows
+        last_id = rows[-1]['id']
+        
+        if len(rows) < page_size:
+            break
+
+
+def livro_to_cache_data(row: Dict) -> Dict:
+    """Dados de um livro do acervo no formato do cache de buscas"""
+    return {
+        'title': row.get('titulo') or 'N/A',
+        'author': row.get('autor') or 'N/A',
+        'publisher': row.get('editora') or 'N/A',
+        'genre': row.get('genero', {}).get('nome', 'N/A') if row.get('genero') else 'N/A',
+        'year': 'N/A',
+        'cover_url': None,
+        'sources': ['catálogo_local'],
+        'from_cache': False
+    }
+
+
+def enrich(engine, bucket: Optional[TokenBucket], isbn: str, data: Dict) -> Dict:
+    """Completa os dados do acervo com o motor de busca (os do acervo têm prioridade)"""
+    if bucket is not None:
+        bucket.acquire()
+    
+    # Ignora a entrada atual do cache (vencida ou incompleta) e consulta as fontes
+    # aqui, dentro de --rate e --concurrency; o chamador grava o resultado uma vez
+    try:
+        result = engine._cascade_search(isbn, force_refresh=True, update_cache=False, use_archive=True)
+    except Exception:
+        return data
+    
+    merged = engine.merge_data(data, result)
+    merged['sources'] = list(dict.fromkeys(data['sources'] + list(result.get('sources') or [])))
+    if result.get('isbns'):
+        merged['isbns'] = result['isbns']
+    
+    return merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pré-aquece o cache de buscas a partir da tabela livro")
+    parser.add_argument('--enrich', action='store_true', help="Completar livros incompletos pelas APIs")
+    parser.add_argument('--concurrency', type=int, default=4, help="Buscas simultâneas com --enrich")
+    parser.add_argument('--rate', type=float, default=2.0, help="Buscas por segundo com --enrich (0 = sem limite)")
+    parser.add_argument('--page-size', type=int, default=500, help="Livros lidos por página")
+    parser.add_argument('--overwrite', action='store_true', help="Regravar ISBNs que já estão no cache")
+    parser.add_argument('--checkpoint', default='warm_cache_checkpoint.json', help="Arquivo de progresso")
+    parser.add_argument('--restart', action='store_true', help="Ignorar o checkpoint e começar do zero")
+    args = parser.parse_args()
+    
+    supabase = connect_supabase()
+    engine = create_search_engine(supabase)
+    engine.batch_requests = True
+    bucket = TokenBucket(args.rate, max(1, int(args.rate))) if args.enrich and args.rate > 0 else None
+    executor = ThreadPoolExecutor(max_workers=max(1, args.concurrency)) if args.enrich else None
+    
+    checkpoint = {'last_id': 0, 'seeded': 0, 'enriched': 0, 'skipped': 0}
+    if not args.restart:
+        checkpoint = load_checkpoint(args.checkpoint)
+    
+    if checkpoint['last_id']:
+        print(f"↪️ Continuando do id {checkpoint['last_id']}")
+    
+    start = time.monotonic()
+    
+    try:
+        for rows in iter_livro_pages(supabase, checkpoint['last_id'], args.page_size):
+            # Um registro por ISBN-13 na página (o primeiro com título vence)
+            books = {}
+            for row in rows:
+                isbn = canonical_isbn(row.get('codigo_barras'))
+                if isbn and (isbn not in books or books[isbn]['title'] == 'N/A'):
+                    books[isbn] = livro_to_cache_data(row)
+            
+            if not args.overwrite:
+                cached = engine.check_cache_many(list(books), track_access=False)
+                for isbn, data in cached.items():
+                    if not data.get('stale') and engine.is_complete(data):
+                        del books[isbn]
+                        checkpoint['skipped'] += 1
+            
+            pending: List[str] = []
+            for isbn, data in books.items():
+                if args.enrich and not engine.is_complete(data):
+                    pending.append(isbn)
+                elif data['title'] != 'N/A':
+                    engine.save_to_cache(isbn, data)
+                    checkpoint['seeded'] += 1
+            
+            if pending:
+                enriched = executor.map(lambda isbn: enrich(engine, bucket, isbn, books[isbn]), pending)
+                for isbn, data in zip(pending, enriched):
+                    if data['title'] != 'N/A':
+                        engine.save_to_cache(isbn, data)
+                        checkpoint['enriched'] += 1
+            
+            # Só avança o checkpoint depois que a página inteira foi gravada
+            checkpoint['last_id'] = rows[-1]['id']
+            save_checkpoint(args.checkpoint, checkpoint)
+            
+            print(
+                f"  id {checkpoint['last_id']}: {checkpoint['seeded']:,} gravados, "
+                f"{checkpoint['enriched']:,} enriquecidos, {checkpoint['skipped']:,} já no cache "
+                f"({time.monotonic() - start:.0f}s)",
+                flush=True
+            )
+    except KeyboardInterrupt:
+        print(f"\n⏸️ Interrompido; rode de novo para continuar do id {checkpoint['last_id']}")
+        return
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    print(
+        f"✅ Cache pré-aquecido: {checkpoint['seeded']:,} gravados, {checkpoint['enriched']:,} enriquecidos, "
+        f"{checkpoint['skipped']:,} já estavam no cache"
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,318 @@
+"""
+Cache de buscas em camadas
+Memória do processo (LRU com TTL) → arquivo SQLite local (opcional) → tabela cache_api do Supabase
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from cache_utils import TTLCache
+
+
+# Sem SEARCH_CACHE_PATH, o cache fica só em memória + Supabase
+DEFAULT_CACHE_PATH = os.environ.get('SEARCH_CACHE_PATH')
+
+# Limites do arquivo SQLite, como o orçamento de cache_api (scripts/evict_search_cache.py):
+# acima de SEARCH_CACHE_MAX_ROWS linhas saem as gravadas há mais tempo, e linhas
+# com mais de SEARCH_CACHE_MAX_AGE_DAYS dias (fora da janela 'stale' do motor) saem sempre
+DEFAULT_MAX_ROWS = int(os.environ.get('SEARCH_CACHE_MAX_ROWS', '50000'))
+DEFAULT_MAX_AGE_DAYS = int(os.environ.get('SEARCH_CACHE_MAX_AGE_DAYS', '365'))
+
+TIERS = ['memory', 'sqlite', 'supabase']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_api (
+    isbn TEXT PRIMARY KEY,
+    dados_json TEXT NOT NULL,
+    cached_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_api_cached_at ON cache_api (cached_at);
+"""
+
+# Limite de parâmetros por query do SQLite (versões antigas: 999)
+_MAX_SQL_PARAMS = 900
+
+
+class SqliteCacheTier:
+    """
+    Cópia local das linhas de cache_api em um arquivo SQLite
+    
+    Guarda as linhas no mesmo formato da tabela do Supabase (isbn, dados_json,
+    cached_at), então a idade de cada entrada é avaliada do mesmo jeito.
+    
+    O arquivo fica dentro de max_rows linhas e max_age_days dias (None = sem
+    limite): a poda roda na abertura e a cada prune_every linhas gravadas,
+    removendo primeiro as entradas gravadas há mais tempo.
+    """
+    
+    def __init__(self, path: str, max_rows: Optional[int] = DEFAULT_MAX_ROWS,
+                 max_age_days: Optional[int] = DEFAULT_MAX_AGE_DAYS, prune_every: int = 500):
+        self.path = path
+        self.max_rows = max_rows
+        self.max_age_days = max_age_days
+        self.prune_every = prune_every
+        self._local = threading.local()
+        self._written = 0
+        self._prune_lock = threading.Lock()
+        
+        conn = self._connect()
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+            conn.commit()
+        finally:
+            conn.close()
+        
+        self.prune()
+    
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, check_same_thread=False)
+    
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+    
+    def get_many(self, keys: List[str]) -> Dict[str, Dict]:
+        rows = {}
+        conn = self._conn()
+        
+        for start in range(0, len(keys), _MAX_SQL_PARAMS):
+            chunk = keys[start:start + _MAX_SQL_PARAMS]
+            placeholders = ','.join('?' * len(chunk))
+            for row in conn.execute(f'SELECT * FROM cache_api WHERE isbn IN ({placeholders})', chunk):
+                rows[row['isbn']] = dict(row)
+        
+        return rows
+    
+    def set_many(self, rows: Iterable[Dict]):
+        values = [(row['isbn'], row['dados_json'], row['cached_at']) for row in rows]
+        conn = self._conn()
+        conn.executemany(
+            'INSERT OR REPLACE INTO cache_api (isbn, dados_json, cached_at) VALUES (?, ?, ?)',
+            values
+        )
+        conn.commit()
+        
+        with self._prune_lock:
+            self._written += len(values)
+            due = self._written >= self.prune_every
+            if due:
+                self._written = 0
+        if due:
+            self.prune()
+    
+    def prune(self) -> int:
+        """Remove as entradas velhas demais e o excesso de linhas; devolve quantas saíram"""
+        conn = self._conn()
+        removed = 0
+        
+        if self.max_age_days is not None:
+            # cached_at é ISO 8601 (com ou sem fuso): a comparação como texto
+            # erra no máximo por horas, irrelevante para um limite em dias
+            cutoff = (datetime.now() - timedelta(days=self.max_age_days)).isoformat()
+            removed += conn.execute('DELETE FROM cache_api WHERE cached_at < ?', (cutoff,)).rowcount
+        
+        if self.max_rows is not None:
+            excess = conn.execute('SELECT COUNT(*) FROM cache_api').fetchone()[0] - self.max_rows
+            if excess > 0:
+                removed += conn.execute(
+                    'DELETE FROM cache_api WHERE isbn IN '
+                    '(SELECT isbn FROM cache_api ORDER BY cached_at LIMIT ?)',
+                    (excess,)
+                ).rowcount
+        
+        conn.commit()
+        return removed
+    
+    def delete(self, keys: List[str]):
+        conn = self._conn()
+        conn.executemany('DELETE FROM cache_api WHERE isbn = ?', [(key,) for key in keys])
+        conn.commit()
+
+
+class TieredSearchCache:
+    """
+    Camadas locais do cache de buscas, com acertos e falhas por camada
+    
+    A leitura passa pela memória e depois pelo SQLite (o que vem do SQLite é
+    copiado para a memória); a camada do Supabase é consultada pelo motor de
+    busca, que registra o resultado aqui com record(). A escrita vai para
+    todas as camadas.
+    """
+    
+    def __init__(self, memory_size: int = 5000, memory_ttl_seconds: float = 600,
+                 sqlite: Optional[SqliteCacheTier] = None):
+        # TTL curto: gravações de outros processos no Supabase aparecem em minutos
+        self.memory = TTLCache(maxsize=memory_size, ttl_seconds=memory_ttl_seconds)
+        self.sqlite = sqlite
+        self._counters = {tier: {'hits': 0, 'misses': 0} for tier in TIERS}
+        self._lock = threading.Lock()
+    
+    def record(self, tier: str, hits: int = 0, misses: int = 0):
+        with self._lock:
+            self._counters[tier]['hits'] += hits
+            self._counters[tier]['misses'] += misses
+    
+    def get_many(self, keys: List[str]) -> Dict[str, Dict]:
+        """Linhas de cache encontradas nas camadas locais (chave → linha)"""
+        found = {}
+        
+        for key in keys:
+            row = self.memory.get(key)
+            if row is not None:
+                found[key] = row
+        
+        missing = [key for key in keys if key not in found]
+        self.record('memory', hits=len(found), misses=len(missing))
+        
+        if self.sqlite is not None and missing:
+            try:
+                rows = self.sqlite.get_many(missing)
+            except sqlite3.Error:
+                rows = {}
+            
+            for key, row in rows.items():
+                self.memory.set(key, row)
+                found[key] = row
+            
+            self.record('sqlite', hits=len(rows), misses=len(missing) - len(rows))
+        
+        return found
+    
+    def get(self, key: str) -> Optional[Dict]:
+        return self.get_many([key]).get(key)
+    
+    def set_many(self, rows: List[Dict]):
+        """Grava as linhas (formato de cache_api) na memória e no SQLite"""
+        for row in rows:
+            self.memory.set(row['isbn'], row)
+        
+        if self.sqlite is not None and rows:
+            try:
+                self.sqlite.set_many(rows)
+            except sqlite3.Error:
+                pass
+    
+    def invalidate(self, keys: List[str]):
+        for key in keys:
+            self.memory.delete(key)
+        
+        if self.sqlite is not None:
+            try:
+                self.sqlite.delete(keys)
+            except sqlite3.Error:
+                pass
+    
+    def snapshot(self) -> List[Dict]:
+        """Acertos, falhas e taxa de acerto por camada (para exibição)"""
+        with self._lock:
+            counters = {tier: dict(values) for tier, values in self._counters.items()}
+        
+        rows = []
+        for tier in TIERS:
+            if tier == 'sqlite' and self.sqlite is None:
+                continue
+            
+            hits = counters[tier]['hits']
+            misses = counters[tier]['misses']
+            total = hits + misses
+            rows.append({
+                'camada': tier,
+                'acertos': hits,
+                'falhas': misses,
+                'taxa_acerto': round(hits / total, 3) if total else None,
+                'itens': len(self.memory) if tier == 'memory' else None
+            })
+        
+        return rows
+
+
+class CacheAccessTracker:
+    """
+    Acessos a entradas de cache_api acumulados em memória
+    
+    Cada leitura do cache só incrementa um contador; o motor de busca grava os
+    acumulados no Supabase (ultimo_acesso/acessos) em uma única chamada quando
+    há acessos demais pendentes ou o intervalo de gravação passou.
+    """
+    
+    def __init__(self, flush_interval: float = 60.0, max_pending: int = 500):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: Counter = Counter()
+        self._last_flush = time.monotonic()
+        self._flushing = False
+        self._lock = threading.Lock()
+    
+    def record(self, isbn: str) -> bool:
+        """Registra um acesso; True se já é hora de gravar os pendentes"""
+        with self._lock:
+            self._pending[isbn] += 1
+            if self._flushing:
+                return False
+            return (len(self._pending) >= self.max_pending or
+                    time.monotonic() - self._last_flush >= self.flush_interval)
+    
+    def drain(self) -> Dict[str, int]:
+        """Retira os acessos pendentes (ISBN → quantidade) para gravação"""
+        with self._lock:
+            pending = dict(self._pending)
+            self._pending.clear()
+            self._last_flush = time.monotonic()
+            self._flushing = True
+            return pending
+    
+    def finish(self, failed: Optional[Dict[str, int]] = None):
+        """Encerra a gravação; acessos que não foram gravados voltam para a fila"""
+        with self._lock:
+            if failed:
+                self._pending.update(failed)
+            self._flushing = False
+
+
+# ==================== CACHE PADRÃO DO PROCESSO ====================
+
+_default_cache: Optional[TieredSearchCache] = None
+_default_tracker: Optional[CacheAccessTracker] = None
+_default_lock = threading.Lock()
+
+
+def get_search_cache() -> TieredSearchCache:
+    """Cache em camadas compartilhado pelo processo (e por todas as sessões)"""
+    global _default_cache
+    
+    if _default_cache is None:
+        with _default_lock:
+            if _default_cache is None:
+                sqlite_tier = None
+                if DEFAULT_CACHE_PATH:
+                    try:
+                        sqlite_tier = SqliteCacheTier(DEFAULT_CACHE_PATH)
+                    except sqlite3.Error:
+                        sqlite_tier = None
+                
+                _default_cache = TieredSearchCache(sqlite=sqlite_tier)
+    
+    return _default_cache
+
+
+def get_access_tracker() -> CacheAccessTracker:
+    """Acessos ao cache pendentes de gravação, compartilhados pelo processo"""
+    global _default_tracker
+    
+    if _default_tracker is None:
+        with _default_lock:
+            if _default_tracker is None:
+                _default_tracker = CacheAccessTracker()
+    
+    return _default_tracker
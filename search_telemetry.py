@@ -0,0 +1,149 @@
+"""
+Telemetria do motor de busca
+Histogramas de latência e contadores de resultado por fonte, e tempo total de cada busca
+"""
+
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+# Limites superiores dos intervalos dos histogramas, em milissegundos
+LATENCY_BUCKETS_MS = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float('inf')]
+
+# Resultado de uma chamada a uma fonte
+SOURCE_OUTCOMES = ['success', 'miss', 'error', 'timeout', 'circuit_open', 'rate_limited']
+
+
+class LatencyHistogram:
+    """Histograma de latências com intervalos fixos (contagem, soma e máximo)"""
+    
+    def __init__(self, buckets_ms: List[float] = LATENCY_BUCKETS_MS):
+        self.buckets_ms = buckets_ms
+        self.counts = [0] * len(buckets_ms)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+    
+    def observe(self, seconds: float):
+        ms = seconds * 1000
+        for index, limit in enumerate(self.buckets_ms):
+            if ms <= limit:
+                self.counts[index] += 1
+                break
+        
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+    
+    def percentile(self, p: float) -> Optional[float]:
+        """Percentil p (0-100) estimado pelo limite do intervalo, em ms"""
+        if not self.count:
+            return None
+        
+        target = p / 100 * self.count
+        seen = 0
+        for limit, count in zip(self.buckets_ms, self.counts):
+            seen += count
+            if seen >= target:
+                return min(limit, self.max_ms)
+        return self.max_ms
+    
+    def snapshot(self) -> Dict:
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total_ms / self.count, 1) if self.count else None,
+            'p50_ms': self.percentile(50),
+            'p90_ms': self.percentile(90),
+            'p99_ms': self.percentile(99),
+            'max_ms': round(self.max_ms, 1),
+            'buckets': [
+                {'le_ms': None if limit == float('inf') else limit, 'count': count}
+                for limit, count in zip(self.buckets_ms, self.counts)
+            ]
+        }
+
+
+class SearchTelemetry:
+    """
+    Métricas acumuladas pelo processo desde o início (ou o último reset)
+    
+    Por fonte: histograma de latência e contadores de sucesso, não encontrado,
+    erro, timeout e circuito aberto. Por busca (search_book): histograma do
+    tempo total e contadores por desfecho (cache, encontrado, parcial etc.).
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self._source_latency: Dict[str, LatencyHistogram] = {}
+            self._source_outcomes: Dict[str, Dict[str, int]] = {}
+            self._search_latency = LatencyHistogram()
+            self._search_outcomes: Dict[str, int] = {}
+    
+    def record_source(self, source: str, outcome: str, seconds: float):
+        """Registra uma chamada a uma fonte e seu resultado (ver SOURCE_OUTCOMES)"""
+        with self._lock:
+            if source not in self._source_latency:
+                self._source_latency[source] = LatencyHistogram()
+                self._source_outcomes[source] = dict.fromkeys(SOURCE_OUTCOMES, 0)
+            
+            # Chamadas barradas pelo circuit breaker ou pela fila do limite de taxa
+            # não têm latência de rede
+            if outcome not in ('circuit_open', 'rate_limited'):
+                self._source_latency[source].observe(seconds)
+            self._source_outcomes[source][outcome] = self._source_outcomes[source].get(outcome, 0) + 1
+    
+    def record_search(self, outcome: str, seconds: float):
+        """Registra o tempo total de uma busca e seu desfecho"""
+        with self._lock:
+            self._search_latency.observe(seconds)
+            self._search_outcomes[outcome] = self._search_outcomes.get(outcome, 0) + 1
+    
+    def snapshot(self) -> Dict:
+        """Cópia das métricas atuais, pronta para exibir ou serializar"""
+        with self._lock:
+            sources = []
+            for source, histogram in self._source_latency.items():
+                outcomes = dict(self._source_outcomes[source])
+                total = sum(outcomes.values())
+                sources.append({
+                    'source': source,
+                    'calls': total,
+                    **outcomes,
+                    'hit_rate': round(outcomes['success'] / total, 3) if total else None,
+                    'error_rate': round((outcomes['error'] + outcomes['timeout']) / total, 3) if total else None,
+                    'latency': histogram.snapshot()
+                })
+            
+            return {
+                'started_at': self.started_at,
+                'uptime_seconds': round(time.time() - self.started_at, 1),
+                'sources': sources,
+                'searches': {
+                    'outcomes': dict(self._search_outcomes),
+                    'latency': self._search_latency.snapshot()
+                }
+            }
+
+
+# ==================== TELEMETRIA PADRÃO DO PROCESSO ====================
+
+_default_telemetry: Optional[SearchTelemetry] = None
+_default_lock = threading.Lock()
+
+
+def get_telemetry() -> SearchTelemetry:
+    """Telemetria compartilhada pelo processo (todas as sessões e motores)"""
+    global _default_telemetry
+    
+    if _default_telemetry is None:
+        with _default_lock:
+            if _default_telemetry is None:
+                _default_telemetry = SearchTelemetry()
+    
+    return _default_telemetry
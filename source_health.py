@@ -0,0 +1,236 @@
+"""
+Saúde das fontes de busca
+Latência recente, taxa de erro e circuit breaker (fechado/aberto/meio-aberto) por fonte
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """A fonte está com o circuito aberto e não deve ser consultada agora"""
+    
+    def __init__(self, source: str):
+        super().__init__(f"Circuito aberto para a fonte '{source}'")
+        self.source = source
+
+
+class SourceHealth:
+    """Janela móvel de chamadas de uma fonte e estado do seu circuit breaker"""
+    
+    def __init__(self, name: str, window: int = 100, min_calls: int = 10,
+                 failure_threshold: float = 0.5, open_seconds: float = 30,
+                 timeout_multiplier: float = 1.5, timeout_min: float = 1.0):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.timeout_multiplier = timeout_multiplier
+        self.timeout_min = timeout_min
+        
+        # Latências das últimas chamadas (falhas e timeouts incluídos, limitados ao
+        # timeout) e resultado (True = ok) de cada uma
+        self._latencies = deque(maxlen=window)
+        self._outcomes = deque(maxlen=window)
+        
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+    
+    # ==================== ESTATÍSTICAS ====================
+    
+    def percentile(self, p: float) -> Optional[float]:
+        """Percentil p (0-100) das latências recentes, em segundos"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+        
+        if not latencies:
+            return None
+        
+        index = max(0, math.ceil(p / 100 * len(latencies)) - 1)
+        return latencies[index]
+    
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self._outcomes:
+                return 0.0
+            return 1 - sum(self._outcomes) / len(self._outcomes)
+    
+    def adaptive_timeout(self, default_timeout: float) -> float:
+        """
+        Timeout de leitura baseado no p95 observado
+        
+        Fica entre timeout_min e o timeout configurado; sem amostras suficientes
+        usa o configurado.
+        """
+        if len(self._latencies) < self.min_calls:
+            return default_timeout
+        
+        p95 = self.percentile(95)
+        return min(default_timeout, max(self.timeout_min, p95 * self.timeout_multiplier))
+    
+    # ==================== CIRCUIT BREAKER ====================
+    
+    def is_available(self) -> bool:
+        """Indica se a fonte pode ser consultada (sem reservar a chamada de teste)"""
+        with self._lock:
+            if self.state == OPEN:
+                return time.monotonic() - self._opened_at >= self.open_seconds
+            if self.state == HALF_OPEN:
+                return not self._probe_in_flight
+            return True
+    
+    def allow_request(self) -> bool:
+        """Reserva uma chamada; no estado meio-aberto só uma chamada de teste passa"""
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    return False
+                self.state = HALF_OPEN
+                self._probe_in_flight = False
+            
+            if self.state == HALF_OPEN:
+                if self._probe_in_flight:
+                    return False
+                self._probe_in_flight = True
+            
+            return True
+    
+    def record_success(self, latency: float):
+        """Registra uma resposta da fonte (encontrou ou não o livro)"""
+        with self._lock:
+            self._latencies.append(latency)
+            self._outcomes.append(True)
+            
+            if self.state == HALF_OPEN:
+                # Chamada de teste funcionou: fechar o circuito
+                self.state = CLOSED
+                self._probe_in_flight = False
+    
+    def record_failure(self, latency: Optional[float], timeout: Optional[float] = None):
+        """
+        Registra um erro, timeout ou resposta 429/5xx da fonte
+        
+        A latência entra nas amostras (limitada a `timeout`): sem isso o p95
+        viria só das respostas rápidas e adaptive_timeout nunca voltaria a
+        subir. latency=None registra a falha sem amostra de latência.
+        """
+        with self._lock:
+            if latency is not None:
+                self._latencies.append(min(latency, timeout) if timeout else latency)
+            self._outcomes.append(False)
+            
+            if self.state == HALF_OPEN:
+                self._open()
+                return
+            
+            if len(self._outcomes) >= self.min_calls:
+                failures = len(self._outcomes) - sum(self._outcomes)
+                if failures / len(self._outcomes) >= self.failure_threshold:
+                    self._open()
+    
+    def record_rejected(self):
+        """
+        Registra uma chamada que nem saiu: recusada localmente pela fila do limite de taxa
+        
+        Não é falha da fonte (é excesso de demanda nossa), então não entra na
+        taxa de erro nem abre o circuito; só libera a chamada de teste do
+        estado meio-aberto, se fosse ela.
+        """
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probe_in_flight = False
+    
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._probe_in_flight = False
+        # Recomeçar a contagem quando o circuito voltar a fechar
+        self._outcomes.clear()
+    
+    def snapshot(self) -> Dict:
+        """Resumo do estado atual (para debug e telemetria)"""
+        return {
+            'source': self.name,
+            'state': self.state,
+            'calls': len(self._outcomes),
+            'error_rate': round(self.error_rate(), 3),
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p95': self.percentile(95),
+        }
+
+
+class SourceHealthRegistry:
+    """Conjunto de SourceHealth, um por fonte, criados sob demanda"""
+    
+    def __init__(self, **health_options):
+        self.health_options = health_options
+        self._sources: Dict[str, SourceHealth] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, source: str) -> SourceHealth:
+        health = self._sources.get(source)
+        if health is None:
+            with self._lock:
+                health = self._sources.get(source)
+                if health is None:
+                    health = SourceHealth(source, **self.health_options)
+                    self._sources[source] = health
+        return health
+    
+    def snapshot(self) -> Dict[str, Dict]:
+        return {name: health.snapshot() for name, health in list(self._sources.items())}
+
+
+class HedgeStats:
+    """Contadores da política de hedge (requisição extra quando a fonte principal demora)"""
+    
+    def __init__(self):
+        self.lookups = 0
+        self.fired = 0
+        self.backup_won = 0
+        self._lock = threading.Lock()
+    
+    def record(self, fired: bool, backup_won: bool = False):
+        with self._lock:
+            self.lookups += 1
+            if fired:
+                self.fired += 1
+            if backup_won:
+                self.backup_won += 1
+    
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                'lookups': self.lookups,
+                'fired': self.fired,
+                'backup_won': self.backup_won,
+                'fire_rate': round(self.fired / self.lookups, 3) if self.lookups else 0.0,
+                'win_rate': round(self.backup_won / self.fired, 3) if self.fired else 0.0,
+            }
+
+
+# ==================== REGISTRO PADRÃO DO PROCESSO ====================
+
+_default_registry = SourceHealthRegistry()
+_default_hedge_stats = HedgeStats()
+
+
+def get_health_registry() -> SourceHealthRegistry:
+    """Retorna o registro de saúde das fontes compartilhado pelo processo"""
+    return _default_registry
+
+
+def get_hedge_stats() -> HedgeStats:
+    """Retorna os contadores de hedge compartilhados pelo processo"""
+    return _default_hedge_stats
@@ -0,0 +1,200 @@
+"""
+Ordem das fontes aprendida por prefixo de ISBN
+Taxa de acerto e latência de cada fonte por grupo/editor do ISBN, persistidas em JSON
+"""
+
+import atexit
+import json
+import os
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+DEFAULT_STATS_PATH = os.environ.get('SOURCE_STATS_PATH', 'source_stats.json')
+
+# Tamanhos de prefixo do ISBN-13 usados como buckets, do mais específico ao mais geral.
+# 7 dígitos aproxima o editor (ex.: 978-85-359) e 5 o grupo de registro (ex.: 978-85)
+PREFIX_LENGTHS = (7, 5)
+
+
+def isbn_prefixes(isbn: str) -> List[str]:
+    """Prefixos de bucket do ISBN (ISBN-10 é convertido para a forma 978)"""
+    digits = ''.join(ch for ch in str(isbn) if ch.isdigit() or ch in 'xX')
+    
+    if len(digits) == 10:
+        digits = '978' + digits[:9]
+    elif len(digits) != 13:
+        return []
+    
+    return [digits[:length] for length in PREFIX_LENGTHS]
+
+
+class SourceRanking:
+    """
+    Estatísticas de acerto/latência por fonte e prefixo de ISBN
+    
+    A ordem de uma busca é escolhida pelo bucket mais específico com amostras
+    suficientes; fontes sem histórico mantêm a posição da ordem padrão.
+    
+    Só a cascata sequencial segue essa ordem: no modo paralelo todas as fontes
+    são consultadas juntas e mescladas na ordem fixa de api_priority.
+    """
+    
+    def __init__(self, path: Optional[str] = DEFAULT_STATS_PATH, min_samples: int = 5,
+                 save_interval: float = 30, explore_rate: float = 0.05,
+                 seed: Optional[int] = None):
+        self.path = path
+        self.min_samples = min_samples
+        self.save_interval = save_interval
+        
+        # Fração das buscas em que uma fonte fora da frente é consultada primeiro:
+        # sem isso uma fonte rebaixada por uma fase ruim nunca voltaria a ser medida
+        self.explore_rate = explore_rate
+        self._random = random.Random(seed)
+        
+        # {prefixo: {fonte: {'calls': n, 'hits': n, 'latency': soma em segundos}}}
+        self._stats: Dict[str, Dict[str, Dict]] = {}
+        self._dirty = False
+        self._last_save = time.monotonic()
+        self._lock = threading.Lock()
+        
+        self.load()
+    
+    # ==================== PERSISTÊNCIA ====================
+    
+    def load(self):
+        """Carrega as estatísticas salvas (arquivo ausente ou inválido = começar do zero)"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            with self._lock:
+                self._stats = data.get('prefixes', {})
+        except Exception:
+            pass
+    
+    def save(self):
+        """Grava as estatísticas no arquivo (escrita atômica)"""
+        if not self.path:
+            return
+        
+        with self._lock:
+            data = json.dumps({'prefixes': self._stats}, ensure_ascii=False)
+            self._dirty = False
+            self._last_save = time.monotonic()
+        
+        try:
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(temp_path, self.path)
+        except Exception:
+            pass
+    
+    # ==================== REGISTRO ====================
+    
+    def record(self, isbn: str, source: str, hit: bool, latency: float):
+        """Registra uma consulta de `source` para o ISBN (hit = encontrou o livro)"""
+        prefixes = isbn_prefixes(isbn)
+        if not prefixes:
+            return
+        
+        with self._lock:
+            for prefix in prefixes:
+                entry = self._stats.setdefault(prefix, {}).setdefault(
+                    source, {'calls': 0, 'hits': 0, 'latency': 0.0}
+                )
+                entry['calls'] += 1
+                entry['hits'] += 1 if hit else 0
+                entry['latency'] += latency
+            
+            self._dirty = True
+            should_save = time.monotonic() - self._last_save >= self.save_interval
+        
+        if should_save:
+            self.save()
+    
+    def flush(self):
+        """Grava as estatísticas se houver registros não salvos"""
+        if self._dirty:
+            self.save()
+    
+    # ==================== ORDENAÇÃO ====================
+    
+    def _source_score(self, isbn: str, source: str) -> Optional[float]:
+        """Acertos por segundo esperados da fonte no bucket mais específico com amostras"""
+        for prefix in isbn_prefixes(isbn):
+            entry = self._stats.get(prefix, {}).get(source)
+            if entry and entry['calls'] >= self.min_samples:
+                hit_rate = entry['hits'] / entry['calls']
+                avg_latency = entry['latency'] / entry['calls']
+                return hit_rate / max(avg_latency, 0.05)
+        return None
+    
+    def rank(self, isbn: str, sources: List[str]) -> List[str]:
+        """
+        Ordena as fontes para o ISBN
+        
+        Só as fontes com histórico no prefixo trocam de posição entre si
+        (maior taxa de acerto por tempo primeiro); as demais ficam onde estão.
+        Com probabilidade explore_rate, uma das fontes de trás vai para a frente.
+        """
+        with self._lock:
+            scores = {source: self._source_score(isbn, source) for source in sources}
+        
+        ranked_slots = [index for index, source in enumerate(sources) if scores[source] is not None]
+        if len(ranked_slots) < 2:
+            return list(sources)
+        
+        ranked_sources = sorted(
+            (sources[index] for index in ranked_slots),
+            key=lambda source: scores[source],
+            reverse=True
+        )
+        
+        order = list(sources)
+        for index, source in zip(ranked_slots, ranked_sources):
+            order[index] = source
+        
+        if self._random.random() < self.explore_rate:
+            order.insert(0, order.pop(self._random.randrange(1, len(order))))
+        return order
+    
+    def snapshot(self) -> List[Dict]:
+        """Estatísticas por prefixo e fonte (para debug)"""
+        rows = []
+        with self._lock:
+            for prefix, sources in sorted(self._stats.items()):
+                for source, entry in sorted(sources.items()):
+                    calls = entry['calls']
+                    rows.append({
+                        'prefix': prefix,
+                        'source': source,
+                        'calls': calls,
+                        'hit_rate': round(entry['hits'] / calls, 3) if calls else 0.0,
+                        'avg_latency': round(entry['latency'] / calls, 3) if calls else 0.0,
+                    })
+        return rows
+
+
+# ==================== ESTATÍSTICAS PADRÃO DO PROCESSO ====================
+
+_default_ranking: Optional[SourceRanking] = None
+_default_lock = threading.Lock()
+
+
+def get_source_ranking() -> SourceRanking:
+    """Retorna as estatísticas de ordem das fontes compartilhadas pelo processo"""
+    global _default_ranking
+    
+    if _default_ranking is None:
+        with _default_lock:
+            if _default_ranking is None:
+                _default_ranking = SourceRanking()
+                atexit.register(_default_ranking.flush)
+    
+    return _default_ranking
@@ -0,0 +1,591 @@
+"""
+Cliente local no lugar do Supabase
+Implementa, sobre um arquivo SQLite, a parte da API do cliente do Supabase usada pelo app
+(table().select/insert/update/upsert/delete, filtros, count='exact', o JOIN
+genero:genero-id(...) e as funções RPC do cache), para rodar o app e os benchmarks sem rede
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+# Com SUPABASE_LOCAL_PATH definido, as páginas e os scripts usam este cliente
+ENV_PATH = 'SUPABASE_LOCAL_PATH'
+
+DEFAULT_LOCAL_PATH = 'supabase_local.db'
+
+# Data/hora atual no formato do Supabase (ISO 8601, UTC)
+_NOW_SQL = "(strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))"
+
+# Colunas do tipo JSON guardam o valor serializado (como JSONB no Postgres) e
+# voltam desserializadas; as demais guardam o valor como veio
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS genero (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nome TEXT NOT NULL UNIQUE,
+    created_at TEXT NOT NULL DEFAULT {_NOW_SQL}
+);
+
+CREATE TABLE IF NOT EXISTS livro (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    codigo_barras TEXT,
+    titulo TEXT,
+    autor TEXT,
+    editora TEXT,
+    "genero-id" INTEGER REFERENCES genero(id),
+    operador_nome TEXT,
+    created_at TEXT NOT NULL DEFAULT {_NOW_SQL}
+);
+
+CREATE INDEX IF NOT EXISTS idx_livro_codigo_barras ON livro(codigo_barras);
+CREATE INDEX IF NOT EXISTS idx_livro_created_at ON livro(created_at);
+CREATE INDEX IF NOT EXISTS idx_livro_operador_nome ON livro(operador_nome);
+CREATE INDEX IF NOT EXISTS idx_livro_genero_id ON livro("genero-id");
+
+CREATE TABLE IF NOT EXISTS cache_api (
+    isbn TEXT PRIMARY KEY,
+    dados_json JSON NOT NULL,
+    cached_at TEXT NOT NULL DEFAULT {_NOW_SQL},
+    created_at TEXT NOT NULL DEFAULT {_NOW_SQL},
+    ultimo_acesso TEXT,
+    acessos INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_cache_api_cached_at ON cache_api(cached_at);
+CREATE INDEX IF NOT EXISTS idx_cache_api_ultimo_acesso ON cache_api(ultimo_acesso);
+
+CREATE TABLE IF NOT EXISTS cache_api_negativo (
+    isbn TEXT PRIMARY KEY,
+    fontes_consultadas JSON NOT NULL DEFAULT '[]',
+    cached_at TEXT NOT NULL DEFAULT {_NOW_SQL}
+);
+
+CREATE TABLE IF NOT EXISTS cache_api_fontes (
+    isbn TEXT NOT NULL,
+    fonte TEXT NOT NULL,
+    payload_json TEXT NOT NULL,
+    dados_json TEXT,
+    campos JSON NOT NULL DEFAULT '[]',
+    consultado_em TEXT NOT NULL DEFAULT {_NOW_SQL},
+    PRIMARY KEY (isbn, fonte)
+);
+"""
+
+# (tabela, coluna) → tabela referenciada (pela coluna id), para os JOINs embutidos no select
+FOREIGN_KEYS = {
+    ('livro', 'genero-id'): 'genero'
+}
+
+# alias:coluna_ou_tabela(colunas)
+_EMBED_PATTERN = re.compile(r'^(?:([\w-]+):)?([\w-]+)\((.*)\)$', re.DOTALL)
+
+
+class LocalSupabaseError(Exception):
+    """Erro de uma consulta ao banco local (equivalente ao APIError do cliente do Supabase)"""
+
+
+class LocalResponse:
+    """Resposta de execute(): linhas em data e, com count='exact', o total em count"""
+    
+    def __init__(self, data: Any, count: Optional[int] = None):
+        self.data = data
+        self.count = count
+    
+    def __repr__(self) -> str:
+        return f"LocalResponse(data={self.data!r}, count={self.count!r})"
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _ilike(value, pattern) -> bool:
+    """ILIKE do Postgres (% e _), sem diferenciar maiúsculas inclusive em letras acentuadas"""
+    if value is None or pattern is None:
+        return False
+    
+    regex = ''.join(
+        '.*' if ch == '%' else '.' if ch == '_' else re.escape(ch)
+        for ch in str(pattern)
+    )
+    return re.fullmatch(regex, str(value), re.IGNORECASE | re.DOTALL) is not None
+
+
+def _split_columns(columns: str) -> List[str]:
+    """Separa a lista de colunas do select nas vírgulas de primeiro nível"""
+    items, current, depth = [], [], 0
+    
+    for ch in columns:
+        if ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        
+        if ch == ',' and depth == 0:
+            items.append(''.join(current))
+            current = []
+        else:
+            current.append(ch)
+    
+    items.append(''.join(current))
+    return [' '.join(item.split()) for item in items if item.strip()]
+
+
+class LocalQueryBuilder:
+    """
+    Consulta a uma tabela, montada em cadeia como no cliente do Supabase
+    
+    Ex.: client.table('livro').select('id', count='exact').gte('created_at', hoje).execute()
+    """
+    
+    def __init__(self, client: 'LocalSupabaseClient', table: str):
+        self.client = client
+        self.table_name = table
+        
+        self._operation = 'select'
+        self._columns = '*'
+        self._count: Optional[str] = None
+        self._values: Any = None
+        self._on_conflict: Optional[str] = None
+        self._ignore_duplicates = False
+        
+        self._filters: List[Tuple[str, List]] = []
+        self._order: List[str] = []
+        self._limit: Optional[int] = None
+        self._offset: Optional[int] = None
+    
+    # ==================== OPERAÇÕES ====================
+    
+    def select(self, *columns: str, count: Optional[str] = None) -> 'LocalQueryBuilder':
+        self._operation = 'select'
+        self._columns = ','.join(columns) if columns else '*'
+        self._count = count
+        return self
+    
+    def insert(self, values, count: Optional[str] = None) -> 'LocalQueryBuilder':
+        self._operation = 'insert'
+        self._values = values
+        return self
+    
+    def upsert(self, values, on_conflict: Optional[str] = None, ignore_duplicates: bool = False,
+               count: Optional[str] = None) -> 'LocalQueryBuilder':
+        self._operation = 'upsert'
+        self._values = values
+        self._on_conflict = on_conflict
+        self._ignore_duplicates = ignore_duplicates
+        return self
+    
+    def update(self, values: Dict, count: Optional[str] = None) -> 'LocalQueryBuilder':
+        self._operation = 'update'
+        self._values = values
+        return self
+    
+    def delete(self, count: Optional[str] = None) -> 'LocalQueryBuilder':
+        self._operation = 'delete'
+        return self
+    
+    # ==================== FILTROS ====================
+    
+    def _filter(self, sql: str, params: List) -> 'LocalQueryBuilder':
+        self._filters.append((sql, params))
+        return self
+    
+    def eq(self, column: str, value) -> 'LocalQueryBuilder':
+        return self._filter(f'{_quote(column)} = ?', [value])
+    
+    def neq(self, column: str, value) -> 'LocalQueryBuilder':
+        return self._filter(f'{_quote(column)} != ?', [value])
+    
+    def gt(self, column: str, value) -> 'LocalQueryBuilder':
+        return self._filter(f'{_quote(column)} > ?', [value])
+    
+    def gte(self, column: str, value) -> 'LocalQueryBuilder':
+        return self._filter(f'{_quote(column)} >= ?', [value])
+    
+    def lt(self, column: str, value) -> 'LocalQueryBuilder':
+        return self._filter(f'{_quote(column)} < ?', [value])
+    
+    def lte(self, column: str, value) -> 'LocalQueryBuilder':
+        return self._filter(f'{_quote(column)} <= ?', [value])
+    
+    def ilike(self, column: str, pattern: str) -> 'LocalQueryBuilder':
+        return self._filter(f'ILIKE({_quote(column)}, ?)', [pattern])
+    
+    def in_(self, column: str, values: Iterable) -> 'LocalQueryBuilder':
+        values = list(values)
+        if not values:
+            return self._filter('0', [])
+        return self._filter(f"{_quote(column)} IN ({','.join('?' * len(values))})", values)
+    
+    def order(self, column: str, desc: bool = False) -> 'LocalQueryBuilder':
+        # Nulos por último na ordem crescente e primeiro na decrescente, como no Postgres
+        self._order.append(f"{_quote(column)} {'DESC NULLS FIRST' if desc else 'ASC NULLS LAST'}")
+        return self
+    
+    def limit(self, size: int) -> 'LocalQueryBuilder':
+        self._limit = size
+        return self
+    
+    def range(self, start: int, end: int) -> 'LocalQueryBuilder':
+        """Linhas de start a end (inclusive), como no cliente do Supabase"""
+        self._offset = start
+        self._limit = end - start + 1
+        return self
+    
+    # ==================== EXECUÇÃO ====================
+    
+    def _where(self) -> Tuple[str, List]:
+        if not self._filters:
+            return '', []
+        
+        clauses = ' AND '.join(sql for sql, _ in self._filters)
+        params = [param for _, filter_params in self._filters for param in filter_params]
+        return f' WHERE {clauses}', params
+    
+    def execute(self) -> LocalResponse:
+        try:
+            if self._operation == 'select':
+                return self._execute_select()
+            if self._operation in ('insert', 'upsert'):
+                return self._execute_insert()
+            if self._operation == 'update':
+                return self._execute_update()
+            return self._execute_delete()
+        except sqlite3.Error as e:
+            raise LocalSupabaseError(f"{self.table_name}: {e}") from e
+    
+    def _execute_select(self) -> LocalResponse:
+        conn = self.client._conn()
+        columns, embeds = self._parse_columns()
+        
+        # Colunas das chaves estrangeiras dos JOINs entram na consulta, mesmo se não pedidas
+        helper_columns = [embed['fk'] for embed in embeds if columns != ['*'] and embed['fk'] not in columns]
+        select_list = '*' if columns == ['*'] else ', '.join(_quote(column) for column in columns + helper_columns)
+        
+        where, params = self._where()
+        sql = f'SELECT {select_list} FROM {_quote(self.table_name)}{where}'
+        if self._order:
+            sql += ' ORDER BY ' + ', '.join(self._order)
+        if self._limit is not None or self._offset is not None:
+            sql += ' LIMIT ? OFFSET ?'
+            params = params + [self._limit if self._limit is not None else -1, self._offset or 0]
+        
+        rows = [self.client._decode(self.table_name, dict(row)) for row in conn.execute(sql, params)]
+        
+        for embed in embeds:
+            self._attach_embed(rows, embed)
+        
+        for row in rows:
+            for column in helper_columns:
+                row.pop(column, None)
+        
+        count = None
+        if self._count:
+            where, params = self._where()
+            count = conn.execute(f'SELECT COUNT(*) FROM {_quote(self.table_name)}{where}', params).fetchone()[0]
+        
+        return LocalResponse(rows, count)
+    
+    def _parse_columns(self) -> Tuple[List[str], List[Dict]]:
+        """Colunas simples e JOINs embutidos (alias:coluna_fk(colunas) ou tabela(colunas))"""
+        columns, embeds = [], []
+        
+        for item in _split_columns(self._columns):
+            match = _EMBED_PATTERN.match(item)
+            if not match:
+                columns.append(item)
+                continue
+            
+            alias, target, inner = match.groups()
+            if (self.table_name, target) in FOREIGN_KEYS:
+                fk, referenced = target, FOREIGN_KEYS[(self.table_name, target)]
+            else:
+                fk = next((column for (table, column), ref in FOREIGN_KEYS.items()
+                           if table == self.table_name and ref == target), None)
+                referenced = target
+                if fk is None:
+                    raise LocalSupabaseError(f"{self.table_name}: sem relação com '{target}'")
+            
+            embeds.append({
+                'alias': alias or target,
+                'fk': fk,
+                'table': referenced,
+                'columns': _split_columns(inner) or ['*']
+            })
+        
+        return columns or ['*'], embeds
+    
+    def _attach_embed(self, rows: List[Dict], embed: Dict):
+        """Preenche row[alias] com a linha referenciada (ou None), buscando todas de uma vez"""
+        ids = list({row.get(embed['fk']) for row in rows if row.get(embed['fk']) is not None})
+        referenced = {}
+        
+        if ids:
+            inner = embed['columns']
+            select_list = '*' if inner == ['*'] else ', '.join(_quote(column) for column in dict.fromkeys(inner + ['id']))
+            conn = self.client._conn()
+            
+            for start in range(0, len(ids), 900):
+                chunk = ids[start:start + 900]
+                sql = (f"SELECT {select_list} FROM {_quote(embed['table'])} "
+                       f"WHERE id IN ({','.join('?' * len(chunk))})")
+                for ref_row in conn.execute(sql, chunk):
+                    ref_row = self.client._decode(embed['table'], dict(ref_row))
+                    referenced[ref_row['id']] = (
+                        ref_row if inner == ['*'] else {column: ref_row.get(column) for column in inner}
+                    )
+        
+        for row in rows:
+            row[embed['alias']] = referenced.get(row.get(embed['fk']))
+    
+    def _execute_insert(self) -> LocalResponse:
+        conn = self.client._conn()
+        rows = self._values if isinstance(self._values, list) else [self._values]
+        table = _quote(self.table_name)
+        
+        conflict = ''
+        if self._operation == 'upsert':
+            target = ([column.strip() for column in self._on_conflict.split(',')]
+                      if self._on_conflict else self.client._primary_key(self.table_name))
+        
+        inserted = []
+        with conn:
+            for row in rows:
+                row = self.client._encode(self.table_name, row)
+                columns = list(row)
+                
+                if self._operation == 'upsert':
+                    updates = [column for column in columns if column not in target]
+                    if self._ignore_duplicates or not updates:
+                        action = 'DO NOTHING'
+                    else:
+                        action = 'DO UPDATE SET ' + ', '.join(
+                            f'{_quote(column)} = excluded.{_quote(column)}' for column in updates
+                        )
+                    conflict = f" ON CONFLICT ({', '.join(_quote(column) for column in target)}) {action}"
+                
+                if columns:
+                    sql = (f"INSERT INTO {table} ({', '.join(_quote(column) for column in columns)}) "
+                           f"VALUES ({', '.join('?' * len(columns))}){conflict} RETURNING *")
+                else:
+                    sql = f'INSERT INTO {table} DEFAULT VALUES RETURNING *'
+                
+                inserted.extend(
+                    self.client._decode(self.table_name, dict(result))
+                    for result in conn.execute(sql, [row[column] for column in columns])
+                )
+        
+        return LocalResponse(inserted)
+    
+    def _execute_update(self) -> LocalResponse:
+        conn = self.client._conn()
+        values = self.client._encode(self.table_name, self._values)
+        where, params = self._where()
+        
+        assignments = ', '.join(f'{_quote(column)} = ?' for column in values)
+        sql = f'UPDATE {_quote(self.table_name)} SET {assignments}{where} RETURNING *'
+        
+        with conn:
+            rows = conn.execute(sql, list(values.values()) + params).fetchall()
+        return LocalResponse([self.client._decode(self.table_name, dict(row)) for row in rows])
+    
+    def _execute_delete(self) -> LocalResponse:
+        conn = self.client._conn()
+        where, params = self._where()
+        
+        with conn:
+            rows = conn.execute(f'DELETE FROM {_quote(self.table_name)}{where} RETURNING *', params).fetchall()
+        return LocalResponse([self.client._decode(self.table_name, dict(row)) for row in rows])
+
+
+class LocalRpcCall:
+    """Chamada a uma função RPC (as de docs/supabase_migrations.sql, implementadas em SQLite)"""
+    
+    def __init__(self, client: 'LocalSupabaseClient', name: str, params: Optional[Dict]):
+        self.client = client
+        self.name = name
+        self.params = params or {}
+    
+    def execute(self) -> LocalResponse:
+        function = getattr(self.client, f'_rpc_{self.name}', None)
+        if function is None:
+            raise LocalSupabaseError(f"Função RPC desconhecida: {self.name}")
+        
+        try:
+            return LocalResponse(function(**self.params))
+        except sqlite3.Error as e:
+            raise LocalSupabaseError(f"{self.name}: {e}") from e
+
+
+class LocalSupabaseClient:
+    """
+    Cliente com a mesma interface usada do cliente do Supabase, sobre um arquivo SQLite
+    
+    Cria as tabelas do app (livro, genero e as do cache de buscas) se não
+    existirem. Datas são texto ISO 8601 (UTC), comparadas como texto pelos
+    filtros, como o app já as grava.
+    """
+    
+    def __init__(self, path: str = DEFAULT_LOCAL_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._json_columns: Dict[str, set] = {}
+        self._primary_keys: Dict[str, List[str]] = {}
+        
+        conn = self._connect()
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+            conn.commit()
+        finally:
+            conn.close()
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        conn.create_function('ILIKE', 2, _ilike, deterministic=True)
+        return conn
+    
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA foreign_keys=ON')
+            self._local.conn = conn
+        return conn
+    
+    # ==================== API DO CLIENTE ====================
+    
+    def table(self, name: str) -> LocalQueryBuilder:
+        return LocalQueryBuilder(self, name)
+    
+    def from_(self, name: str) -> LocalQueryBuilder:
+        return self.table(name)
+    
+    def rpc(self, name: str, params: Optional[Dict] = None) -> LocalRpcCall:
+        return LocalRpcCall(self, name, params)
+    
+    # ==================== COLUNAS ====================
+    
+    def _table_info(self, table: str):
+        if table not in self._json_columns:
+            info = self._conn().execute(f'PRAGMA table_info({_quote(table)})').fetchall()
+            if not info:
+                raise LocalSupabaseError(f"Tabela desconhecida: {table}")
+            
+            self._json_columns[table] = {row['name'] for row in info if row['type'].upper() == 'JSON'}
+            self._primary_keys[table] = [row['name'] for row in sorted(info, key=lambda row: row['pk']) if row['pk']]
+    
+    def _primary_key(self, table: str) -> List[str]:
+        self._table_info(table)
+        return self._primary_keys[table]
+    
+    def _encode(self, table: str, row: Dict) -> Dict:
+        self._table_info(table)
+        json_columns = self._json_columns[table]
+        return {
+            column: json.dumps(value, ensure_ascii=False) if column in json_columns else value
+            for column, value in row.items()
+        }
+    
+    def _decode(self, table: str, row: Dict) -> Dict:
+        self._table_info(table)
+        for column in self._json_columns[table]:
+            if row.get(column) is not None:
+                row[column] = json.loads(row[column])
+        return row
+    
+    # ==================== FUNÇÕES RPC ====================
+    
+    def _rpc_registrar_acessos_cache(self, isbns: List[str], contagens: List[int]):
+        conn = self._conn()
+        now = _now()
+        with conn:
+            conn.executemany(
+                'UPDATE cache_api SET acessos = acessos + ?, ultimo_acesso = ? WHERE isbn = ?',
+                [(count, now, isbn) for isbn, count in zip(isbns, contagens)]
+            )
+        return None
+    
+    def _rpc_tamanho_cache_api(self) -> List[Dict]:
+        # Bytes aproximados: tamanho dos valores das colunas de texto
+        row = self._conn().execute("""
+            SELECT COUNT(*) AS linhas,
+                   COALESCE(SUM(LENGTH(CAST(isbn AS BLOB)) + LENGTH(CAST(dados_json AS BLOB))
+                                + LENGTH(CAST(cached_at AS BLOB)) + 32), 0) AS bytes
+            FROM cache_api
+        """).fetchone()
+        return [dict(row)]
+    
+    def _rpc_candidatos_despejo_cache(self, politica: str = 'hibrida', limite: int = 500,
+                                      apos_pontuacao: Optional[float] = None, apos_isbn: Optional[str] = None,
+                                      agora: str = 'now') -> List[Dict]:
+        idade = "(julianday(:agora) - julianday(COALESCE(ultimo_acesso, cached_at))) * 86400.0"
+        pontuacao = {
+            'lru': f'-{idade}',
+            'lfu': 'CAST(acessos AS REAL)'
+        }.get(politica, f'(acessos + 1) / (1 + {idade} / 86400.0)')
+        
+        rows = self._conn().execute(f"""
+            SELECT * FROM (
+                SELECT isbn, acessos, COALESCE(ultimo_acesso, cached_at) AS ultimo_acesso,
+                       LENGTH(CAST(isbn AS BLOB)) + LENGTH(CAST(dados_json AS BLOB))
+                       + LENGTH(CAST(cached_at AS BLOB)) + 32 AS bytes,
+                       {pontuacao} AS pontuacao
+                FROM cache_api
+            )
+            WHERE :apos_pontuacao IS NULL OR (pontuacao, isbn) > (:apos_pontuacao, :apos_isbn)
+            ORDER BY pontuacao ASC, isbn
+            LIMIT :limite
+        """, {'agora': agora, 'apos_pontuacao': apos_pontuacao, 'apos_isbn': apos_isbn,
+              'limite': limite}).fetchall()
+        return [dict(row) for row in rows]
+    
+    def _rpc_limpar_cache_antigo(self, dias: int = 90) -> int:
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute("DELETE FROM cache_api WHERE julianday(cached_at) < julianday('now') - ?", (dias,))
+        return cursor.rowcount
+    
+    def _rpc_limpar_cache_negativo(self, horas: int = 24) -> int:
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute(
+                "DELETE FROM cache_api_negativo WHERE julianday(cached_at) < julianday('now') - ? / 24.0", (horas,)
+            )
+        return cursor.rowcount
+
+
+# ==================== CLIENTE PADRÃO DO PROCESSO ====================
+
+_clients: Dict[str, LocalSupabaseClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_local_supabase(path: str = DEFAULT_LOCAL_PATH) -> LocalSupabaseClient:
+    """Cliente local do arquivo, compartilhado pelo processo (um por caminho)"""
+    path = os.path.abspath(path)
+    
+    with _clients_lock:
+        client = _clients.get(path)
+        if client is None:
+            client = LocalSupabaseClient(path)
+            _clients[path] = client
+    
+    return client
+
+
+def local_client_from_env() -> Optional[LocalSupabaseClient]:
+    """Cliente local se SUPABASE_LOCAL_PATH estiver definido; senão None (usar o Supabase)"""
+    path = os.environ.get(ENV_PATH, '').strip()
+    return get_local_supabase(path) if path else None